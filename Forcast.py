@@ -1,14 +1,21 @@
 import matplotlib.pyplot as plt
 import matplotlib.colors as mcolors
 import cartopy.crs as ccrs
-import cartopy.feature as cfeature
-import pandas as pd
 import numpy as np
-from matplotlib.path import Path
-from matplotlib.patches import PathPatch
-import requests
-import subprocess
-from datetime import datetime, timedelta, timezone
+import argparse
+import os
+import sys
+from datetime import timedelta
+
+from fnv3_ingest import load_latest_run_or_exit
+from map_common import MAP_EXTENT, in_extent, setup_plain_map
+from publish import save_figure
+from run_store import iter_lagged_data, lagged_runs
+
+parser = argparse.ArgumentParser(description="15-day ensemble track map from the latest FNV3 run.")
+parser.add_argument('--lagged', type=int, default=0,
+                    help="Also draw up to this many earlier runs from the local run store, faded by age")
+args = parser.parse_args()
 
 # Initialize counters for tracking plotted and skipped tracks
 plotted_tracks = 0
@@ -19,82 +26,23 @@ latest_runtime_text = None
 forecast_start_date_text = None
 forecast_end_date_text = None
 
-# Define function to get latest run URL
-def get_latest_run_url():
-    base = (
-        "https://deepmind.google.com/science/weatherlab/download/"
-        "cyclones/FNV3/ensemble/cyclogenesis/csv"
-    )
-
-    today = datetime.now(timezone.utc).date()
-    dates = [today, today - timedelta(days=1), today - timedelta(days=2)]
-    hours_desc = ["18", "12", "06", "00"]
-
-    for d in dates:
-        date_str = d.strftime("%Y_%m_%d")
-        for h in hours_desc:
-            url = f"{base}/FNV3_{date_str}T{h}_00_cyclogenesis.csv"
-            try:
-                resp = requests.head(url, allow_redirects=True, timeout=10)
-            except requests.RequestException:
-                continue
-            if resp.status_code == 200:
-                print(f"Latest available run found: {date_str}T{h}:00")
-                return date_str, h, url
-
-    raise RuntimeError("No available FNV3 cyclogenesis runs found in the last 3 days.")
+# Load the latest run (downloaded and parsed by fnv3_ingest, or the run the watcher already holds);
+# download and parse errors are reported there with exit status 1
+data, run = load_latest_run_or_exit()
+lagged = lagged_runs(run, args.lagged) if args.lagged else []
 
-# Load the CSV file, skipping comment lines
-try:
-    date_str, hour_str, latest_url = get_latest_run_url()
-    import os
-    os.makedirs("temp_data", exist_ok=True)
-    local_csv = f"temp_data/FNV3_{date_str}T{hour_str}_00_cyclogenesis.csv"
-    print(f"Downloading latest run with curl to: {local_csv}")
-    subprocess.run([
-        "curl",
-        "-L",
-        "-o",
-        local_csv,
-        latest_url,
-    ], check=True)
-    data = pd.read_csv(local_csv, comment="#")
+latest_ph = run['init_ph']
+latest_runtime_text = run['init_text']
 
-    latest_utc = datetime.strptime(f"{date_str} {hour_str}", "%Y_%m_%d %H").replace(tzinfo=timezone.utc)
-    ph_zone = timezone(timedelta(hours=8))
-    latest_ph = latest_utc.astimezone(ph_zone)
-
-    if hour_str == "00":
-        time_label = "4:00 PM"
-    elif hour_str == "06":
-        time_label = "10:00 PM"
-    elif hour_str == "12":
-        time_label = "4:00 AM"
-    elif hour_str == "18":
-        time_label = "10:00 AM"
-    else:
-        time_label = latest_ph.strftime("%I:%M %p").lstrip("0")
-
-    latest_runtime_text = f"{time_label} PHT, {latest_ph.strftime('%B %d, %Y')}"
-
-    forecast_start_date_text = latest_ph.strftime("%Y-%m-%d")
-    forecast_end_date_text = (latest_ph + timedelta(days=15)).strftime("%Y-%m-%d")
-except subprocess.CalledProcessError as e:
-    print(f"Error: curl failed to download CSV: {e}")
-    exit()
-except pd.errors.ParserError:
-    print("Error: Failed to parse CSV. Ensure the file is correctly formatted and contains the expected columns.")
-    exit()
-except Exception as e:
-    print(f"Error loading CSV: {str(e)}")
-    exit()
+forecast_start_date_text = latest_ph.strftime("%Y-%m-%d")
+forecast_end_date_text = (latest_ph + timedelta(days=15)).strftime("%Y-%m-%d")
 
 # Validate required columns
 required_columns = ['init_time', 'track_id', 'sample', 'lead_time_hours', 'lat', 'lon', 'minimum_sea_level_pressure_hpa']
 missing_columns = [col for col in required_columns if col not in data.columns]
 if missing_columns:
     print(f"Error: Missing required columns in CSV: {missing_columns}")
-    exit()
+    sys.exit(1)
 
 # Filter for 15-day forecast (lead_time_hours <= 360)
 wp_data = data[data['lead_time_hours'] <= 360].copy()
@@ -106,7 +54,7 @@ print(f"Processing all track IDs: {all_track_ids}")
 # Check if any data remains
 if wp_data.empty:
     print("Error: No data found in the CSV file for lead_time_hours <= 360.")
-    exit()
+    sys.exit(1)
 
 # Ensure data is sorted by init_time, track_id, sample, and lead_time_hours
 wp_data = wp_data.sort_values(by=['init_time', 'track_id', 'sample', 'lead_time_hours'])
@@ -115,37 +63,11 @@ wp_data = wp_data.sort_values(by=['init_time', 'track_id', 'sample', 'lead_time_
 init_times = wp_data['init_time'].unique()
 if len(init_times) == 0:
     print("Error: No valid init_time values found in the data.")
-    exit()
+    sys.exit(1)
 print(f"Found {len(init_times)} forecast initialization times: {init_times}")
 
-# Set up the figure and map projection
-fig = plt.figure(figsize=(12, 12))
-ax = plt.axes(projection=ccrs.PlateCarree())
-ax.set_extent([105, 155, 0, 40], crs=ccrs.PlateCarree())  # Wider Western Pacific view
-
-# Add land, ocean, and coastlines
-ax.add_feature(cfeature.LAND, facecolor='lightgray')
-ax.add_feature(cfeature.COASTLINE, linewidth=1.5)
-ax.add_feature(cfeature.BORDERS, linestyle=':', linewidth=1)
-ax.add_feature(cfeature.OCEAN, facecolor='aliceblue')
-
-# Add gridlines with emphasized labels at 5° intervals
-gl = ax.gridlines(draw_labels=True, linewidth=0.5, color='gray', alpha=0.5, linestyle='--')
-gl.xlocator = plt.FixedLocator(np.arange(105, 156, 5))
-gl.ylocator = plt.FixedLocator(np.arange(0, 41, 5))
-gl.xlabel_style = {'size': 12, 'weight': 'bold'}
-gl.ylabel_style = {'size': 12, 'weight': 'bold'}
-gl.top_labels = False
-gl.right_labels = False
-
-# Add Philippine Area of Responsibility (PAR) boundary
-par_vertices = [
-    (115.0, 5.0), (115.0, 15.0), (120.0, 21.0), (120.0, 25.0),
-    (135.0, 25.0), (135.0, 5.0), (115.0, 5.0)
-]
-par_path = Path(par_vertices)
-par_patch = PathPatch(par_path, edgecolor='blue', linestyle='--', linewidth=2, facecolor='none', transform=ccrs.PlateCarree())
-ax.add_patch(par_patch)
+# Set up the figure and map projection (Western Pacific extent, gridlines and PAR from map_common)
+fig, ax = setup_plain_map(MAP_EXTENT)
 
 # Define function to assign custom colors based on pressure
 def get_pressure_color(pressure):
@@ -166,12 +88,20 @@ def get_pressure_color(pressure):
 
 # Plot tracks for each init_time, track_id, and sample
 init_time_alphas = {init_time: max(0.4, 1.0 - i * 0.2) for i, init_time in enumerate(init_times)}
-for init_time in init_times:
-    init_data = wp_data[wp_data['init_time'] == init_time]
+
+def iter_init_data():
+    # Lagged runs first (one in memory at a time) so the latest run is drawn on top
+    for info, lagged_data in iter_lagged_data(lagged):
+        print(f"Lagged run {info['run_id']} (age {info['age_hours']:.0f} h, weight {info['weight']:.2f})")
+        yield info['run_id'], lagged_data[lagged_data['lead_time_hours'] <= 360], info['weight']
+    for init_time in init_times:
+        yield init_time, wp_data[wp_data['init_time'] == init_time], init_time_alphas[init_time]
+
+for init_time, init_data, track_alpha in iter_init_data():
     if init_data.empty:
         print(f"Warning: No data for init_time {init_time}. Skipping.")
         continue
-    for track_id in all_track_ids:
+    for track_id in sorted(init_data['track_id'].unique()):
         track_data = init_data[init_data['track_id'] == track_id]
         if track_data.empty:
             continue
@@ -180,7 +110,7 @@ for init_time in init_times:
             if sample_data.empty:
                 continue
             # Filter within map extent
-            sample_data = sample_data[(sample_data['lon'] >= 105) & (sample_data['lon'] <= 155) & (sample_data['lat'] >= 0) & (sample_data['lat'] <= 40)]
+            sample_data = sample_data[in_extent(sample_data['lon'], sample_data['lat'], MAP_EXTENT)]
             lons = sample_data['lon'].values
             lats = sample_data['lat'].values
             pressures = sample_data['minimum_sea_level_pressure_hpa'].values
@@ -204,7 +134,7 @@ for init_time in init_times:
                 lons, lats,
                 color='#404040',
                 linewidth=2.5,
-                alpha=0.7,  # Reduced opacity for clarity
+                alpha=0.7 * track_alpha,  # Reduced opacity for clarity
                 transform=ccrs.PlateCarree()
             )
             # Plot colored markers
@@ -218,6 +148,7 @@ for init_time in init_times:
                     marker='o',
                     markersize=8,
                     markeredgewidth=0,
+                    alpha=track_alpha,
                     transform=ccrs.PlateCarree()
                 )
                 ax.plot(
@@ -225,6 +156,7 @@ for init_time in init_times:
                     color=color,
                     marker='o',
                     markersize=6,
+                    alpha=track_alpha,
                     transform=ccrs.PlateCarree()
                 )
             plotted_tracks += 1
@@ -276,15 +208,16 @@ ax.set_title(f"15-Day Forecast Tropical Cyclone Tracks - Western Pacific ({start
 
 # Save the plot to a file
 try:
-    # Generate filename based on init_time
-    init_time_str = init_times[0].replace(':', '').replace(' ', 'T') if len(init_times) > 0 else '20250621T1200'
+    # Same timestamp format for every cycle (00 UTC included), e.g. 2025-11-16T000000
     output_dir = "public/assets"
     os.makedirs(output_dir, exist_ok=True)
-    output_file = f"{output_dir}/tropical_cyclone_15day_forecast_{init_time_str}.png"
-    plt.savefig(output_file, dpi=300, bbox_inches='tight')
-    print(f"Plot saved to {output_file}")
+    output_file = f"{output_dir}/tropical_cyclone_15day_forecast_{run['file_stamp']}.png"
+    digest, written = save_figure(plt.gcf(), output_file, product='tracks_15day', run=run)
+    if written:
+        print(f"Plot saved to {output_file} (sha256 {digest[:12]})")
 except Exception as e:
     print(f"Error saving plot: {str(e)}")
+    sys.exit(1)
 
 # Print summary of plotted and skipped tracks
 print(f"Summary: {plotted_tracks} tracks plotted, {skipped_tracks} tracks skipped.")
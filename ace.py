@@ -0,0 +1,204 @@
+"""
+Accumulated cyclone energy (ACE) from the ensemble.
+
+ACE is 1e-4 * sum(v^2) over 6-hourly points with v >= 34 kt. With the wind
+already in an aligned (member, lead) array, member ACE is one masked sum over
+the lead axis; system and basin totals are bincounts of member ACE by
+track_id and by sample.
+
+The seasonal tally lives in public/data/ace_season/<year>.jsonl, one line per
+run. Each run adds the ACE of its analysis (lead 0, ensemble median wind per
+system) for the 6 hours it stands for, so the running total only needs the
+last stored line. Re-running the same run replaces its line.
+
+    python ace.py                    # JSON, chart and seasonal tally
+"""
+import argparse
+import json
+import os
+import sys
+
+import matplotlib.pyplot as plt
+import numpy as np
+
+from area_history import read_last_lines
+from ensemble_tracks import build_track_arrays, group_members
+from fnv3_ingest import load_latest_run_or_exit
+from publish import save_figure, write_if_changed
+
+ACE_MIN_WIND_KT = 34.0
+ACE_SCALE = 1e-4
+ACE_STEP_HOURS = 6
+
+DEFAULT_MAX_LEAD_HOURS = 360
+
+OUTPUT_DIR = "public/assets"
+JSON_PATH = "public/data/ace.json"
+SEASON_DIR = "public/data/ace_season"
+
+
+def point_ace(wind, lead_hours):
+    """ACE contribution of each point: v^2 * 1e-4 on 6-hourly leads with v >= 34 kt, else 0."""
+    wind = np.nan_to_num(np.asarray(wind, dtype=np.float64), nan=0.0)
+    counted = (wind >= ACE_MIN_WIND_KT) & (np.asarray(lead_hours) % ACE_STEP_HOURS == 0)
+    return np.where(counted, ACE_SCALE * wind ** 2, 0.0)
+
+
+def ensemble_ace(tracks):
+    """
+    Member, system and basin ACE over the forecast window.
+
+    Returns a dict with member (n_members,), system (n_tracks, n_samples:
+    ACE of each track_id in each sample, 0 where the sample lacks it) and
+    basin (n_samples,) arrays.
+    """
+    member = point_ace(tracks['wind'], tracks['lead_hours']).sum(axis=1)
+    n_tracks, n_samples = len(tracks['track_ids']), len(tracks['samples'])
+    keys = tracks['track_index'] * n_samples + tracks['sample_index']
+    system = np.bincount(keys, weights=member, minlength=n_tracks * n_samples).reshape(n_tracks, n_samples)
+    return {
+        'member': member,
+        'system': system,
+        'basin': system.sum(axis=0),
+    }
+
+
+def analysis_ace(tracks):
+    """ACE of the 6 hours at lead 0: ensemble median wind per system, summed."""
+    at_start = np.flatnonzero(tracks['lead_hours'] == 0)
+    if not len(at_start):
+        return 0.0
+    grouped, _ = group_members({**tracks, 'wind': tracks['wind'][:, at_start]}, names=('wind',))
+    present = ~np.all(np.isnan(grouped['wind'][:, :, 0]), axis=1)
+    median = np.nanmedian(grouped['wind'][present, :, 0], axis=1)
+    return float(point_ace(median, 0).sum())
+
+
+def _distribution(values):
+    p10, p50, p90 = np.percentile(values, [10, 50, 90]) if len(values) else (0.0, 0.0, 0.0)
+    return {
+        'mean': round(float(np.mean(values)) if len(values) else 0.0, 2),
+        'p10': round(float(p10), 2),
+        'p50': round(float(p50), 2),
+        'p90': round(float(p90), 2),
+    }
+
+
+def ace_to_json(ace, tracks, run, max_lead_hours, season=None):
+    """Distribution statistics of basin and per-system ACE."""
+    systems = []
+    for g in np.argsort(-ace['system'].mean(axis=1), kind='stable'):
+        if not ace['system'][g].any():
+            continue
+        members = ace['member'][tracks['track_index'] == g]
+        systems.append(dict({
+            'track_id': str(tracks['track_ids'][g]),
+            'members': int(len(members)),
+            'member_ace': _distribution(members),
+        }, **_distribution(ace['system'][g])))
+    return {
+        'run_id': run['run_id'],
+        'init_utc': run['init_utc'].strftime("%Y-%m-%dT%H:%M:%SZ"),
+        'max_lead_hours': max_lead_hours,
+        'num_samples': int(len(tracks['samples'])),
+        'basin': _distribution(ace['basin']),
+        'systems': systems,
+        'season': season,
+    }
+
+
+def update_season(run, contribution, season_dir=SEASON_DIR):
+    """
+    Add this run's analysis ACE to the seasonal tally and return its record.
+
+    Only the last stored line is read; the same run_id replaces its line.
+    """
+    year = run['init_utc'].year
+    path = os.path.join(season_dir, f"{year}.jsonl")
+
+    tail = read_last_lines(path, n=2)
+    truncate_at = None
+    if tail and json.loads(tail[-1][1]).get('run_id') == run['run_id']:
+        truncate_at = tail[-1][0]
+        tail = tail[:-1]
+    previous_total = json.loads(tail[-1][1])['season_ace'] if tail else 0.0
+
+    record = {
+        'run_id': run['run_id'],
+        'init_utc': run['init_utc'].strftime("%Y-%m-%dT%H:%M:%SZ"),
+        'analysis_ace': round(contribution, 4),
+        'season_ace': round(previous_total + contribution, 4),
+        'season': year,
+    }
+    os.makedirs(season_dir, exist_ok=True)
+    with open(path, 'ab') as f:
+        if truncate_at is not None:
+            f.truncate(truncate_at)
+        f.write((json.dumps(record, separators=(',', ':')) + "\n").encode("utf-8"))
+    return record
+
+
+def render_ace_chart(ace, tracks, run, max_lead_hours, output_dir=OUTPUT_DIR, max_systems=8):
+    """Basin ACE histogram and per-system box plots; returns the output path or None."""
+    fig, (ax_basin, ax_sys) = plt.subplots(1, 2, figsize=(12, 4.5), gridspec_kw={'width_ratios': [1, 1.3]})
+
+    ax_basin.hist(ace['basin'], bins=30, color='#E67E22', edgecolor='white')
+    ax_basin.axvline(np.median(ace['basin']) if len(ace['basin']) else 0, color='#A83232', linewidth=2,
+                     label='Median')
+    ax_basin.set_xlabel("Basin ACE (10$^4$ kt$^2$)")
+    ax_basin.set_ylabel("Ensemble samples")
+    ax_basin.set_title("Basin total", fontsize=12, weight='bold')
+    ax_basin.legend(fontsize=8)
+
+    order = [g for g in np.argsort(-ace['system'].mean(axis=1), kind='stable') if ace['system'][g].any()]
+    order = order[:max_systems]
+    if order:
+        ax_sys.boxplot([ace['system'][g] for g in order], whis=(10, 90), showfliers=False)
+        ax_sys.set_xticks(range(1, len(order) + 1))
+        ax_sys.set_xticklabels([str(tracks['track_ids'][g]) for g in order])
+    ax_sys.set_xlabel("Track")
+    ax_sys.set_ylabel("ACE (10$^4$ kt$^2$)")
+    ax_sys.set_title("Per system (10–90% whiskers)", fontsize=12, weight='bold')
+    ax_sys.grid(alpha=0.3, axis='y')
+
+    fig.suptitle(
+        f"{max_lead_hours // 24}-Day Ensemble ACE - Runtime: {run.get('init_text') or 'Runtime unavailable'}",
+        fontsize=14, weight='bold'
+    )
+    fig.tight_layout()
+
+    output_file = os.path.join(output_dir, f"tropical_cyclone_ace_{run['file_stamp']}.png")
+    try:
+        digest, written = save_figure(fig, output_file, dpi=150, product='ace', run=run)
+        if written:
+            print(f"Plot saved to {output_file} (sha256 {digest[:12]})")
+    except Exception as e:
+        print(f"Error saving plot: {str(e)}")
+        output_file = None
+    plt.close(fig)
+    return output_file
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ensemble accumulated cyclone energy from the latest FNV3 run.")
+    parser.add_argument('--max-lead-hours', type=int, default=DEFAULT_MAX_LEAD_HOURS)
+    parser.add_argument('--no-plot', action='store_true', help="Skip the chart")
+    parser.add_argument('--no-season', action='store_true', help="Do not update the seasonal tally")
+    args = parser.parse_args(argv)
+
+    data, run = load_latest_run_or_exit()
+    tracks = build_track_arrays(data, args.max_lead_hours)
+    ace = ensemble_ace(tracks)
+
+    season = None if args.no_season else update_season(run, analysis_ace(tracks))
+    payload = ace_to_json(ace, tracks, run, args.max_lead_hours, season)
+    write_if_changed(JSON_PATH, (json.dumps(payload, separators=(',', ':')) + "\n").encode("utf-8"))
+    print(f"Basin ACE median {payload['basin']['p50']} "
+          f"(10-90%: {payload['basin']['p10']}-{payload['basin']['p90']}); written to {JSON_PATH}")
+
+    if not args.no_plot and render_ace_chart(ace, tracks, run, args.max_lead_hours) is None:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Run-to-run tracking of development areas.
+
+Every outlook run appends one JSON line per window to
+public/data/outlook_history/<window>.jsonl with a compact summary of each
+area (persistent id, centroid, outline, probabilities, member count). A new
+run only reads the last stored run, matches its areas to the new ones by
+centroid distance (Hungarian assignment with a distance gate), and appends
+itself, so each run costs O(areas) regardless of how long the history is.
+"""
+import json
+import os
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+from shapely.geometry import mapping
+
+from ensemble_tracks import great_circle_km
+
+HISTORY_DIR = "public/data/outlook_history"
+
+# Areas further apart than this between runs are treated as different systems
+MAX_MATCH_KM = 800.0
+
+# Probability change (percentage points) below which an area is "steady"
+TREND_THRESHOLD = 10.0
+
+
+def read_last_lines(path, n=2, block_size=8192):
+    """
+    Return up to the last n lines of a file as [(offset, text), ...], oldest first.
+
+    Reads backwards from the end in blocks, so the cost does not grow with
+    the size of the history file.
+    """
+    if not os.path.exists(path):
+        return []
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        pos = end
+        buf = b""
+        while pos > 0 and buf.count(b"\n") <= n:
+            step = min(block_size, pos)
+            pos -= step
+            f.seek(pos)
+            buf = f.read(step) + buf
+
+    pieces = buf.split(b"\n")
+    offsets = pos + np.cumsum([0] + [len(piece) + 1 for piece in pieces[:-1]])
+    lines = list(zip(offsets.tolist(), pieces))
+    if pos > 0:
+        # First piece may start mid-line
+        lines = lines[1:]
+    return [(offset, raw.decode("utf-8")) for offset, raw in lines if raw.strip()][-n:]
+
+
+def _area_centroid(area):
+    stats = area.get('stats')
+    if stats and not np.isnan(stats['centroid_lon']):
+        return stats['centroid_lon'], stats['centroid_lat']
+    return area['center_lon'], area['center_lat']
+
+
+def summarize_area(area, precision=2):
+    """Compact JSON-able summary of one area for the history store."""
+    lon, lat = _area_centroid(area)
+    polygon = None
+    if area.get('polygon') is not None and not area['polygon'].is_empty:
+        geom = mapping(area['polygon'].simplify(0.05))
+        polygon = json.loads(json.dumps(geom), parse_float=lambda v: round(float(v), precision))
+    return {
+        'id': area['history_id'],
+        'index': area['index'],
+        'centroid': [round(float(lon), precision), round(float(lat), precision)],
+        'polygon': polygon,
+        'prob_early': round(float(area['prob_early']), 1),
+        'prob_window': round(float(area['prob_window']), 1),
+        'members': int(area['member_count']),
+        'trend': area['trend'],
+    }
+
+
+def match_areas(previous, areas, max_km=MAX_MATCH_KM):
+    """
+    Hungarian assignment of new areas to the previous run's areas.
+
+    Returns {new_area_position: previous_summary}. Pairs further apart than
+    max_km are left unmatched.
+    """
+    if not previous or not areas:
+        return {}
+    prev_lon = np.array([p['centroid'][0] for p in previous])
+    prev_lat = np.array([p['centroid'][1] for p in previous])
+    new_lon, new_lat = np.array([_area_centroid(a) for a in areas]).T
+
+    cost = great_circle_km(new_lon[:, None], new_lat[:, None], prev_lon[None, :], prev_lat[None, :])
+    rows, cols = linear_sum_assignment(cost)
+    return {int(r): previous[c] for r, c in zip(rows, cols) if cost[r, c] <= max_km}
+
+
+def trend_label(delta):
+    if delta is None:
+        return 'new'
+    if delta >= TREND_THRESHOLD:
+        return 'up'
+    if delta <= -TREND_THRESHOLD:
+        return 'down'
+    return 'steady'
+
+
+def track_areas(outlook, run, history_dir=HISTORY_DIR):
+    """
+    Link this run's areas to the previous run and append the run to the store.
+
+    Sets area['history_id'], area['prev_prob'], area['trend'] and
+    area['trend_delta'] on every area of the outlook. Re-running the same
+    run replaces its stored line instead of appending a duplicate.
+    """
+    window = outlook['window']
+    path = os.path.join(history_dir, f"{window['name']}.jsonl")
+
+    tail = read_last_lines(path, n=2)
+    truncate_at = None
+    if tail and json.loads(tail[-1][1]).get('run_id') == run['run_id']:
+        truncate_at = tail[-1][0]
+        tail = tail[:-1]
+    last = json.loads(tail[-1][1]) if tail else None
+
+    previous = last['areas'] if last else []
+    next_id = last['next_id'] if last else 1
+    matches = match_areas(previous, outlook['areas'])
+
+    for pos, area in enumerate(outlook['areas']):
+        prev = matches.get(pos)
+        if prev is None:
+            area['history_id'] = next_id
+            next_id += 1
+            area['prev_prob'] = None
+            area['trend_delta'] = None
+        else:
+            area['history_id'] = prev['id']
+            area['prev_prob'] = prev['prob_window']
+            area['trend_delta'] = area['prob_window'] - prev['prob_window']
+        area['trend'] = trend_label(area['trend_delta'])
+
+    record = {
+        'run_id': run['run_id'],
+        'init_utc': run['init_utc'].strftime("%Y-%m-%dT%H:%M:%SZ"),
+        'window': window['name'],
+        'next_id': next_id,
+        'areas': [summarize_area(area) for area in outlook['areas']],
+    }
+
+    os.makedirs(history_dir, exist_ok=True)
+    with open(path, 'ab') as f:
+        if truncate_at is not None:
+            f.truncate(truncate_at)
+        f.write((json.dumps(record, separators=(',', ':')) + "\n").encode("utf-8"))
+    return record
@@ -0,0 +1,161 @@
+"""
+Retention and pruning of the generated forecast assets.
+
+Dated products are named <product>_<stamp><suffix>, where stamp is the run's
+file_stamp (2025-11-16T060000; older 00 UTC files carry only the date) and
+suffix covers the PNG and its responsive variants (.png, .webp, .w640.avif,
+.mp4, ...). All files of one run are kept or pruned together. Per product
+the policy keeps:
+
+  - the newest KEEP_RUNS runs
+  - the 00 UTC run of each day for SNAPSHOT_DAYS days back from the newest run
+
+Everything else is deleted. Leftover temporary files from interrupted atomic
+writes are removed, and products.json entries whose file is gone are dropped.
+
+    python asset_lifecycle.py --dry-run
+    python asset_lifecycle.py --keep-runs 8 --snapshot-days 14
+"""
+import argparse
+import json
+import os
+import re
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+from publish import MANIFEST_PATH, PUBLIC_DIR, load_manifest, write_if_changed
+
+ASSET_DIRS = ["public/assets", "public/images"]
+
+KEEP_RUNS = 8
+SNAPSHOT_DAYS = 14
+
+# Only pipeline outputs are managed; hand-placed images (logo, maps) are left alone
+MANAGED_PREFIXES = ("tropical_cyclone_", "cyclone_development_areas_")
+
+ASSET_PATTERN = re.compile(
+    r"^(?P<product>[a-z0-9_]+?)_(?P<stamp>\d{4}-\d{2}-\d{2}(?:T\d{6})?)(?P<suffix>(?:\.w\d+)?\.[a-z0-9]+)$"
+)
+
+# Temporary files of interrupted writes older than this are removed
+STALE_TMP_SECONDS = 3600
+
+
+def parse_asset(name):
+    """(product, run time UTC, suffix) of a managed asset filename, or None."""
+    if not name.startswith(MANAGED_PREFIXES):
+        return None
+    match = ASSET_PATTERN.match(name)
+    if match is None:
+        return None
+    stamp = match.group('stamp')
+    fmt = "%Y-%m-%dT%H%M%S" if "T" in stamp else "%Y-%m-%d"
+    run_time = datetime.strptime(stamp, fmt).replace(tzinfo=timezone.utc)
+    return match.group('product'), run_time, match.group('suffix')
+
+
+def scan_assets(dirs=ASSET_DIRS):
+    """{(directory, product): {run time: [paths]}} of every managed asset."""
+    assets = defaultdict(lambda: defaultdict(list))
+    for directory in dirs:
+        if not os.path.isdir(directory):
+            continue
+        for name in sorted(os.listdir(directory)):
+            parsed = parse_asset(name)
+            if parsed is not None:
+                product, run_time, _ = parsed
+                assets[(directory, product)][run_time].append(os.path.join(directory, name))
+    return assets
+
+
+def runs_to_keep(run_times, keep_runs=KEEP_RUNS, snapshot_days=SNAPSHOT_DAYS):
+    """The run times the retention policy keeps for one product."""
+    ordered = sorted(run_times, reverse=True)
+    if not ordered:
+        return set()
+    keep = set(ordered[:keep_runs])
+    oldest_snapshot = ordered[0] - timedelta(days=snapshot_days)
+    keep.update(t for t in ordered if t.hour == 0 and t >= oldest_snapshot)
+    return keep
+
+
+def plan_pruning(assets, keep_runs=KEEP_RUNS, snapshot_days=SNAPSHOT_DAYS):
+    """Split every managed file into (kept, pruned) path lists."""
+    kept, pruned = [], []
+    for runs in assets.values():
+        keep = runs_to_keep(runs, keep_runs, snapshot_days)
+        for run_time, paths in runs.items():
+            (kept if run_time in keep else pruned).extend(paths)
+    return sorted(kept), sorted(pruned)
+
+
+def remove_stale_tmp(dirs=ASSET_DIRS, max_age=STALE_TMP_SECONDS, dry_run=False):
+    """Delete hidden .tmp leftovers of interrupted writes; returns their paths."""
+    now = time.time()
+    removed = []
+    for directory in dirs:
+        if not os.path.isdir(directory):
+            continue
+        for name in os.listdir(directory):
+            if not (name.startswith(".") and ".tmp" in name):
+                continue
+            path = os.path.join(directory, name)
+            if now - os.path.getmtime(path) > max_age:
+                removed.append(path)
+                if not dry_run:
+                    os.remove(path)
+    return removed
+
+
+def prune_manifest(manifest_path=MANIFEST_PATH, public_dir=PUBLIC_DIR, dry_run=False):
+    """Drop manifest entries (and variants) whose file no longer exists; returns entries dropped."""
+    if not os.path.exists(manifest_path):
+        return 0
+
+    def exists(url):
+        return os.path.exists(os.path.join(public_dir, url.lstrip("/")))
+
+    manifest = load_manifest(manifest_path)
+    dropped = 0
+    for product, entries in manifest['products'].items():
+        live = [e for e in entries if exists(e['url'])]
+        dropped += len(entries) - len(live)
+        for entry in live:
+            entry['variants'] = [v for v in entry.get('variants', []) if exists(v['url'])]
+        manifest['products'][product] = live
+    manifest['products'] = {k: v for k, v in manifest['products'].items() if v}
+    if not dry_run:
+        write_if_changed(manifest_path, (json.dumps(manifest, indent=2) + "\n").encode("utf-8"))
+    return dropped
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prune generated forecast assets.")
+    parser.add_argument('--dirs', nargs='+', default=ASSET_DIRS)
+    parser.add_argument('--keep-runs', type=int, default=KEEP_RUNS, help="Newest runs kept per product")
+    parser.add_argument('--snapshot-days', type=int, default=SNAPSHOT_DAYS,
+                        help="Days of 00 UTC snapshots kept per product")
+    parser.add_argument('--dry-run', action='store_true', help="Report only, change nothing")
+    args = parser.parse_args(argv)
+
+    assets = scan_assets(args.dirs)
+    kept, pruned = plan_pruning(assets, args.keep_runs, args.snapshot_days)
+    freed = sum(os.path.getsize(path) for path in pruned)
+    if not args.dry_run:
+        for path in pruned:
+            os.remove(path)
+    verb = "Would prune" if args.dry_run else "Pruned"
+    print(f"{verb} {len(pruned)} files ({freed / 1e6:.1f} MB) across {len(assets)} products; "
+          f"keeping {len(kept)} files")
+
+    stale = remove_stale_tmp(args.dirs, dry_run=args.dry_run)
+    if stale:
+        print(f"Removed {len(stale)} stale temporary files")
+    dropped = prune_manifest(dry_run=args.dry_run)
+    if dropped:
+        print(f"Dropped {dropped} manifest entries for pruned files")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Client for the ATCF current-position API shared by every product.
+
+Responses are cached on disk (CACHE_PATH) with a TTL, so the scripts of one
+job (or the watcher) fetch the JSON once between them. A fetch has a hard
+total deadline (not just a socket timeout), so a slow API cannot stall a
+job. When a fetch fails or times out the last cached response is used while
+it is younger than MAX_STALE_SECONDS (stale-while-error); otherwise the
+result is an empty list, as before.
+
+fetch_systems_async() starts the fetch on a background thread and returns
+a Future, so it can run while the FNV3 run downloads:
+
+    atcf_future = fetch_systems_async()
+    data, run = load_latest_run_or_exit()
+    atcf_systems = atcf_future.result()
+"""
+import json
+import math
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from datetime import datetime, timezone
+
+import requests
+
+from publish import write_bytes_atomic
+
+ATCF_URL = "https://api.knackwx.com/atcf/v2"
+
+CACHE_PATH = "temp_data/atcf_cache.json"
+
+# A cached response younger than this is used without fetching
+TTL_SECONDS = 600
+# A cached response up to this old is used when a fetch fails
+MAX_STALE_SECONDS = 6 * 3600
+
+# Whole request, connect to last byte
+TIMEOUT_SECONDS = 15.0
+CONNECT_TIMEOUT_SECONDS = 5.0
+
+REQUEST_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'application/json',
+}
+
+
+def _float(value):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if math.isfinite(value) else None
+
+
+def parse_sector_line(system):
+    """
+    Fields of a system's interp_sector_file line as a dict (None when missing).
+
+    The line reads "<id> <name> <yyyymmdd> <hhmm> <lat> <lon> ... <wind kt>
+    <pressure> <speed kt> <heading>"; time is returned as ISO 8601 UTC.
+    """
+    parts = str(system.get('interp_sector_file') or '').split()
+    parts += [None] * (12 - len(parts))
+    date, hhmm = parts[2] or '', parts[3] or ''
+    time = None
+    if len(date) >= 8 and len(hhmm) >= 4:
+        time = f"{date[:4]}-{date[4:6]}-{date[6:8]}T{hhmm[:2]}:{hhmm[2:4]}:00Z"
+    return {
+        'name': parts[1],
+        'time': time,
+        'lat': _float(parts[4]),
+        'lon': _float(parts[5]),
+        'wind_kt': _float(parts[8]),
+        'pressure_hpa': _float(parts[9]),
+        'speed_kt': _float(parts[10]),
+        'heading_deg': _float(parts[11]),
+    }
+
+
+def read_cache(cache_path=CACHE_PATH):
+    """(systems, age in seconds) of the cached response, or (None, None)."""
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        fetched = datetime.strptime(cached['fetched_utc'], "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc)
+        systems = cached['systems']
+    except (OSError, json.JSONDecodeError, KeyError, TypeError, ValueError):
+        return None, None
+    if not isinstance(systems, list):
+        return None, None
+    return systems, (datetime.now(timezone.utc) - fetched).total_seconds()
+
+
+def write_cache(systems, url=ATCF_URL, cache_path=CACHE_PATH):
+    payload = {
+        'url': url,
+        'fetched_utc': datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        'systems': systems,
+    }
+    write_bytes_atomic(cache_path, (json.dumps(payload, separators=(',', ':')) + "\n").encode("utf-8"))
+
+
+def _get_json(url, timeout):
+    resp = requests.get(url, headers=REQUEST_HEADERS, timeout=(min(CONNECT_TIMEOUT_SECONDS, timeout), timeout))
+    resp.raise_for_status()
+    return json.loads(resp.content.decode("utf-8"))
+
+
+def download_json(url=ATCF_URL, timeout=TIMEOUT_SECONDS):
+    """
+    GET url and parse the JSON body, raising TimeoutError past `timeout` seconds in total.
+
+    The request runs on a daemon thread so the deadline holds even for a
+    server trickling its response (socket timeouts only bound each read);
+    an abandoned request finishes or fails on its own.
+    """
+    result = Future()
+
+    def worker():
+        try:
+            result.set_result(_get_json(url, timeout))
+        except BaseException as e:
+            result.set_exception(e)
+
+    threading.Thread(target=worker, name="atcf-request", daemon=True).start()
+    try:
+        return result.result(timeout=timeout)
+    except FutureTimeoutError:
+        raise TimeoutError(f"ATCF response not complete within {timeout:.0f} s")
+
+
+def fetch_systems(url=ATCF_URL, ttl=TTL_SECONDS, timeout=TIMEOUT_SECONDS, max_stale=MAX_STALE_SECONDS,
+                  cache_path=CACHE_PATH, default=()):
+    """
+    Current ATCF systems (list of dicts), from the cache while fresh.
+
+    Never raises: on a failed fetch the stale cache (up to max_stale
+    seconds old) or `default` is returned ([] unless given, e.g. None to
+    tell a failure from an empty basin).
+    """
+    cached, age = read_cache(cache_path)
+    if cached is not None and age <= ttl:
+        print(f"Using cached ATCF data ({age:.0f} s old)")
+        return cached
+
+    try:
+        systems = download_json(url, timeout)
+        if not isinstance(systems, list):
+            raise ValueError("unexpected ATCF response (not a list)")
+    except Exception as e:
+        if cached is not None and age <= max_stale:
+            print(f"Error fetching ATCF data: {str(e)}; using cached data from {age / 60:.0f} min ago")
+            return cached
+        print(f"Error fetching ATCF data: {str(e)}")
+        return list(default) if default is not None else None
+
+    try:
+        write_cache(systems, url, cache_path)
+    except OSError as e:
+        print(f"Warning: could not cache ATCF data: {str(e)}")
+    return systems
+
+
+def fetch_systems_async(**kwargs):
+    """
+    Start fetch_systems(**kwargs) on a daemon thread; returns a Future of its result.
+
+    The Future is always resolved: an unexpected error is reported and
+    resolves it to the default, like a failed fetch.
+    """
+    future = Future()
+
+    def worker():
+        try:
+            future.set_result(fetch_systems(**kwargs))
+        except Exception as e:
+            print(f"Error fetching ATCF data: {str(e)}")
+            default = kwargs.get('default', ())
+            future.set_result(list(default) if default is not None else None)
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=worker, name="atcf-fetch", daemon=True).start()
+    return future
@@ -0,0 +1,83 @@
+"""
+Density contour extraction as shapely geometry.
+
+Each development area is contoured once at its outline level; the resulting
+polygons drive the filled patch, the black outline, area/centroid statistics
+and any vector export.
+"""
+import math
+
+import contourpy
+import numpy as np
+from matplotlib.path import Path
+from shapely.geometry import MultiPolygon, Polygon
+from shapely.ops import transform, unary_union
+
+KM_PER_DEG_LAT = 111.32
+
+
+def density_polygons(lon_grid, lat_grid, density, level=0.1):
+    """
+    Polygons (with holes) enclosing density >= level, as a shapely MultiPolygon.
+
+    lon_grid/lat_grid/density are the same 2-D arrays that would be passed to
+    contourf. Returns an empty MultiPolygon when nothing reaches the level.
+    """
+    generator = contourpy.contour_generator(
+        np.asarray(lon_grid).T, np.asarray(lat_grid).T, np.asarray(density).T,
+        fill_type=contourpy.FillType.OuterOffset,
+    )
+    points_list, offsets_list = generator.filled(level, np.inf)
+
+    polygons = []
+    for points, offsets in zip(points_list, offsets_list):
+        rings = [points[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+        if len(rings[0]) < 4:
+            continue
+        polygon = Polygon(rings[0], [ring for ring in rings[1:] if len(ring) >= 4])
+        if not polygon.is_valid:
+            polygon = polygon.buffer(0)
+        if not polygon.is_empty:
+            polygons.append(polygon)
+
+    if not polygons:
+        return MultiPolygon()
+    merged = unary_union(polygons)
+    return merged if isinstance(merged, MultiPolygon) else MultiPolygon([merged])
+
+
+def polygon_path(geom):
+    """Single compound matplotlib Path for a (Multi)Polygon, holes included."""
+    vertices = []
+    codes = []
+    for polygon in getattr(geom, 'geoms', [geom]):
+        for ring in [polygon.exterior, *polygon.interiors]:
+            coords = np.asarray(ring.coords)
+            ring_codes = np.full(len(coords), Path.LINETO, dtype=Path.code_type)
+            ring_codes[0] = Path.MOVETO
+            ring_codes[-1] = Path.CLOSEPOLY
+            vertices.append(coords)
+            codes.append(ring_codes)
+    if not vertices:
+        return Path(np.empty((0, 2)))
+    return Path(np.concatenate(vertices), np.concatenate(codes))
+
+
+def _sinusoidal_km(lon, lat):
+    # Equal-area sinusoidal projection, good enough for area statistics
+    x = np.asarray(lon) * KM_PER_DEG_LAT * np.cos(np.radians(lat))
+    y = np.asarray(lat) * KM_PER_DEG_LAT
+    return x, y
+
+
+def polygon_stats(geom):
+    """Area (km^2), centroid and bounds of a lon/lat (Multi)Polygon."""
+    if geom.is_empty:
+        return {'area_km2': 0.0, 'centroid_lon': math.nan, 'centroid_lat': math.nan, 'bounds': None}
+    centroid = geom.centroid
+    return {
+        'area_km2': float(transform(_sinusoidal_km, geom).area),
+        'centroid_lon': float(centroid.x),
+        'centroid_lat': float(centroid.y),
+        'bounds': [float(v) for v in geom.bounds],
+    }
@@ -0,0 +1,147 @@
+"""
+Ensemble tracks as aligned typed arrays.
+
+The long-format FNV3 table (one row per member point) is pivoted once into
+(member, lead time) float32 arrays padded with NaN, so ensemble products can
+work on whole arrays instead of grouping DataFrames in Python loops. A
+member is one (init_time, track_id, sample) track.
+"""
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+
+# Track segments jumping further than this (degrees) are treated as bad data,
+# matching the filter used when drawing the spaghetti maps
+MAX_JUMP_DEG = 10.0
+
+MEMBER_KEYS = ['init_time', 'track_id', 'sample']
+
+# Candidate (point, cell) pairs per KD-tree range query of the probability
+# grids (about 24 bytes each)
+MAX_QUERY_PAIRS = 2_000_000
+
+
+def build_track_arrays(data, max_lead_hours=360):
+    """
+    Pivot the run into aligned arrays.
+
+    Returns a dict with:
+      members     DataFrame of MEMBER_KEYS, one row per member (array row order)
+      lead_hours  1-D array of the distinct lead times (array column order)
+      lon, lat, pressure, wind   (n_members, n_leads) float32, NaN where missing
+      track_index (n_members,) int index into track_ids
+      sample_index (n_members,) int index into samples
+      track_ids, samples         sorted distinct values
+    """
+    df = data[data['lead_time_hours'] <= max_lead_hours]
+    df = df.sort_values(by=MEMBER_KEYS + ['lead_time_hours'])
+
+    member_codes = df.groupby(MEMBER_KEYS, sort=True).ngroup().to_numpy()
+    members = df[MEMBER_KEYS].drop_duplicates().reset_index(drop=True)
+    lead_hours = np.unique(df['lead_time_hours'].to_numpy())
+    lead_codes = np.searchsorted(lead_hours, df['lead_time_hours'].to_numpy())
+
+    shape = (len(members), len(lead_hours))
+    arrays = {}
+    for name, column in [('lon', 'lon'), ('lat', 'lat'),
+                         ('pressure', 'minimum_sea_level_pressure_hpa'),
+                         ('wind', 'maximum_sustained_wind_speed_knots')]:
+        values = np.full(shape, np.nan, dtype=np.float32)
+        values[member_codes, lead_codes] = df[column].to_numpy(dtype=np.float32)
+        arrays[name] = values
+
+    track_ids, track_index = np.unique(members['track_id'].astype(str).to_numpy(), return_inverse=True)
+    samples, sample_index = np.unique(members['sample'].to_numpy(), return_inverse=True)
+
+    return {
+        'members': members,
+        'lead_hours': lead_hours,
+        'track_index': track_index,
+        'sample_index': sample_index,
+        'track_ids': track_ids,
+        'samples': samples,
+        **arrays,
+    }
+
+
+def to_unit_vectors(lon, lat):
+    """Lon/lat degrees -> unit vectors on the sphere, shape (..., 3)."""
+    lon = np.radians(np.asarray(lon, dtype=np.float64))
+    lat = np.radians(np.asarray(lat, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)], axis=-1)
+
+
+def chord_for_km(distance_km):
+    """Straight-line chord length on the unit sphere for a great-circle distance."""
+    return 2.0 * np.sin(np.asarray(distance_km) / (2.0 * EARTH_RADIUS_KM))
+
+
+def great_circle_km(lon1, lat1, lon2, lat2):
+    """Great-circle distance (km) between points; broadcasts over arrays."""
+    lon1, lat1, lon2, lat2 = map(np.radians, (lon1, lat1, lon2, lat2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def valid_segments(tracks):
+    """
+    Boolean (n_members, n_leads - 1) mask of drawable segments.
+
+    Both ends must exist and the step must not jump more than MAX_JUMP_DEG.
+    """
+    lon, lat = tracks['lon'], tracks['lat']
+    ok = ~np.isnan(lon[:, :-1]) & ~np.isnan(lon[:, 1:]) & ~np.isnan(lat[:, :-1]) & ~np.isnan(lat[:, 1:])
+    with np.errstate(invalid='ignore'):
+        ok &= (np.abs(np.diff(lon, axis=1)) <= MAX_JUMP_DEG) & (np.abs(np.diff(lat, axis=1)) <= MAX_JUMP_DEG)
+    return ok
+
+
+def densify_segments(lon0, lat0, lon1, lat1, spacing_km):
+    """
+    Resample segments into points no more than spacing_km apart (vectorized).
+
+    Returns (xyz, segment_index, fraction): unit vectors of the points, the
+    segment each point came from, and its position (0-1) along that segment.
+    Both endpoints of every segment are included.
+    """
+    length = great_circle_km(lon0, lat0, lon1, lat1)
+    steps = np.maximum(np.ceil(length / spacing_km).astype(np.int64), 1)
+    segment_index = np.repeat(np.arange(len(steps)), steps + 1)
+    starts = np.cumsum(steps + 1) - (steps + 1)
+    fraction = (np.arange(len(segment_index)) - starts[segment_index]) / steps[segment_index]
+
+    a = to_unit_vectors(lon0, lat0)[segment_index]
+    b = to_unit_vectors(lon1, lat1)[segment_index]
+    # Normalized linear interpolation: follows the great circle for short segments
+    xyz = a + (b - a) * fraction[:, None]
+    xyz /= np.linalg.norm(xyz, axis=1, keepdims=True)
+    return xyz, segment_index, fraction
+
+
+def group_members(tracks, names=('lon', 'lat', 'pressure', 'wind'), by='track_index'):
+    """
+    Stack member arrays by group: (n_groups, max_members_per_group, n_leads).
+
+    Groups are the values of tracks[by] (track_index by default); slots of
+    smaller groups are NaN-padded, so per-group statistics become plain
+    nan-reductions over axis 1. Returns (stacked dict, group sizes).
+    """
+    group = np.asarray(tracks[by])
+    n_groups = int(group.max()) + 1 if len(group) else 0
+    order = np.argsort(group, kind='stable')
+    sizes = np.bincount(group, minlength=n_groups)
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    # Position of each member inside its group
+    slot = np.empty(len(group), dtype=np.int64)
+    slot[order] = np.arange(len(group)) - starts[group[order]]
+
+    width = int(sizes.max()) if n_groups else 0
+    stacked = {}
+    for name in names:
+        values = tracks[name]
+        out = np.full((n_groups, width, values.shape[1]), np.nan, dtype=values.dtype)
+        out[group, slot] = values
+        stacked[name] = out
+    return stacked, sizes
@@ -0,0 +1,175 @@
+"""
+Discovery, download and parsing of FNV3 ensemble cyclogenesis runs.
+
+Every product loads its run through load_latest_run() (or
+load_latest_run_or_exit() on the command line): the newest published run is
+found with HEAD requests, its CSV downloaded to temp_data and parsed once,
+and describe_run() builds the run metadata (ids, init times, file stamp)
+shared by all outputs. A process rendering several products (watcher.py)
+pins one run with pin_run(), so later loads reuse it without network access.
+"""
+import os
+import subprocess
+import sys
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+import requests
+
+from run_store import store_run
+
+FNV3_BASE_URL = (
+    "https://deepmind.google.com/science/weatherlab/download/"
+    "cyclones/FNV3/ensemble/cyclogenesis/csv"
+)
+
+PH_ZONE = timezone(timedelta(hours=8))
+
+REQUIRED_COLUMNS = [
+    'init_time',
+    'track_id',
+    'sample',
+    'lead_time_hours',
+    'lat',
+    'lon',
+    'minimum_sea_level_pressure_hpa',
+    'maximum_sustained_wind_speed_knots',
+]
+
+# Seconds allowed for the availability check of one run
+HEAD_TIMEOUT_SECONDS = 10
+
+# Run held in memory by a long-running process (watcher.py); when set,
+# load_latest_run() returns it instead of looking for and downloading a run
+_pinned_run = None
+
+# Issue times shown on the site for each synoptic hour (PHT)
+RUN_TIME_LABELS = {
+    "00": "4:00 PM",
+    "06": "10:00 PM",
+    "12": "4:00 AM",
+    "18": "10:00 AM",
+}
+
+
+def run_url(date_str, hour_str):
+    return f"{FNV3_BASE_URL}/FNV3_{date_str}T{hour_str}_00_cyclogenesis.csv"
+
+
+def run_available(date_str, hour_str):
+    """Whether the run's CSV is published (HEAD request; network errors count as not yet)."""
+    try:
+        resp = requests.head(run_url(date_str, hour_str), allow_redirects=True, timeout=HEAD_TIMEOUT_SECONDS)
+    except requests.RequestException:
+        return False
+    return resp.status_code == 200
+
+
+def get_latest_run_url():
+    """Return (date_str, hour_str, url) of the newest FNV3 run in the last 3 days."""
+    today = datetime.now(timezone.utc).date()
+    dates = [today, today - timedelta(days=1), today - timedelta(days=2)]
+    hours_desc = ["18", "12", "06", "00"]
+
+    for d in dates:
+        date_str = d.strftime("%Y_%m_%d")
+        for h in hours_desc:
+            if run_available(date_str, h):
+                print(f"Latest available run found: {date_str}T{h}:00")
+                return date_str, h, run_url(date_str, h)
+
+    raise RuntimeError("No available FNV3 cyclogenesis runs found in the last 3 days.")
+
+
+def describe_run(date_str, hour_str):
+    """Build the run metadata shared by every product rendered from one FNV3 run."""
+    init_utc = datetime.strptime(f"{date_str} {hour_str}", "%Y_%m_%d %H").replace(tzinfo=timezone.utc)
+    init_ph = init_utc.astimezone(PH_ZONE)
+    time_label = RUN_TIME_LABELS.get(hour_str) or init_ph.strftime("%I:%M %p").lstrip("0")
+    return {
+        'run_id': f"{date_str}T{hour_str}",
+        'date_str': date_str,
+        'hour_str': hour_str,
+        'init_utc': init_utc,
+        'init_ph': init_ph,
+        'init_text': f"{time_label} PHT, {init_ph.strftime('%B %d, %Y')}",
+        # Timestamp used in dated product filenames, e.g. 2025-11-16T060000
+        'file_stamp': init_utc.strftime("%Y-%m-%dT%H%M%S"),
+    }
+
+
+def download_run(url, local_csv):
+    """Download one run CSV with curl (raises CalledProcessError on failure)."""
+    print(f"Downloading latest run with curl to: {local_csv}")
+    subprocess.run([
+        "curl",
+        "-L",
+        "-o",
+        local_csv,
+        url,
+    ], check=True)
+
+
+def load_run(date_str, hour_str, data_dir="temp_data"):
+    """
+    Download and parse one FNV3 cyclogenesis run.
+
+    Returns (data, run) where data is the raw ensemble DataFrame and run is the
+    metadata dict from describe_run(). The run is added to the local run
+    store (run_store.py).
+    """
+    url = run_url(date_str, hour_str)
+    os.makedirs(data_dir, exist_ok=True)
+    local_csv = os.path.join(data_dir, f"FNV3_{date_str}T{hour_str}_00_cyclogenesis.csv")
+    download_run(url, local_csv)
+    data = pd.read_csv(local_csv, comment="#")
+
+    missing_columns = [col for col in REQUIRED_COLUMNS if col not in data.columns]
+    if missing_columns:
+        raise ValueError(f"Missing required columns in CSV: {missing_columns}")
+
+    run = describe_run(date_str, hour_str)
+    run['url'] = url
+    run['csv_path'] = local_csv
+
+    # Keep typed arrays of the run for later lagged ensembles
+    try:
+        store_run(data, run)
+    except Exception as e:
+        print(f"Warning: could not store run {run['run_id']}: {str(e)}")
+    return data, run
+
+
+def pin_run(data, run):
+    """Make load_latest_run() return this run (pass None to go back to downloading)."""
+    global _pinned_run
+    _pinned_run = None if data is None else (data, run)
+
+
+def load_latest_run(data_dir="temp_data"):
+    """
+    Find, download and parse the latest FNV3 cyclogenesis run.
+
+    Returns (data, run) as load_run(). The CSV is downloaded and parsed once so
+    every product in the process can share it. If a run is pinned (pin_run())
+    a copy of it is returned without any network access.
+    """
+    if _pinned_run is not None:
+        data, run = _pinned_run
+        print(f"Using run {run['run_id']} held in memory")
+        return data.copy(), dict(run)
+    date_str, hour_str, _ = get_latest_run_url()
+    return load_run(date_str, hour_str, data_dir)
+
+
+def load_latest_run_or_exit(data_dir="temp_data"):
+    """load_latest_run() for command-line products: report the error and exit(1)."""
+    try:
+        return load_latest_run(data_dir)
+    except subprocess.CalledProcessError as e:
+        print(f"Error: curl failed to download CSV: {e}")
+    except pd.errors.ParserError:
+        print("Error: Failed to parse CSV. Ensure the file is correctly formatted and contains the expected columns.")
+    except Exception as e:
+        print(f"Error loading CSV: {str(e)}")
+    sys.exit(1)
@@ -0,0 +1,770 @@
+"""
+Tropical weather outlook (genesis potential) for the Western Pacific.
+
+Genesis points are extracted from the FNV3 ensemble once, then every outlook
+window (week 1, week 2, or any custom lead-time window) is computed from the
+same arrays and rendered to its own PNG (and a GeoJSON of its areas, see
+vector_export.py) in a single process.
+
+    python genesis_outlook.py                       # week1 + week2
+    python genesis_outlook.py --windows week2
+    python genesis_outlook.py --window 72:240:120   # custom start:end[:early] hours
+    python genesis_outlook.py --lagged 2            # add the 2 previous stored runs
+    python genesis_outlook.py --tiles               # plus XYZ tiles of the genesis density
+    python genesis_outlook.py --regions wpac luzon  # zoomed maps from the same outlook
+"""
+import argparse
+import os
+import sys
+from datetime import timedelta
+
+import matplotlib.pyplot as plt
+import matplotlib.patches as patches
+import cartopy.crs as ccrs
+import cartopy.io.img_tiles as cimgt  # For satellite tiles
+import numpy as np
+from matplotlib.colors import to_rgba
+from matplotlib.patches import Circle, PathPatch
+from scipy.stats import gaussian_kde
+from shapely.geometry import box
+from sklearn.cluster import DBSCAN
+
+from area_history import HISTORY_DIR, track_areas
+from atcf_client import fetch_systems_async
+from contours import density_polygons, polygon_path, polygon_stats
+from fnv3_ingest import load_latest_run_or_exit
+from genesis_stability import DEFAULT_RESAMPLES, bootstrap_stability
+from map_common import (
+    DEFAULT_REGION, MAP_EXTENT, REGIONS, CachedTiles, in_extent, region_suffix, setup_satellite_map,
+)
+from publish import run_seed, save_figure
+from run_store import DEFAULT_HALF_LIFE_HOURS, iter_lagged_data, lagged_runs
+from vector_export import VECTOR_DIR, areas_to_geojson, write_geojson
+from xyz_tiles import LAYER_STYLES, TILE_DIR, export_tiles, remove_layer
+
+MIN_GENESIS_WIND_KT = 25.0
+
+# DBSCAN settings: eps in degrees (approx 440 km), tuned for better separation
+CLUSTER_EPS_DEG = 4.0
+CLUSTER_MIN_SAMPLES = 3
+
+# Normalized density level that outlines each development area
+AREA_CONTOUR_LEVEL = 0.1
+
+OUTPUT_DIR = "public/images"
+
+DISCLAIMER = (
+    "This is an experimental guidance product and should not be used for critical decision making\n"
+    "Please do not treat this as an official forecast.\n"
+    "Refer to PAGASA and other official meteorological agencies for official forecasts, warnings, and advisories."
+)
+
+# Outlook windows. start/end bound the genesis lead time (hours, inclusive);
+# early_hours is the cutoff of the shorter sub-window shown first on each label.
+OUTLOOK_WINDOWS = {
+    'week1': {
+        'name': 'week1',
+        'start_hours': 0,
+        'end_hours': 168,
+        'early_hours': 48,
+        'title': "7-Day Tropical Weather Outlook",
+        'early_label': "48-Hour Potential",
+        'window_label': "7-Day Potential",
+        'early_log_label': "2-day",
+        'window_log_label': "7-day",
+        'period_text': "within 7 days",
+        'prob_text': "7-day probability",
+        'empty_disclaimer': None,
+        'output_file': "tropical_outlook_week1{region}_latest.png",
+    },
+    'week2': {
+        'name': 'week2',
+        'start_hours': 168,
+        'end_hours': 336,
+        'early_hours': 216,
+        'title': "Week 2 Tropical Weather Outlook",
+        'early_label': "Days 8-9 Potential",
+        'window_label': "Week 2 Potential",
+        'early_log_label': "Week 2 (2-day)",
+        'window_log_label': "Week 2",
+        'period_text': "during Week 2 (Days 8-14)",
+        'prob_text': "Week 2 probability",
+        'empty_disclaimer': (
+            "This outlook is for reference only and should not be used for critical decision making\n"
+            "Please refer to PAGASA and other official meteorological agencies for official forecasts, \n"
+            "warnings, and advisories."
+        ),
+        'output_file': "tropical_outlook_week2{region}_latest.png",
+    },
+}
+
+
+def custom_window(start_hours, end_hours, early_hours=None):
+    """Build an outlook window for an arbitrary lead-time range (hours)."""
+    if early_hours is None:
+        early_hours = min(start_hours + 48, end_hours)
+    first_day = start_hours // 24 + 1
+    early_day = early_hours // 24
+    end_day = end_hours // 24
+    name = f"days{first_day}-{end_day}"
+    return {
+        'name': name,
+        'start_hours': start_hours,
+        'end_hours': end_hours,
+        'early_hours': early_hours,
+        'title': f"Days {first_day}-{end_day} Tropical Weather Outlook",
+        'early_label': f"Days {first_day}-{early_day} Potential",
+        'window_label': f"Days {first_day}-{end_day} Potential",
+        'early_log_label': f"days {first_day}-{early_day}",
+        'window_log_label': f"days {first_day}-{end_day}",
+        'period_text': f"during Days {first_day}-{end_day}",
+        'prob_text': f"Days {first_day}-{end_day} probability",
+        'empty_disclaimer': None,
+        'output_file': f"tropical_outlook_{name}{{region}}_latest.png",
+    }
+
+
+# Define function to get color based on pressure (unchanged)
+def get_pressure_color(pressure):
+    try:
+        p = float(pressure)
+    except:
+        return None
+    if p > 1000:
+        return 'yellow'  # Weak
+    elif 980 < p <= 1000:
+        return 'orange'  # Moderate
+    elif p <= 980:
+        return 'red'  # Strong
+    else:
+        return None
+
+
+def safe_gaussian_kde(xy, bandwidth_factor=1.0, rng=None):
+    """
+    Safely create a gaussian_kde with fallback options for singular data
+
+    Jitter for duplicate/singular points is drawn from rng so that a seeded
+    generator gives identical densities on every re-render.
+    """
+    if rng is None:
+        rng = np.random.default_rng(0)
+    try:
+        # First, check if we have enough unique points
+        unique_points = np.unique(xy, axis=1)
+        if unique_points.shape[1] < 3:
+            return None, "Insufficient unique points"
+
+        # Check for duplicate points and add small random noise if needed
+        if xy.shape[1] != unique_points.shape[1]:
+            print(f"Warning: Found duplicate points, adding small noise")
+            xy = xy + rng.normal(0, 0.01, xy.shape)
+
+        # Try creating KDE with default bandwidth
+        kde = gaussian_kde(xy)
+
+        # Optionally adjust bandwidth
+        if bandwidth_factor != 1.0:
+            kde.covariance_factor = lambda: kde.silverman_factor() * bandwidth_factor
+            kde._compute_covariance()
+
+        return kde, "Success"
+
+    except np.linalg.LinAlgError as e:
+        print(f"LinAlgError: {e}")
+        try:
+            # Add more noise to spread out the points
+            print("Adding more noise to resolve singular matrix...")
+            xy_noisy = xy + rng.normal(0, 0.1, xy.shape)
+            kde = gaussian_kde(xy_noisy)
+            return kde, "Success with noise"
+        except:
+            return None, "Failed even with noise"
+    except Exception as e:
+        print(f"Other KDE error: {e}")
+        return None, f"Error: {e}"
+
+
+# Get category (low/medium/high) based on probability
+def get_category(prob):
+    if prob < 40:
+        return 'low'
+    elif prob <= 60:
+        return 'medium'
+    else:
+        return 'high'
+
+
+# Get area color based on category
+def get_area_color(cat):
+    if cat == 'low':
+        return 'yellow'
+    elif cat == 'medium':
+        return 'orange'
+    else:
+        return 'red'
+
+
+def classify_tc_stage(max_wind_kt):
+    """Classify the system stage based on maximum sustained wind (knots)."""
+    try:
+        w = float(max_wind_kt)
+    except Exception:
+        return 'Unknown'
+
+    if w < 20:
+        return 'Disturbance / LPA'
+    elif w < 25:
+        return 'Low Pressure Area'
+    elif w < 34:
+        return 'Tropical Depression'
+    elif w < 48:
+        return 'Tropical Storm'
+    elif w < 64:
+        return 'Severe Tropical Storm'
+    else:
+        return 'Typhoon'
+
+
+def window_members(data, end_hours):
+    """Ensemble members (samples) with any point up to end_hours."""
+    return np.sort(data.loc[data['lead_time_hours'] <= end_hours, 'sample'].unique())
+
+
+def count_members(data, end_hours):
+    """Number of ensemble members (samples) with any point up to end_hours."""
+    return len(window_members(data, end_hours))
+
+
+def extract_genesis_points(data, max_lead_hours, min_wind_kt=MIN_GENESIS_WIND_KT, extent=MAP_EXTENT):
+    """
+    Extract genesis points once for every outlook window.
+
+    Genesis is the earliest point of each (init_time, track_id, sample) whose
+    maximum sustained wind reaches min_wind_kt, searched over the
+    longest window. Only numbered (potential) tracks inside extent are
+    kept. Returns a dict of aligned 1-D arrays.
+    """
+    strong = data[
+        (data['lead_time_hours'] <= max_lead_hours)
+        & (data['maximum_sustained_wind_speed_knots'] >= min_wind_kt)
+    ]
+    strong = strong[strong['track_id'].astype(str).str.isdigit()]
+    strong = strong.sort_values(by=['init_time', 'track_id', 'sample', 'lead_time_hours'])
+    genesis = strong.drop_duplicates(subset=['init_time', 'track_id', 'sample'], keep='first')
+
+    lons = genesis['lon'].to_numpy(dtype=float)
+    lats = genesis['lat'].to_numpy(dtype=float)
+    mask = in_extent(lons, lats, extent)
+
+    return {
+        'lon': lons[mask],
+        'lat': lats[mask],
+        'lead': genesis['lead_time_hours'].to_numpy(dtype=float)[mask],
+        'wind': genesis['maximum_sustained_wind_speed_knots'].to_numpy(dtype=float)[mask],
+        'sample': genesis['sample'].to_numpy()[mask],
+        'track_id': genesis['track_id'].to_numpy()[mask],
+    }
+
+
+def member_share(samples, members, weights):
+    """Percentage of the members' total weight held by the distinct samples."""
+    present = np.isin(members, samples)
+    return float(weights[present].sum() / weights.sum() * 100)
+
+
+def gather_ensemble(data, windows, lagged=()):
+    """
+    Genesis points and window members of the run plus any lagged runs.
+
+    Lagged runs (run_store.lagged_runs()) are loaded one at a time and only
+    their genesis points and member ids are kept. Returns (genesis, members)
+    where members is a list aligned with windows of (member ids, weights);
+    the current run's members weigh 1.
+    """
+    max_lead_hours = max(w['end_hours'] for w in windows)
+    parts = []
+    members = [([], []) for _ in windows]
+
+    def add(frame, weight):
+        parts.append(extract_genesis_points(frame, max_lead_hours))
+        for i, window in enumerate(windows):
+            ids = window_members(frame, window['end_hours'])
+            members[i][0].append(ids)
+            members[i][1].append(np.full(len(ids), weight))
+
+    add(data, 1.0)
+    for info, frame in iter_lagged_data(lagged):
+        print(f"Lagged run {info['run_id']} (age {info['age_hours']:.0f} h, weight {info['weight']:.2f})")
+        add(frame, info['weight'])
+
+    genesis = {key: np.concatenate([p[key] for p in parts]) for key in parts[0]}
+    return genesis, [(np.concatenate(ids), np.concatenate(weights)) for ids, weights in members]
+
+
+def compute_outlook(genesis, window, num_samples, run_id="", member_weights=None,
+                    eps=CLUSTER_EPS_DEG, min_samples=CLUSTER_MIN_SAMPLES, extent=MAP_EXTENT):
+    """
+    Cluster the genesis points of one window and estimate per-area potentials.
+
+    Returns a dict with the window's points and a list of area dicts (one per
+    DBSCAN cluster, numbered from 1). Each area's outline is extracted once as
+    a shapely geometry (area['polygon']) with its statistics in area['stats'].
+    Areas whose KDE fails keep their number but carry density=None.
+
+    KDE jitter is seeded from (run_id, window, cluster) so the same run always
+    produces the same areas. member_weights, a (member ids, weights) pair
+    covering the window's members, turns probabilities into weighted shares
+    (lagged ensemble); by default every member counts once.
+    """
+    in_window = (genesis['lead'] >= window['start_hours']) & (genesis['lead'] <= window['end_hours'])
+    lons = genesis['lon'][in_window]
+    lats = genesis['lat'][in_window]
+    leads = genesis['lead'][in_window]
+    winds = genesis['wind'][in_window]
+    samples = genesis['sample'][in_window]
+
+    outlook = {
+        'window': window,
+        'num_points': len(lons),
+        'num_samples': num_samples,
+        'member_weights': member_weights,
+        'points': {'lon': lons, 'lat': lats, 'lead': leads, 'sample': samples},
+        'labels': None,
+        'areas': [],
+    }
+    print(f"[{window['name']}] Total genesis points: {len(lons)}")
+    if len(lons) < 2:
+        return outlook
+
+    # Cluster the points using DBSCAN to separate distinct regions
+    coords = np.column_stack((lons, lats))
+    labels = DBSCAN(eps=eps, min_samples=min_samples).fit(coords).labels_
+    outlook['labels'] = labels
+    unique_labels = sorted(set(labels) - {-1})  # Sorted for consistent ordering
+    print(f"[{window['name']}] Found {len(unique_labels)} clusters")
+
+    # Grid for contouring, shared by every cluster in this window
+    lon_min, lon_max, lat_min, lat_max = extent
+    lon_grid, lat_grid = np.mgrid[lon_min:lon_max:200j, lat_min:lat_max:200j]
+    positions = np.vstack([lon_grid.ravel(), lat_grid.ravel()])
+
+    for i, label in enumerate(unique_labels, start=1):
+        cluster_mask = (labels == label)
+        cluster_lons = lons[cluster_mask]
+        cluster_lats = lats[cluster_mask]
+        cluster_samples = samples[cluster_mask]
+        print(f"Processing cluster {label} with {len(cluster_lons)} points")
+
+        early_samples = cluster_samples[leads[cluster_mask] <= window['early_hours']]
+        if member_weights is None:
+            prob_window = len(np.unique(cluster_samples)) / num_samples * 100
+            prob_early = len(np.unique(early_samples)) / num_samples * 100
+        else:
+            prob_window = member_share(cluster_samples, *member_weights)
+            prob_early = member_share(early_samples, *member_weights)
+        cat_window = get_category(prob_window)
+        max_wind = winds[cluster_mask].max()
+
+        area = {
+            'index': i,
+            'label': label,
+            'lons': cluster_lons,
+            'lats': cluster_lats,
+            'center_lon': float(np.mean(cluster_lons)),
+            'center_lat': float(np.mean(cluster_lats)),
+            'prob_early': prob_early,
+            'prob_window': prob_window,
+            'cat_early': get_category(prob_early),
+            'cat_window': cat_window,
+            'color': get_area_color(cat_window),
+            'member_count': len(np.unique(cluster_samples)),
+            'max_wind': max_wind,
+            'stage': classify_tc_stage(max_wind),
+            'lon_grid': lon_grid,
+            'lat_grid': lat_grid,
+            'density': None,
+            'polygon': None,
+            'stats': None,
+            'stability': None,
+            'history_id': None,
+            'trend': None,
+        }
+        outlook['areas'].append(area)
+
+        rng = np.random.default_rng(run_seed(run_id, window['name'], i))
+        kde, status = safe_gaussian_kde(np.vstack([cluster_lons, cluster_lats]), bandwidth_factor=1.2, rng=rng)
+        if kde is None:
+            print(f"KDE failed for cluster {label}: {status}")
+            continue
+        print(f"KDE successful for cluster {label}: {status}")
+
+        densities = kde.evaluate(positions).reshape(lon_grid.shape)
+        # Normalize densities for this cluster
+        area['density'] = densities / densities.max() if densities.max() > 0 else densities
+
+        # Contour once; the geometry is reused for fill, outline and statistics
+        area['polygon'] = density_polygons(lon_grid, lat_grid, area['density'], AREA_CONTOUR_LEVEL)
+        area['stats'] = polygon_stats(area['polygon'])
+        print(f"Area {i} outline: {area['stats']['area_km2']:,.0f} km^2 centred at "
+              f"({area['stats']['centroid_lon']:.1f}E, {area['stats']['centroid_lat']:.1f}N)")
+
+    return outlook
+
+
+def genesis_density_grid(outlook):
+    """
+    Combined genesis layer for tiling: each area's normalized KDE density
+    scaled by its window probability (percent), maximum over areas.
+
+    Returns (grid[lat, lon], lons, lats), or None when no area has a density.
+    """
+    areas = [area for area in outlook['areas'] if area['density'] is not None]
+    if not areas:
+        return None
+    grid = np.max([area['density'] * area['prob_window'] for area in areas], axis=0)
+    return grid.T, areas[0]['lon_grid'][:, 0], areas[0]['lat_grid'][0, :]
+
+
+def plot_atcf_positions(ax, atcf_data, extent=MAP_EXTENT):
+    """Plot markers for current WPAC systems inside extent."""
+    lon_min, lon_max, lat_min, lat_max = extent
+    # Fixed drawing order regardless of API response order
+    for system in sorted(atcf_data, key=lambda s: str(s.get('atcf_id', ''))):
+        lat = system.get('latitude')
+        lon = system.get('longitude')
+        pressure = system.get('pressure')
+        storm_name = system.get('storm_name', '').upper()
+        atcf_id = system.get('atcf_id', '')
+        atcf_sector = system.get('atcf_sector_file', '')
+        if lon is None or lat is None or pressure is None:
+            continue
+        if lon < 0 or 'WPAC' not in atcf_sector.upper():  # Skip non-WPAC
+            continue
+        if not (lon_min <= lon <= lon_max and lat_min <= lat <= lat_max):
+            continue
+        if storm_name == 'INVEST':
+            label = f"LPA {atcf_id}"
+        else:
+            label = storm_name
+        color = get_pressure_color(pressure)
+        if color is None:
+            continue
+        # Plot larger marker with white outline for current position
+        ax.plot(
+            lon, lat,
+            color='white',
+            marker='X',
+            markersize=14,
+            markeredgewidth=0,
+            transform=ccrs.PlateCarree()
+        )
+        ax.plot(
+            lon, lat,
+            color='black',
+            marker='X',
+            markersize=12,
+            transform=ccrs.PlateCarree()
+        )
+        # Add label
+        ax.text(
+            lon + 0.5, lat + 0.5,
+            label,
+            fontsize=12,
+            weight='bold',
+            color='black',
+            transform=ccrs.PlateCarree()
+        )
+
+
+def add_prepared_by(ax, run):
+    """Bottom-right box with the initialization line."""
+    init_line = run.get('init_text') or "Initialization unavailable"
+    lagged_line = f"Lagged ensemble: +{len(run['lagged'])} earlier runs\n" if run.get('lagged') else ""
+    legend_text = (
+        "Potential Area of Development\n"
+        f"Initialization: {init_line}\n"
+        f"{lagged_line}"
+        "Prepared By: Philippine Typhoon/Weather"
+    )
+    ax.text(
+        0.98, 0.02, legend_text,
+        transform=ax.transAxes, fontsize=10, verticalalignment='bottom', horizontalalignment='right',
+        bbox=dict(facecolor='white', alpha=0.8, edgecolor='black', boxstyle='round,pad=0.3')
+    )
+
+
+def add_disclaimer(ax, text):
+    ax.text(0.01, 0.01, text, transform=ax.transAxes, fontsize=9,
+            ha='left', va='bottom', style='italic', color='black',
+            bbox=dict(facecolor='yellow', alpha=0.9, edgecolor='black', linewidth=1.5))
+
+
+def draw_no_formation(ax, window, run):
+    """Central 'no formation expected' message used when a window has no genesis."""
+    end_date_str = (run['init_ph'] + timedelta(hours=window['end_hours'])).strftime("%m/%d/%Y")
+    message_text = (
+        f"NO TROPICAL CYCLONE\n"
+        f"FORMATION EXPECTED\n\n"
+        f"UNTIL {end_date_str}"
+    )
+    ax.text(
+        0.5, 0.5, message_text,
+        transform=ax.transAxes,
+        fontsize=22,
+        weight='bold',
+        ha='center',
+        va='center',
+        color='#003366',  # Dark blue text
+        bbox=dict(
+            boxstyle='round,pad=1.0',
+            facecolor='#F0F8FF',  # AliceBlue background
+            edgecolor='#003366',
+            linewidth=2,
+            alpha=0.9
+        )
+    )
+    add_prepared_by(ax, run)
+    if window['empty_disclaimer']:
+        add_disclaimer(ax, window['empty_disclaimer'])
+
+
+def area_in_extent(area, extent):
+    """Whether any part of an area (its outline, else its centre) lies inside extent."""
+    lon_min, lon_max, lat_min, lat_max = extent
+    if area['density'] is not None and not area['polygon'].is_empty:
+        return area['polygon'].intersects(box(lon_min, lat_min, lon_max, lat_max))
+    return bool(in_extent(area['center_lon'], area['center_lat'], extent))
+
+
+def draw_areas(ax, outlook, run, extent=MAP_EXTENT):
+    """Draw the development areas inside extent, their labels, and the category legend."""
+    window = outlook['window']
+    init_ph = run['init_ph']
+    early_day = (init_ph + timedelta(hours=window['early_hours'])).strftime('%a')
+    end_day = (init_ph + timedelta(hours=window['end_hours'])).strftime('%a')
+    lon_min, lon_max, lat_min, lat_max = extent
+
+    for area in outlook['areas']:
+        if not area_in_extent(area, extent):
+            continue
+        i = area['index']
+        if area['density'] is None:
+            if len(area['lons']) == 1:
+                # Fixed circle for single point
+                patch = Circle((area['center_lon'], area['center_lat']), 2.0, facecolor=area['color'],
+                               edgecolor='black', linewidth=2, alpha=0.6, transform=ccrs.PlateCarree())
+                ax.add_patch(patch)
+            continue
+
+        if not area['polygon'].is_empty:
+            # Filled area and black outline from the same extracted geometry
+            ax.add_patch(PathPatch(
+                polygon_path(area['polygon']),
+                facecolor=to_rgba(area['color'], 0.6), edgecolor='black', linewidth=2.0,
+                transform=ccrs.PlateCarree()
+            ))
+
+        # Convert cluster center position to normalized axes coordinates (0-1)
+        x_norm = (area['center_lon'] - lon_min) / (lon_max - lon_min)
+        y_norm = (area['center_lat'] + 2 - lat_min) / (lat_max - lat_min)
+        # Clamp inside the axes to keep the entire label off the outer frame
+        x_norm = min(max(x_norm, 0.12), 0.88)
+        y_norm = min(max(y_norm, 0.15), 0.90)
+
+        prob_early_rounded = int(10 * round(area['prob_early'] / 10))
+        prob_window_rounded = int(10 * round(area['prob_window'] / 10))
+        area_title = f"Area {i}"
+        if area['history_id'] is not None:
+            area_title += f" (#{area['history_id']}, {trend_text(area)})"
+        area_text = (
+            f"{area_title}\n"
+            f"{window['early_label']}: ({early_day}) {area['cat_early']} ({prob_early_rounded}%)\n"
+            f"{window['window_label']}: ({end_day}) {area['cat_window']} ({prob_window_rounded}%)"
+        )
+        if area['stability']:
+            st = area['stability']
+            area_text += (
+                f"\nBootstrap range: {st['prob_p05']:.0f}-{st['prob_p95']:.0f}% "
+                f"(persists {st['persistence'] * 100:.0f}%)"
+            )
+        ax.text(
+            x_norm, y_norm, area_text,
+            fontsize=9, ha='center', va='bottom',
+            fontweight='bold',
+            bbox=dict(facecolor='white', alpha=0.9, edgecolor='gray', boxstyle='round,pad=0.5'),
+            transform=ax.transAxes,
+            zorder=100
+        )
+
+        conf_word = {'low': 'Low', 'medium': 'Moderate', 'high': 'High'}.get(area['cat_window'], 'Unknown')
+        if area['stage'] in ['Disturbance / LPA', 'Low Pressure Area']:
+            system_wording = 'low pressure area / disturbance'
+        else:
+            system_wording = 'tropical cyclone'
+        area['summary'] = (
+            f"Area {i}: {conf_word} confidence of {system_wording} formation {window['period_text']} "
+            f"(Stage at genesis: {area['stage']}, {window['prob_text']}: {prob_window_rounded}%)"
+        )
+        print(
+            f"Area {i}: Possible tropical cyclone formation area | "
+            f"Stage at genesis (max wind {area['max_wind']:.1f} kt): {area['stage']} | "
+            f"{window['early_log_label']}: ({early_day}) {area['cat_early']} ({prob_early_rounded}%), "
+            f"{window['window_log_label']}: ({end_day}) {area['cat_window']} ({prob_window_rounded}%)"
+        )
+
+    if not any(area['density'] is not None for area in outlook['areas']):
+        print("No clusters plotted")
+
+    # Create legend elements for categories
+    legend_elements = [
+        patches.Patch(facecolor='yellow', edgecolor='black', label='Low (<40%)'),
+        patches.Patch(facecolor='orange', edgecolor='black', label='Medium (40-60%)'),
+        patches.Patch(facecolor='red', edgecolor='black', label='High (>60%)')
+    ]
+    legend = ax.legend(
+        handles=legend_elements, loc='upper left', bbox_to_anchor=(0.02, 0.98),
+        frameon=True, fancybox=True, shadow=True, fontsize=10, title='Development Potential'
+    )
+    legend.get_frame().set_facecolor('white')
+    legend.get_frame().set_alpha(0.9)
+
+    add_prepared_by(ax, run)
+    add_disclaimer(ax, DISCLAIMER)
+
+
+def trend_text(area):
+    """Short run-to-run trend wording for an area label."""
+    if area['trend'] in (None, 'new'):
+        return "new"
+    prev_rounded = int(10 * round(area['prev_prob'] / 10))
+    return f"{area['trend']} from {prev_rounded}%"
+
+
+def outlook_figure(outlook, run, tiles, atcf_systems, extent=MAP_EXTENT,
+                   region_title=REGIONS[DEFAULT_REGION]['title']):
+    """Build the figure of one outlook window over extent (not saved)."""
+    window = outlook['window']
+    fig, ax = setup_satellite_map(tiles, extent)
+
+    if outlook['num_points'] < 2:
+        print("Insufficient points for density estimation. Creating visualization with no formation message.")
+        draw_no_formation(ax, window, run)
+    else:
+        draw_areas(ax, outlook, run, extent)
+        plot_atcf_positions(ax, atcf_systems, extent)
+
+    ax.set_title(f"{window['title']} - {region_title}", fontsize=16, weight='bold')
+    return fig
+
+
+def render_outlook(outlook, run, tiles, atcf_systems, region=DEFAULT_REGION, output_dir=OUTPUT_DIR):
+    """Render one outlook window of one region to its PNG. Returns the output path, or None on error."""
+    window = outlook['window']
+    fig = outlook_figure(outlook, run, tiles, atcf_systems, extent=REGIONS[region]['extent'],
+                         region_title=REGIONS[region]['title'])
+    suffix = region_suffix(region)
+    output_file = os.path.join(output_dir, window['output_file'].format(region=suffix))
+    try:
+        digest, written = save_figure(fig, output_file, product=f"outlook_{window['name']}{suffix}", run=run)
+        if written:
+            print(f"Plot saved to {output_file} (sha256 {digest[:12]})")
+    except Exception as e:
+        print(f"Error saving plot: {str(e)}")
+        output_file = None
+    plt.close(fig)
+    return output_file
+
+
+def parse_window(spec):
+    """Parse a 'start:end[:early]' hours spec into a custom window."""
+    parts = [int(p) for p in spec.split(':')]
+    if len(parts) not in (2, 3) or parts[0] >= parts[1]:
+        raise argparse.ArgumentTypeError(f"Invalid window '{spec}', expected start:end[:early] hours")
+    return custom_window(*parts)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render tropical weather outlooks from the latest FNV3 run.")
+    parser.add_argument('--windows', nargs='+', choices=sorted(OUTLOOK_WINDOWS), default=['week1', 'week2'],
+                        help="Predefined outlook windows to render")
+    parser.add_argument('--window', dest='custom_windows', action='append', type=parse_window, default=[],
+                        help="Extra window as start:end[:early] lead hours (repeatable)")
+    parser.add_argument('--history-dir', default=HISTORY_DIR,
+                        help="Directory of the run-to-run area history store")
+    parser.add_argument('--no-history', action='store_true',
+                        help="Do not match areas against, or append to, the history store")
+    parser.add_argument('--stability', action='store_true',
+                        help="Bootstrap member resampling to estimate per-area probability ranges")
+    parser.add_argument('--resamples', type=int, default=DEFAULT_RESAMPLES,
+                        help="Number of bootstrap resamples (with --stability)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Worker processes for the bootstrap (default: CPU count, max 8)")
+    parser.add_argument('--tiles', action='store_true',
+                        help="Also write XYZ tiles of each window's genesis density (public/tiles)")
+    parser.add_argument('--regions', nargs='+', choices=list(REGIONS), default=[DEFAULT_REGION],
+                        help="Map regions to render from each window's outlook")
+    parser.add_argument('--lagged', type=int, default=0,
+                        help="Add up to this many earlier runs from the local run store")
+    parser.add_argument('--half-life', type=float, default=DEFAULT_HALF_LIFE_HOURS,
+                        help="Age (hours) at which a lagged run's members weigh half (with --lagged)")
+    args = parser.parse_args(argv)
+    windows = [OUTLOOK_WINDOWS[name] for name in args.windows] + args.custom_windows
+    regions = list(dict.fromkeys(args.regions))
+
+    # Current ATCF positions are fetched while the run downloads
+    atcf_future = fetch_systems_async()
+    data, run = load_latest_run_or_exit()
+
+    if data['sample'].nunique() == 0:
+        print("Error: No samples found in the data.")
+        sys.exit(1)
+
+    run['lagged'] = lagged_runs(run, args.lagged, half_life_hours=args.half_life) if args.lagged else []
+
+    # One genesis extraction (per run) serves every window
+    genesis, window_weights = gather_ensemble(data, windows, run['lagged'])
+    print(f"Extracted {len(genesis['lon'])} genesis points for {len(windows)} windows")
+
+    # Shared across figures so the satellite tiles are only fetched, and the
+    # basemap of each region only stitched, once
+    tiles = CachedTiles(cimgt.GoogleTiles(style='satellite', cache=True))
+    atcf_systems = atcf_future.result()
+
+    failed = False
+    for window, (members, weights) in zip(windows, window_weights):
+        member_weights = (members, weights) if run['lagged'] else None
+        outlook = compute_outlook(genesis, window, len(members), run_id=run['run_id'],
+                                  member_weights=member_weights)
+        if args.stability:
+            bootstrap_stability(
+                outlook, members, n_resamples=args.resamples, eps=CLUSTER_EPS_DEG,
+                min_samples=CLUSTER_MIN_SAMPLES, seed=run_seed(run['run_id'], window['name'], 'bootstrap'),
+                workers=args.workers, weights=weights if run['lagged'] else None,
+            )
+            for area in outlook['areas']:
+                st = area['stability']
+                print(f"[{window['name']}] Area {area['index']}: {area['prob_window']:.0f}% "
+                      f"(5-95%: {st['prob_p05']:.0f}-{st['prob_p95']:.0f}%, persistence {st['persistence']:.2f})")
+        if not args.no_history:
+            track_areas(outlook, run, args.history_dir)
+        write_geojson(os.path.join(VECTOR_DIR, f"areas_{window['name']}.geojson"), areas_to_geojson(outlook, run))
+        if args.tiles:
+            density = genesis_density_grid(outlook)
+            layer_dir = os.path.join(TILE_DIR, f"genesis_{window['name']}")
+            if density is None:
+                remove_layer(layer_dir)
+            else:
+                export_tiles(*density, layer_dir, LAYER_STYLES['density'], run=run, workers=args.workers)
+        for region in regions:
+            if render_outlook(outlook, run, tiles, atcf_systems, region=region) is None:
+                failed = True
+        print(f"Summary [{window['name']}]: Density areas computed from {outlook['num_points']} "
+              f"genesis points with {len(outlook['areas'])} clusters.")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
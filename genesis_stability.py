@@ -0,0 +1,125 @@
+"""
+Bootstrap stability of development areas.
+
+Ensemble members are resampled with replacement and genesis clustering is
+re-run for every resample. Each resample is just a weight vector over the
+window's genesis points (how often each point's member was drawn), so the
+eps-neighbourhood graph is built once and every DBSCAN re-run works on a
+slice of it. Resamples are split across a process pool.
+
+For each area of the base outlook this reports how often the area persists
+(a majority of its drawn points fall into one resampled cluster) and the
+spread of its probability over the resamples.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sklearn.cluster import DBSCAN
+from sklearn.neighbors import NearestNeighbors
+
+DEFAULT_RESAMPLES = 200
+
+# Share of an area's drawn points that must land in one resampled cluster
+PERSISTENCE_SHARE = 0.5
+
+
+def _bootstrap_chunk(graph, point_member, base_labels, area_labels, counts, num_samples, eps, min_samples):
+    """
+    Cluster one chunk of resamples.
+
+    counts is (n_resamples, n_members) draw counts. Returns (persist, probs),
+    both (n_resamples, n_areas); probs are percentages.
+    """
+    n_resamples = counts.shape[0]
+    persist = np.zeros((n_resamples, len(area_labels)), dtype=bool)
+    probs = np.zeros((n_resamples, len(area_labels)))
+
+    for b in range(n_resamples):
+        weights = counts[b][point_member]
+        keep = np.flatnonzero(weights > 0)
+        labels = np.full(len(point_member), -1)
+        if len(keep):
+            db = DBSCAN(eps=eps, min_samples=min_samples, metric='precomputed')
+            labels[keep] = db.fit(graph[keep][:, keep], sample_weight=weights[keep]).labels_
+
+        for a, area_label in enumerate(area_labels):
+            in_area = (base_labels == area_label) & (weights > 0)
+            total = weights[in_area].sum()
+            if total == 0:
+                continue
+            hit = in_area & (labels >= 0)
+            if not hit.any():
+                continue
+            # Resampled cluster holding most of the area's (weighted) points
+            share = np.bincount(labels[hit], weights=weights[hit])
+            best = int(np.argmax(share))
+            if share[best] / total < PERSISTENCE_SHARE:
+                continue
+            persist[b, a] = True
+            members = np.unique(point_member[labels == best])
+            probs[b, a] = counts[b][members].sum() / num_samples * 100
+
+    return persist, probs
+
+
+def bootstrap_stability(outlook, members, n_resamples=DEFAULT_RESAMPLES, eps=4.0, min_samples=3,
+                        seed=0, workers=None, weights=None):
+    """
+    Resample ensemble members and measure how stable each area is.
+
+    outlook is the dict from genesis_outlook.compute_outlook(); members holds
+    every ensemble member id in the window's denominator (including members
+    without genesis). With weights (aligned with members, e.g. lagged-run age
+    weights) members are drawn in proportion to their weight. Results are
+    stored on each area as area['stability'] and the list of them is returned.
+    """
+    areas = outlook['areas']
+    points = outlook.get('points')
+    if not areas or points is None:
+        return []
+
+    members = np.asarray(members)
+    num_samples = len(members)
+    if weights is None:
+        draw_p = np.full(num_samples, 1.0 / num_samples)
+    else:
+        draw_p = np.asarray(weights, dtype=np.float64) / np.sum(weights)
+    # Index of each genesis point's member within `members`
+    order = np.argsort(members)
+    point_member = order[np.searchsorted(members[order], points['sample'])]
+
+    coords = np.column_stack((points['lon'], points['lat']))
+    graph = NearestNeighbors(radius=eps).fit(coords).radius_neighbors_graph(coords, mode='distance')
+
+    rng = np.random.default_rng(seed)
+    counts = rng.multinomial(num_samples, draw_p, size=n_resamples)
+
+    area_labels = [area['label'] for area in areas]
+    args = (graph, point_member, outlook['labels'], area_labels)
+    if workers is None:
+        workers = min(os.cpu_count() or 1, 8)
+
+    if workers > 1 and n_resamples >= 2 * workers:
+        chunks = np.array_split(counts, workers)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_bootstrap_chunk, *args, chunk, num_samples, eps, min_samples)
+                       for chunk in chunks]
+            results = [f.result() for f in futures]
+        persist = np.concatenate([r[0] for r in results])
+        probs = np.concatenate([r[1] for r in results])
+    else:
+        persist, probs = _bootstrap_chunk(*args, counts, num_samples, eps, min_samples)
+
+    stability = []
+    for a, area in enumerate(areas):
+        low, median, high = np.percentile(probs[:, a], [5, 50, 95])
+        area['stability'] = {
+            'resamples': int(n_resamples),
+            'persistence': float(persist[:, a].mean()),
+            'prob_p05': float(low),
+            'prob_p50': float(median),
+            'prob_p95': float(high),
+        }
+        stability.append(area['stability'])
+    return stability
@@ -0,0 +1,221 @@
+"""
+Intensity uncertainty per storm (track_id) and lead time.
+
+Members are stacked per track_id (ensemble_tracks.group_members) and the
+10/25/50/75/90th percentiles of minimum pressure and maximum wind are taken
+with one nanquantile reduction over the member axis. The same stacked arrays
+give the probability of reaching each pressure band drawn on the track maps
+and each wind-based stage used by the outlook, or stronger: the share of
+members with a value at that lead (pressure and wind counted separately) in
+that category or a stronger one.
+
+    python intensity_quantiles.py           # JSON + fan chart
+"""
+import argparse
+import json
+import os
+import sys
+import warnings
+
+import matplotlib.pyplot as plt
+import numpy as np
+
+from ensemble_tracks import build_track_arrays, group_members
+from fnv3_ingest import load_latest_run_or_exit
+from publish import save_figure, write_if_changed
+
+QUANTILES = [0.10, 0.25, 0.50, 0.75, 0.90]
+
+DEFAULT_MAX_LEAD_HOURS = 360
+
+# Pressure bands of get_pressure_color() in Forcast.py / Forcast2.py:
+# < 920, 920-945, 945-970, 970-990, 990-1005, > 1005 hPa (upper edges inclusive)
+PRESSURE_BANDS = [
+    {'label': 'Super Typhoon', 'range': '< 920 hPa', 'color': '#5B0E2D'},
+    {'label': 'Typhoon', 'range': '920–945 hPa', 'color': '#A83232'},
+    {'label': 'Severe Tropical Storm', 'range': '945–970 hPa', 'color': '#E67E22'},
+    {'label': 'Tropical Storm', 'range': '970–990 hPa', 'color': '#F1C40F'},
+    {'label': 'Tropical Depression', 'range': '990–1005 hPa', 'color': '#2ECC71'},
+    {'label': 'Low Pressure Area', 'range': '> 1005 hPa', 'color': '#3498DB'},
+]
+PRESSURE_UPPER_EDGES = [945, 970, 990, 1005]
+
+# Wind stages of classify_tc_stage() in genesis_outlook.py (lower edges, kt)
+WIND_STAGES = [
+    'Disturbance / LPA', 'Low Pressure Area', 'Tropical Depression',
+    'Tropical Storm', 'Severe Tropical Storm', 'Typhoon',
+]
+WIND_LOWER_EDGES = [20, 25, 34, 48, 64]
+
+# Tracks shown in the fan chart, largest member count first
+MAX_PLOTTED_TRACKS = 6
+
+OUTPUT_DIR = "public/assets"
+JSON_PATH = "public/data/intensity_quantiles.json"
+
+
+def pressure_band_index(pressure):
+    """Index into PRESSURE_BANDS for each pressure (NaN -> -1)."""
+    p = np.asarray(pressure, dtype=np.float64)
+    idx = np.where(p < 920, 0, np.searchsorted(PRESSURE_UPPER_EDGES, p, side='left') + 1)
+    return np.where(np.isnan(p), -1, idx)
+
+
+def wind_stage_index(wind):
+    """Index into WIND_STAGES for each wind (NaN -> -1)."""
+    w = np.asarray(wind, dtype=np.float64)
+    return np.where(np.isnan(w), -1, np.searchsorted(WIND_LOWER_EDGES, w, side='right'))
+
+
+def _at_or_stronger_probabilities(index, n_bands, count, strongest_first):
+    """
+    (n_bands, n_tracks, n_leads) probability of each band or a stronger one.
+
+    index is (n_tracks, n_members, n_leads) with -1 for missing values and
+    count the members with a value; strongest_first gives the band order.
+    """
+    in_band = np.stack([(index == b).sum(axis=1) for b in range(n_bands)])
+    if strongest_first:
+        at_or_stronger = np.cumsum(in_band, axis=0)
+    else:
+        at_or_stronger = np.cumsum(in_band[::-1], axis=0)[::-1]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return at_or_stronger / count
+
+
+def intensity_quantiles(tracks, quantiles=QUANTILES):
+    """
+    Quantiles and category probabilities per (track_id, lead time).
+
+    Returns a dict with pressure_q / wind_q shaped (n_quantiles, n_tracks,
+    n_leads), pressure_prob (n_pressure_bands, n_tracks, n_leads) and
+    wind_prob (n_wind_stages, n_tracks, n_leads) at-or-stronger
+    probabilities, count and pressure_count (n_tracks, n_leads) members with
+    a wind / pressure value, plus track_ids, members and lead_hours.
+    """
+    grouped, sizes = group_members(tracks, names=('pressure', 'wind'))
+    count = np.sum(~np.isnan(grouped['wind']), axis=1)
+    pressure_count = np.sum(~np.isnan(grouped['pressure']), axis=1)
+
+    with warnings.catch_warnings():
+        # Leads where a track has no members are all-NaN slices
+        warnings.simplefilter('ignore', RuntimeWarning)
+        pressure_q = np.nanquantile(grouped['pressure'], quantiles, axis=1)
+        wind_q = np.nanquantile(grouped['wind'], quantiles, axis=1)
+
+    return {
+        'track_ids': tracks['track_ids'],
+        'members': sizes,
+        'lead_hours': tracks['lead_hours'],
+        'quantiles': list(quantiles),
+        'count': count,
+        'pressure_count': pressure_count,
+        'pressure_q': pressure_q,
+        'wind_q': wind_q,
+        # PRESSURE_BANDS run strongest first, WIND_STAGES weakest first
+        'pressure_prob': _at_or_stronger_probabilities(pressure_band_index(grouped['pressure']), len(PRESSURE_BANDS),
+                                                       pressure_count, strongest_first=True),
+        'wind_prob': _at_or_stronger_probabilities(wind_stage_index(grouped['wind']), len(WIND_STAGES), count,
+                                                   strongest_first=False),
+    }
+
+
+def _rounded(values, digits):
+    return [None if np.isnan(v) else round(float(v), digits) for v in values]
+
+
+def quantiles_to_json(result, run):
+    """Compact JSON-able dict: one entry per track_id, arrays over lead time."""
+    names = [f"p{int(q * 100):02d}" for q in result['quantiles']]
+    tracks = []
+    for g, track_id in enumerate(result['track_ids']):
+        keep = result['count'][g] > 0
+        if not keep.any():
+            continue
+        tracks.append({
+            'track_id': str(track_id),
+            'members': int(result['members'][g]),
+            'lead_hours': [int(h) for h in result['lead_hours'][keep]],
+            'count': [int(c) for c in result['count'][g][keep]],
+            'pressure_count': [int(c) for c in result['pressure_count'][g][keep]],
+            'pressure_hpa': {n: _rounded(result['pressure_q'][qi, g][keep], 1) for qi, n in enumerate(names)},
+            'wind_kt': {n: _rounded(result['wind_q'][qi, g][keep], 1) for qi, n in enumerate(names)},
+            # Probability of the category or a stronger one
+            'pressure_band_prob': {band['label']: _rounded(result['pressure_prob'][b, g][keep], 3)
+                                   for b, band in enumerate(PRESSURE_BANDS)},
+            'wind_stage_prob': {stage: _rounded(result['wind_prob'][s, g][keep], 3)
+                                for s, stage in enumerate(WIND_STAGES)},
+        })
+    return {
+        'run_id': run['run_id'],
+        'init_utc': run['init_utc'].strftime("%Y-%m-%dT%H:%M:%SZ"),
+        'quantiles': names,
+        'tracks': tracks,
+    }
+
+
+def render_intensity_chart(result, run, output_dir=OUTPUT_DIR, max_tracks=MAX_PLOTTED_TRACKS):
+    """Wind fan chart (10-90 / 25-75 / median) for the best-sampled tracks."""
+    order = [g for g in np.argsort(-result['members'], kind='stable') if result['count'][g].any()][:max_tracks]
+    if not order:
+        print("No tracks to plot")
+        return None
+
+    cols = min(3, len(order))
+    rows = int(np.ceil(len(order) / cols))
+    fig, axes = plt.subplots(rows, cols, figsize=(5 * cols, 3.5 * rows), squeeze=False, sharey=True)
+    hours = result['lead_hours']
+    for ax, g in zip(axes.ravel(), order):
+        q = result['wind_q'][:, g]
+        ax.fill_between(hours, q[0], q[4], color='#F1C40F', alpha=0.35, linewidth=0, label='10–90%')
+        ax.fill_between(hours, q[1], q[3], color='#E67E22', alpha=0.55, linewidth=0, label='25–75%')
+        ax.plot(hours, q[2], color='#A83232', linewidth=2, label='Median')
+        for edge in WIND_LOWER_EDGES[2:]:
+            ax.axhline(edge, color='gray', linewidth=0.6, linestyle='--')
+        ax.set_title(f"Track {result['track_ids'][g]} ({int(result['members'][g])} members)",
+                     fontsize=11, weight='bold')
+        ax.set_xlabel("Lead time (h)")
+        ax.grid(alpha=0.3)
+    for ax in axes[:, 0]:
+        ax.set_ylabel("Max sustained wind (kt)")
+    for ax in axes.ravel()[len(order):]:
+        ax.set_visible(False)
+    axes[0, 0].legend(loc='upper left', fontsize=8)
+    fig.suptitle(
+        f"Ensemble Intensity Distribution - Runtime: {run.get('init_text') or 'Runtime unavailable'}",
+        fontsize=14, weight='bold'
+    )
+    fig.tight_layout()
+
+    output_file = os.path.join(output_dir, f"tropical_cyclone_intensity_{run['file_stamp']}.png")
+    try:
+        digest, written = save_figure(fig, output_file, dpi=150, product='intensity', run=run)
+        if written:
+            print(f"Plot saved to {output_file} (sha256 {digest[:12]})")
+    except Exception as e:
+        print(f"Error saving plot: {str(e)}")
+        output_file = None
+    plt.close(fig)
+    return output_file
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Intensity quantiles per track_id and lead time.")
+    parser.add_argument('--max-lead-hours', type=int, default=DEFAULT_MAX_LEAD_HOURS)
+    parser.add_argument('--no-plot', action='store_true', help="Only write the JSON")
+    args = parser.parse_args(argv)
+
+    data, run = load_latest_run_or_exit()
+    tracks = build_track_arrays(data, args.max_lead_hours)
+    result = intensity_quantiles(tracks)
+
+    payload = quantiles_to_json(result, run)
+    write_if_changed(JSON_PATH, (json.dumps(payload, separators=(',', ':')) + "\n").encode("utf-8"))
+    print(f"Intensity quantiles for {len(payload['tracks'])} track_ids written to {JSON_PATH}")
+
+    if not args.no_plot and payload['tracks'] and render_intensity_chart(result, run) is None:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""
+Landfall detection for every ensemble member.
+
+Natural Earth land polygons (clipped to the map domain plus a margin) go
+into a shapely STRtree. All valid member track segments are built as one
+array of LineStrings and queried against the tree in bulk; only segments
+that touch land are intersected, and every point where a segment enters land
+from the sea is a landfall. Only landfalls inside the domain are kept, so
+the edges of the clip box, which are not coastline, never count. Landfall
+points are matched to the nearest Philippine province (Natural Earth
+admin-1) with a second tree.
+
+Outputs public/data/landfall.json: the landfall events (member, time, place,
+intensity) and the probability of at least one landfall per province.
+
+    python landfall.py --max-lead-hours 120
+
+Natural Earth shapefiles are fetched and cached by cartopy on first use and
+read from the cache afterwards.
+"""
+import argparse
+import json
+import sys
+
+import cartopy.io.shapereader as shpreader
+import numpy as np
+import shapely
+from shapely.geometry import box
+
+from ensemble_tracks import build_track_arrays, valid_segments
+from fnv3_ingest import load_latest_run_or_exit
+from map_common import CLIP_MARGIN_DEG, MAP_EXTENT, in_extent
+from publish import write_if_changed
+
+DEFAULT_MAX_LEAD_HOURS = 120
+LAND_RESOLUTION = '10m'
+
+PROVINCE_COUNTRY = 'Philippines'
+# Landfall points farther than this (degrees) from every province are left unassigned
+PROVINCE_MAX_DISTANCE_DEG = 0.25
+
+# Entries closer than this to the segment start are the start point itself
+START_TOLERANCE = 1e-9
+
+JSON_PATH = "public/data/landfall.json"
+
+
+def load_land_polygons(extent=MAP_EXTENT, resolution=LAND_RESOLUTION, margin=CLIP_MARGIN_DEG):
+    """
+    Natural Earth land polygons near extent (array of Polygons).
+
+    Polygons are clipped to extent widened by margin degrees; the clip
+    edges are not coastline, and find_landfalls() drops crossings outside
+    extent, so none of them falls on such an edge.
+    """
+    path = shpreader.natural_earth(resolution=resolution, category='physical', name='land')
+    domain = box(extent[0] - margin, extent[2] - margin, extent[1] + margin, extent[3] + margin)
+    geoms = np.array(list(shpreader.Reader(path).geometries()), dtype=object)
+    geoms = shapely.intersection(geoms[shapely.intersects(geoms, domain)], domain)
+    polygons = shapely.get_parts(geoms)
+    polygons = polygons[shapely.get_type_id(polygons) == 3]
+    shapely.prepare(polygons)
+    return polygons
+
+
+def load_provinces(country=PROVINCE_COUNTRY, resolution=LAND_RESOLUTION):
+    """(names, geometries) of the Natural Earth admin-1 units of one country."""
+    path = shpreader.natural_earth(resolution=resolution, category='cultural', name='admin_1_states_provinces')
+    names, geoms = [], []
+    for record in shpreader.Reader(path).records():
+        if record.attributes.get('admin') == country:
+            names.append(record.attributes.get('name'))
+            geoms.append(record.geometry)
+    geoms = np.array(geoms, dtype=object)
+    shapely.prepare(geoms)
+    return names, geoms
+
+
+def find_landfalls(tracks, land, max_lead_hours=DEFAULT_MAX_LEAD_HOURS, extent=MAP_EXTENT):
+    """
+    Every sea-to-land crossing of every member track inside extent.
+
+    tracks is the dict from ensemble_tracks.build_track_arrays() and land an
+    array of polygons (load_land_polygons(), clipped beyond extent). Returns a dict of equal-length
+    arrays, one entry per landfall sorted by member then time: member, lon,
+    lat, lead (hours, interpolated along the segment), wind and pressure
+    (interpolated), and first (True for each member's first landfall).
+    """
+    keep_leads = tracks['lead_hours'] <= max_lead_hours
+    lead_hours = tracks['lead_hours'][keep_leads].astype(np.float64)
+    lon = tracks['lon'][:, keep_leads].astype(np.float64)
+    lat = tracks['lat'][:, keep_leads].astype(np.float64)
+    rows, cols = np.nonzero(valid_segments({'lon': lon, 'lat': lat}))
+
+    names = ['member', 'lon', 'lat', 'lead', 'wind', 'pressure', 'first']
+    empty = {name: np.empty(0, dtype=bool if name == 'first' else np.float64) for name in names}
+    if len(rows) == 0 or len(land) == 0:
+        return empty
+
+    coords = np.stack([
+        np.stack([lon[rows, cols], lat[rows, cols]], axis=-1),
+        np.stack([lon[rows, cols + 1], lat[rows, cols + 1]], axis=-1),
+    ], axis=1)
+    lines = shapely.linestrings(coords)
+
+    # Bulk candidate search, then exact intersection only for touching pairs
+    seg, poly = shapely.STRtree(land).query(lines, predicate='intersects')
+    if len(seg) == 0:
+        return empty
+    parts, part_pair = shapely.get_parts(shapely.intersection(lines[seg], land[poly]), return_index=True)
+    is_line = shapely.get_type_id(parts) == 1
+    parts, part_pair = parts[is_line], part_pair[is_line]
+
+    # Each over-land piece starts where the segment enters that polygon
+    # (the end nearer the segment start; overlay does not promise direction)
+    seg = seg[part_pair]
+    ends = np.stack([shapely.get_point(parts, 0), shapely.get_point(parts, -1)])
+    end_fraction = shapely.line_locate_point(lines[seg], ends, normalized=True)
+    nearer = np.argmin(end_fraction, axis=0)
+    entry = np.take_along_axis(ends, nearer[None], axis=0)[0]
+    fraction = np.take_along_axis(end_fraction, nearer[None], axis=0)[0]
+    # A piece starting at the segment start is land the track was already
+    # over (its entry belongs to the previous segment)
+    crossing = fraction > START_TOLERANCE
+    # Entries outside extent include those on the clip edges of the land polygons
+    xy = shapely.get_coordinates(entry)
+    crossing &= in_extent(xy[:, 0], xy[:, 1], extent)
+    seg, fraction, entry = seg[crossing], fraction[crossing], entry[crossing]
+
+    r, c = rows[seg], cols[seg]
+    lead = lead_hours[c] + (lead_hours[c + 1] - lead_hours[c]) * fraction
+    order = np.lexsort((lead, r))
+    r, c, fraction, lead, entry = r[order], c[order], fraction[order], lead[order], entry[order]
+
+    def interpolate(values):
+        start = values[r, c].astype(np.float64)
+        return start + (values[r, c + 1] - start) * fraction
+
+    first = np.ones(len(r), dtype=bool)
+    first[1:] = r[1:] != r[:-1]
+    xy = shapely.get_coordinates(entry)
+    return {
+        'member': r,
+        'lon': xy[:, 0],
+        'lat': xy[:, 1],
+        'lead': lead,
+        'wind': interpolate(tracks['wind'][:, keep_leads]),
+        'pressure': interpolate(tracks['pressure'][:, keep_leads]),
+        'first': first,
+    }
+
+
+def assign_provinces(landfalls, province_geoms, max_distance=PROVINCE_MAX_DISTANCE_DEG):
+    """Index of the nearest province for each landfall point (-1 when none is close)."""
+    province = np.full(len(landfalls['lon']), -1, dtype=np.int64)
+    if len(province) == 0 or len(province_geoms) == 0:
+        return province
+    points = shapely.points(landfalls['lon'], landfalls['lat'])
+    point_index, geom_index = shapely.STRtree(province_geoms).query_nearest(
+        points, max_distance=max_distance, all_matches=False
+    )
+    province[point_index] = geom_index
+    return province
+
+
+def province_probabilities(landfalls, province, tracks, n_provinces):
+    """Share of ensemble samples with at least one landfall in each province."""
+    num_samples = max(len(tracks['samples']), 1)
+    ok = province >= 0
+    sample = tracks['sample_index'][landfalls['member'][ok].astype(np.int64)]
+    keys = np.unique(province[ok] * num_samples + sample)
+    return np.bincount(keys // num_samples, minlength=n_provinces) / num_samples
+
+
+def landfall_to_json(landfalls, province, province_names, probability, tracks, run, max_lead_hours):
+    """Landfall events plus the per-province probabilities (non-zero only)."""
+    num_samples = max(len(tracks['samples']), 1)
+    members = landfalls['member'].astype(np.int64)
+    first_samples = np.unique(tracks['sample_index'][members[landfalls['first']]]) if len(members) else []
+    events = []
+    for k in range(len(members)):
+        m = members[k]
+        events.append({
+            'track_id': str(tracks['track_ids'][tracks['track_index'][m]]),
+            'sample': int(tracks['samples'][tracks['sample_index'][m]]),
+            'first': bool(landfalls['first'][k]),
+            'lead_hours': round(float(landfalls['lead'][k]), 1),
+            'lon': round(float(landfalls['lon'][k]), 3),
+            'lat': round(float(landfalls['lat'][k]), 3),
+            'wind_kt': None if np.isnan(landfalls['wind'][k]) else round(float(landfalls['wind'][k]), 1),
+            'pressure_hpa': None if np.isnan(landfalls['pressure'][k]) else round(float(landfalls['pressure'][k]), 1),
+            'province': province_names[province[k]] if province[k] >= 0 else None,
+        })
+    provinces = {
+        province_names[i]: round(float(probability[i]), 3)
+        for i in np.argsort(-probability, kind='stable') if probability[i] > 0
+    }
+    return {
+        'run_id': run['run_id'],
+        'init_utc': run['init_utc'].strftime("%Y-%m-%dT%H:%M:%SZ"),
+        'max_lead_hours': max_lead_hours,
+        'num_samples': int(num_samples),
+        'landfall_probability': round(len(first_samples) / num_samples, 3),
+        'province_probability': provinces,
+        'events': events,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ensemble landfall points and province probabilities.")
+    parser.add_argument('--max-lead-hours', type=int, default=DEFAULT_MAX_LEAD_HOURS)
+    args = parser.parse_args(argv)
+
+    try:
+        land = load_land_polygons()
+        province_names, province_geoms = load_provinces()
+    except Exception as e:
+        print(f"Error loading Natural Earth data: {str(e)}")
+        sys.exit(1)
+
+    data, run = load_latest_run_or_exit()
+    tracks = build_track_arrays(data, args.max_lead_hours)
+    landfalls = find_landfalls(tracks, land, args.max_lead_hours)
+    province = assign_provinces(landfalls, province_geoms)
+    probability = province_probabilities(landfalls, province, tracks, len(province_names))
+
+    payload = landfall_to_json(landfalls, province, province_names, probability, tracks, run, args.max_lead_hours)
+    write_if_changed(JSON_PATH, (json.dumps(payload, separators=(',', ':')) + "\n").encode("utf-8"))
+    print(f"{len(payload['events'])} landfalls, {len(payload['province_probability'])} provinces "
+          f"affected; written to {JSON_PATH}")
+
+
+if __name__ == "__main__":
+    main()
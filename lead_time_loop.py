@@ -0,0 +1,296 @@
+"""
+Animated lead-time loops of the ensemble tracks and genesis points.
+
+The figure and basemap (features, gridlines, PAR, tiles) are drawn once and
+the rendered background is cached. Every frame restores that background and
+only redraws a few persistent animated artists (track trail LineCollection,
+position scatter, time label) whose data is updated in place, i.e. the same
+blitting FuncAnimation uses on screen. Trails only grow, so each frame draws
+just its new segments into the cached background. The RGBA frame buffers go straight
+to the encoder, piped into ffmpeg (H.264 MP4, or libwebp for animated WebP),
+so no frame is kept or written as an intermediate PNG. Without a libwebp
+ffmpeg, Pillow encodes WebP from frames buffered in memory, up to
+MAX_PILLOW_BUFFER_BYTES.
+
+    python lead_time_loop.py --product tracks --format mp4
+    python lead_time_loop.py --product genesis --format webp --step 12
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import timedelta
+
+import matplotlib as mpl
+import matplotlib.pyplot as plt
+import cartopy.crs as ccrs
+import cartopy.io.img_tiles as cimgt
+import numpy as np
+from matplotlib.collections import LineCollection
+from matplotlib.colors import to_rgba_array
+
+from ensemble_tracks import build_track_arrays, valid_segments
+from fnv3_ingest import load_latest_run_or_exit
+from genesis_outlook import extract_genesis_points
+from intensity_quantiles import PRESSURE_BANDS, pressure_band_index
+from map_common import setup_plain_map, setup_satellite_map
+from publish import record_product
+
+DEFAULT_MAX_LEAD_HOURS = 360
+DEFAULT_STEP_HOURS = 6
+DEFAULT_FPS = 8
+
+# Genesis points younger than this (hours) are drawn highlighted
+RECENT_GENESIS_HOURS = 24
+
+# RGB frames Pillow may hold for a WebP loop when ffmpeg cannot encode it
+MAX_PILLOW_BUFFER_BYTES = 1024 * 2**20
+
+OUTPUT_DIR = "public/assets"
+
+PRESSURE_RGBA = to_rgba_array([band['color'] for band in PRESSURE_BANDS])
+
+
+def frame_leads(lead_hours, max_lead_hours, step_hours):
+    """Lead hours of each frame: multiples of step_hours present in lead_hours."""
+    leads = np.asarray(lead_hours)
+    return leads[(leads <= max_lead_hours) & (leads % step_hours == 0)]
+
+
+def add_time_label(ax):
+    return ax.text(
+        0.02, 0.02, "", transform=ax.transAxes, fontsize=13, weight='bold', animated=True, zorder=30,
+        bbox=dict(facecolor='white', alpha=0.85, edgecolor='black', boxstyle='round,pad=0.3')
+    )
+
+
+def time_label_text(run, lead):
+    valid = run['init_ph'] + timedelta(hours=int(lead))
+    return f"+{int(lead):03d} h   Valid: {valid.strftime('%b %d %I:%M %p').replace(' 0', ' ')} PHT"
+
+
+def track_artists(tracks, run, frames, ax):
+    """
+    Persistent artists for member trails and current positions.
+
+    Returns update(k), which sets the data of frame k in place and returns
+    (accumulate, overlay): artists to add to the background for good (the
+    trail segments new in this frame) and artists drawn on this frame only.
+    """
+    lon, lat, pressure = tracks['lon'], tracks['lat'], tracks['pressure']
+    rows, cols = np.nonzero(valid_segments(tracks))
+    # Segments ordered by end lead: frame k shows a prefix of this array
+    order = np.argsort(cols, kind='stable')
+    rows, cols = rows[order], cols[order]
+    segments = np.stack([
+        np.column_stack([lon[rows, cols], lat[rows, cols]]),
+        np.column_stack([lon[rows, cols + 1], lat[rows, cols + 1]]),
+    ], axis=1)
+    lead_index = np.searchsorted(tracks['lead_hours'], frames)
+    visible = np.searchsorted(cols + 1, lead_index, side='right')
+
+    trails = LineCollection([], colors='#404040', linewidths=1.0, alpha=0.35, animated=True,
+                            transform=ccrs.PlateCarree(), zorder=10)
+    ax.add_collection(trails)
+    positions = ax.scatter([], [], s=30, edgecolors='white', linewidths=0.6, animated=True,
+                           transform=ccrs.PlateCarree(), zorder=20)
+    label = add_time_label(ax)
+
+    def update(k):
+        t = lead_index[k]
+        trails.set_segments(segments[visible[k - 1] if k else 0:visible[k]])
+        here = ~np.isnan(lon[:, t]) & ~np.isnan(lat[:, t])
+        positions.set_offsets(np.column_stack([lon[here, t], lat[here, t]]))
+        bands = pressure_band_index(pressure[here, t])
+        positions.set_facecolors(PRESSURE_RGBA[np.where(bands < 0, len(PRESSURE_BANDS) - 1, bands)])
+        label.set_text(time_label_text(run, frames[k]))
+        return (trails,), (positions, label)
+
+    return update
+
+
+def genesis_artists(genesis, run, frames, ax):
+    """Persistent artists for genesis points accumulating with lead time; returns update(k) as above."""
+    order = np.argsort(genesis['lead'], kind='stable')
+    xy = np.column_stack([genesis['lon'][order], genesis['lat'][order]])
+    lead = genesis['lead'][order]
+    visible = np.searchsorted(lead, frames, side='right')
+    recent_rgba = to_rgba_array(['#FF3B30'])
+    older_rgba = to_rgba_array(['#FFD60A'])
+
+    points = ax.scatter([], [], s=22, edgecolors='black', linewidths=0.4, animated=True,
+                        transform=ccrs.PlateCarree(), zorder=20)
+    label = add_time_label(ax)
+
+    def update(k):
+        n = visible[k]
+        points.set_offsets(xy[:n])
+        recent = lead[:n] > frames[k] - RECENT_GENESIS_HOURS
+        points.set_facecolors(np.where(recent[:, None], recent_rgba, older_rgba))
+        label.set_text(f"Genesis points: {n}   " + time_label_text(run, frames[k]))
+        return (), (points, label)
+
+    return update
+
+
+def iter_frames(fig, update, n_frames):
+    """
+    Yield each frame as an (height, width, 4) uint8 RGBA array.
+
+    The figure is drawn once without the animated artists and that
+    background is restored for every frame, so only the artists returned by
+    update(k) are rasterized again; accumulating artists are folded into the
+    background. The yielded array is the canvas buffer itself and is
+    overwritten by the next frame.
+    """
+    canvas = fig.canvas
+    canvas.draw()
+    background = canvas.copy_from_bbox(fig.bbox)
+    for k in range(n_frames):
+        canvas.restore_region(background)
+        accumulate, overlay = update(k)
+        if accumulate:
+            for artist in accumulate:
+                fig.draw_artist(artist)
+            background = canvas.copy_from_bbox(fig.bbox)
+        for artist in overlay:
+            fig.draw_artist(artist)
+        yield np.asarray(canvas.buffer_rgba())
+
+
+def ffmpeg_available(encoder=None):
+    """True when ffmpeg runs (and, if given, was built with the named encoder)."""
+    try:
+        result = subprocess.run([mpl.rcParams['animation.ffmpeg_path'], '-hide_banner', '-encoders'],
+                                capture_output=True, check=True, text=True)
+    except (OSError, subprocess.CalledProcessError):
+        return False
+    return encoder is None or f" {encoder} " in result.stdout
+
+
+def encode_ffmpeg(frames, path, fps, size, output_args):
+    """Stream raw RGBA frames into ffmpeg's stdin, encoded with output_args."""
+    width, height = size
+    cmd = [
+        mpl.rcParams['animation.ffmpeg_path'], '-y', '-loglevel', 'error',
+        '-f', 'rawvideo', '-pix_fmt', 'rgba', '-s', f"{width}x{height}", '-r', str(fps), '-i', '-',
+    ] + output_args + [path]
+    proc = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+    try:
+        for frame in frames:
+            proc.stdin.write(frame.tobytes())
+    finally:
+        proc.stdin.close()
+        if proc.wait() != 0:
+            raise RuntimeError(f"ffmpeg exited with status {proc.returncode}")
+
+
+def encode_mp4(frames, path, fps, size):
+    """H.264 MP4 through ffmpeg."""
+    # libx264 needs even dimensions
+    encode_ffmpeg(frames, path, fps, size, [
+        '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2', '-c:v', 'libx264', '-pix_fmt', 'yuv420p', '-f', 'mp4',
+    ])
+
+
+def encode_webp(frames, path, fps, size, max_buffer_bytes=MAX_PILLOW_BUFFER_BYTES):
+    """
+    Animated WebP, streamed through ffmpeg's libwebp_anim encoder when available.
+
+    Otherwise Pillow encodes it, which needs every frame in memory as an RGB
+    image before saving; that buffer is capped at max_buffer_bytes (raise
+    --step or lower --dpi for a longer loop).
+    """
+    if ffmpeg_available('libwebp_anim'):
+        encode_ffmpeg(frames, path, fps, size, [
+            '-c:v', 'libwebp_anim', '-pix_fmt', 'yuv420p', '-quality', '80', '-loop', '0', '-f', 'webp',
+        ])
+        return
+
+    from PIL import Image
+
+    images, buffered = [], 0
+    for frame in frames:
+        buffered += frame[..., :3].nbytes
+        if buffered > max_buffer_bytes:
+            raise RuntimeError(f"WebP loop exceeds {max_buffer_bytes / 2**20:.0f} MiB of frames for Pillow; "
+                               "install ffmpeg with libwebp or use fewer frames")
+        images.append(Image.fromarray(frame[..., :3].copy()))
+    images[0].save(path, format='WEBP', save_all=True, append_images=images[1:],
+                   duration=int(1000 / fps), loop=0, quality=80)
+
+
+def save_loop(fig, update, n_frames, path, fmt, fps):
+    """
+    Encode the frames to a temporary file next to path, then rename into place.
+
+    As in publish.write_bytes_atomic, the temporary file (.<name>.*.tmp) is
+    removed when encoding fails, so a truncated loop is never published.
+    """
+    if fmt != 'webp' and not ffmpeg_available():
+        raise RuntimeError("ffmpeg is not available for MP4 output")
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    os.close(fd)
+    try:
+        frames = iter_frames(fig, update, n_frames)
+        if fmt == 'webp':
+            encode_webp(frames, tmp_path, fps, fig.canvas.get_width_height())
+        else:
+            encode_mp4(frames, tmp_path, fps, fig.canvas.get_width_height())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Animated lead-time loop from the latest FNV3 run.")
+    parser.add_argument('--product', choices=['tracks', 'genesis'], default='tracks')
+    parser.add_argument('--format', choices=['mp4', 'webp'], default='mp4')
+    parser.add_argument('--max-lead-hours', type=int, default=DEFAULT_MAX_LEAD_HOURS)
+    parser.add_argument('--step', type=int, default=DEFAULT_STEP_HOURS, help="Hours between frames")
+    parser.add_argument('--fps', type=int, default=DEFAULT_FPS)
+    parser.add_argument('--dpi', type=int, default=100)
+    args = parser.parse_args(argv)
+
+    data, run = load_latest_run_or_exit()
+
+    if args.product == 'tracks':
+        tracks = build_track_arrays(data, args.max_lead_hours)
+        frames = frame_leads(tracks['lead_hours'], args.max_lead_hours, args.step)
+        fig, ax = setup_plain_map()
+        update = track_artists(tracks, run, frames, ax)
+        title = f"{args.max_lead_hours // 24}-Day Ensemble Tracks by Lead Time - Western Pacific"
+    else:
+        genesis = extract_genesis_points(data, args.max_lead_hours)
+        frames = np.arange(0, args.max_lead_hours + 1, args.step)
+        fig, ax = setup_satellite_map(cimgt.GoogleTiles(style='satellite', cache=True))
+        update = genesis_artists(genesis, run, frames, ax)
+        title = f"{args.max_lead_hours // 24}-Day Ensemble Genesis Points by Lead Time - Western Pacific"
+    ax.set_title(f"{title}\nRuntime: {run.get('init_text') or 'Runtime unavailable'}", fontsize=14, weight='bold')
+    fig.set_dpi(args.dpi)
+
+    if len(frames) == 0:
+        print("No lead times to animate, exiting.")
+        sys.exit(1)
+
+    output_file = os.path.join(OUTPUT_DIR, f"tropical_cyclone_{args.product}_loop_{run['file_stamp']}.{args.format}")
+    try:
+        save_loop(fig, update, len(frames), output_file, args.format, args.fps)
+        print(f"Animation saved to {output_file} ({len(frames)} frames)")
+        width, height = fig.canvas.get_width_height()
+        record_product(f"{args.product}_loop", output_file, run, width=width, height=height)
+    except Exception as e:
+        print(f"Error saving animation: {str(e)}")
+        sys.exit(1)
+    finally:
+        plt.close(fig)
+
+
+if __name__ == "__main__":
+    main()
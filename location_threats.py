@@ -0,0 +1,215 @@
+"""
+Ensemble threat summary for the fixed locations shown on the site.
+
+Cities come from src/data/ph_locations.js and WMO stations from
+src/data/wmo_stations.js. All member tracks are densified once per run and
+every location is matched to the track points within SEARCH_RADIUS_KM in one
+batched KD-tree range query (unit vectors, chord distance). From those pairs
+each location gets:
+
+  - closest approach of the ensemble (nearest member, and median member)
+  - lead time of closest approach
+  - probability of a track passing within --radius-km by each lead time
+
+    python location_threats.py --radius-km 120 --windows 24 48 72 120
+"""
+import argparse
+import json
+import re
+import sys
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from ensemble_tracks import (
+    EARTH_RADIUS_KM, build_track_arrays, chord_for_km, densify_segments, to_unit_vectors, valid_segments,
+)
+from fnv3_ingest import load_latest_run_or_exit
+from publish import write_if_changed
+
+LOCATION_FILES = {
+    'city': "src/data/ph_locations.js",
+    'station': "src/data/wmo_stations.js",
+}
+
+DEFAULT_RADIUS_KM = 120.0
+DEFAULT_WINDOWS_HOURS = [24, 48, 72, 96, 120]
+
+# Track points farther than this from a location are never looked at
+SEARCH_RADIUS_KM = 1000.0
+
+# Densified point spacing along the tracks
+SPACING_KM = 10.0
+
+JSON_PATH = "public/data/location_threats.json"
+
+# { id: "manila", name: "Manila", lat: 14.5995, lon: 120.9842 }
+CITY_PATTERN = re.compile(
+    r'id:\s*"(?P<id>[^"]+)",\s*name:\s*"(?P<name>[^"]+)",\s*lat:\s*(?P<lat>-?[\d.]+),\s*lon:\s*(?P<lon>-?[\d.]+)'
+)
+# "98429": { name: "NAIA (Pasay)", lat: 14.5086, lon: 121.0194 }
+STATION_PATTERN = re.compile(
+    r'"(?P<id>\d+)":\s*\{\s*name:\s*"(?P<name>[^"]+)",\s*lat:\s*(?P<lat>-?[\d.]+),\s*lon:\s*(?P<lon>-?[\d.]+)'
+)
+
+
+def load_locations(files=LOCATION_FILES):
+    """Parse the frontend location tables into a list of dicts (id, name, kind, lat, lon)."""
+    patterns = {'city': CITY_PATTERN, 'station': STATION_PATTERN}
+    locations = []
+    for kind, path in files.items():
+        try:
+            with open(path, encoding="utf-8") as f:
+                text = f.read()
+        except OSError as e:
+            print(f"Error reading {path}: {str(e)}")
+            continue
+        for m in patterns[kind].finditer(text):
+            locations.append({
+                'id': m.group('id'),
+                'name': m.group('name'),
+                'kind': kind,
+                'lat': float(m.group('lat')),
+                'lon': float(m.group('lon')),
+            })
+    return locations
+
+
+def _first_per_key(keys, order_by, *values):
+    # Sort by (key, order_by) and keep the first row of each key
+    order = np.lexsort((order_by, keys))
+    keys = keys[order]
+    first = np.ones(len(keys), dtype=bool)
+    first[1:] = keys[1:] != keys[:-1]
+    return (keys[first], order_by[order][first]) + tuple(v[order][first] for v in values)
+
+
+def location_threats(tracks, locations, radius_km=DEFAULT_RADIUS_KM, windows=DEFAULT_WINDOWS_HOURS,
+                     search_radius_km=SEARCH_RADIUS_KM):
+    """
+    Closest approach and passage probability for every location.
+
+    tracks is the dict from ensemble_tracks.build_track_arrays(). Returns a
+    dict of arrays over locations: nearest_km / nearest_lead (closest member),
+    median_km (median over samples, NaN when most samples stay beyond
+    search_radius_km), median_lead (median lead of closest approach among
+    samples within search_radius_km), and probability shaped
+    (n_locations, len(windows)).
+    """
+    n_loc = len(locations)
+    num_samples = len(tracks['samples'])
+    windows = sorted(windows)
+
+    keep_leads = tracks['lead_hours'] <= windows[-1]
+    lead_hours = tracks['lead_hours'][keep_leads].astype(np.float64)
+    lon = tracks['lon'][:, keep_leads]
+    lat = tracks['lat'][:, keep_leads]
+    rows, cols = np.nonzero(valid_segments({'lon': lon, 'lat': lat}))
+
+    result = {
+        'nearest_km': np.full(n_loc, np.nan),
+        'nearest_lead': np.full(n_loc, np.nan),
+        'median_km': np.full(n_loc, np.nan),
+        'median_lead': np.full(n_loc, np.nan),
+        'probability': np.zeros((n_loc, len(windows))),
+        'windows': windows,
+        'num_samples': num_samples,
+    }
+    if n_loc == 0 or len(rows) == 0 or num_samples == 0:
+        return result
+
+    xyz, seg, frac = densify_segments(lon[rows, cols], lat[rows, cols],
+                                      lon[rows, cols + 1], lat[rows, cols + 1], SPACING_KM)
+    c = cols[seg]
+    point_lead = lead_hours[c] + (lead_hours[c + 1] - lead_hours[c]) * frac
+    point_sample = tracks['sample_index'][rows[seg]]
+
+    loc_xyz = to_unit_vectors([loc['lon'] for loc in locations], [loc['lat'] for loc in locations])
+    pairs = cKDTree(loc_xyz).sparse_distance_matrix(cKDTree(xyz), chord_for_km(search_radius_km),
+                                                    output_type='ndarray')
+    if len(pairs) == 0:
+        return result
+    loc_index, point = pairs['i'], pairs['j']
+    distance = 2.0 * EARTH_RADIUS_KM * np.arcsin(np.minimum(pairs['v'] / 2.0, 1.0))
+    keys = loc_index.astype(np.int64) * num_samples + point_sample[point]
+
+    # Closest approach per (location, sample)
+    near_keys, near_km, near_lead = _first_per_key(keys, distance, point_lead[point])
+    near_loc = near_keys // num_samples
+    for i in np.unique(near_loc):
+        sel = near_loc == i
+        best = np.argmin(near_km[sel])
+        result['nearest_km'][i] = near_km[sel][best]
+        result['nearest_lead'][i] = near_lead[sel][best]
+        result['median_lead'][i] = np.median(near_lead[sel])
+        # Samples that never come within search_radius_km count as infinitely far
+        per_sample = np.full(num_samples, np.inf)
+        per_sample[near_keys[sel] % num_samples] = near_km[sel]
+        median = np.median(per_sample)
+        if np.isfinite(median):
+            result['median_km'][i] = median
+
+    # Earliest lead within radius_km per (location, sample)
+    inside = distance <= radius_km
+    hit_keys, hit_lead = _first_per_key(keys[inside], point_lead[point][inside])
+    hit_loc = hit_keys // num_samples
+    for wi, end in enumerate(windows):
+        result['probability'][:, wi] = np.bincount(hit_loc[hit_lead <= end], minlength=n_loc) / num_samples
+
+    return result
+
+
+def _rounded(value, digits):
+    return None if np.isnan(value) else round(float(value), digits)
+
+
+def threats_to_json(result, locations, run, radius_km):
+    """JSON-able dict with one entry per location, keyed for direct lookup."""
+    entries = {}
+    for i, loc in enumerate(locations):
+        entries[f"{loc['kind']}:{loc['id']}"] = {
+            'name': loc['name'],
+            'kind': loc['kind'],
+            'lat': loc['lat'],
+            'lon': loc['lon'],
+            'nearest_km': _rounded(result['nearest_km'][i], 0),
+            'nearest_lead_hours': _rounded(result['nearest_lead'][i], 0),
+            'median_km': _rounded(result['median_km'][i], 0),
+            'median_lead_hours': _rounded(result['median_lead'][i], 0),
+            'probability': [round(float(p), 3) for p in result['probability'][i]],
+        }
+    return {
+        'run_id': run['run_id'],
+        'init_utc': run['init_utc'].strftime("%Y-%m-%dT%H:%M:%SZ"),
+        'radius_km': radius_km,
+        'search_radius_km': SEARCH_RADIUS_KM,
+        'windows_hours': list(result['windows']),
+        'num_samples': int(result['num_samples']),
+        'locations': entries,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Closest approach and passage probability for listed locations.")
+    parser.add_argument('--radius-km', type=float, default=DEFAULT_RADIUS_KM)
+    parser.add_argument('--windows', type=int, nargs='+', default=DEFAULT_WINDOWS_HOURS,
+                        help="Cumulative lead-time windows (hours)")
+    args = parser.parse_args(argv)
+
+    locations = load_locations()
+    if not locations:
+        print("No locations found, exiting.")
+        sys.exit(1)
+
+    data, run = load_latest_run_or_exit()
+    tracks = build_track_arrays(data, max(args.windows))
+    result = location_threats(tracks, locations, args.radius_km, args.windows)
+
+    payload = threats_to_json(result, locations, run, args.radius_km)
+    write_if_changed(JSON_PATH, (json.dumps(payload, separators=(',', ':')) + "\n").encode("utf-8"))
+    threatened = int((result['probability'][:, -1] > 0).sum())
+    print(f"Threats for {len(locations)} locations ({threatened} with a non-zero probability) written to {JSON_PATH}")
+
+
+if __name__ == "__main__":
+    main()
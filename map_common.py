@@ -0,0 +1,219 @@
+"""
+Map layout shared by every rendered product.
+
+Region presets (REGIONS, with MAP_EXTENT the Western Pacific default), grid
+axes and cropping, gridline spacing, the PAR boundary, Natural Earth features
+clipped to the drawn extent, and the plain (track) and satellite basemaps.
+Products import their extent and map setup from here, so all maps share one
+frame and style.
+"""
+from collections import OrderedDict
+from functools import lru_cache
+
+import matplotlib.pyplot as plt
+import cartopy.crs as ccrs
+import cartopy.feature as cfeature
+import numpy as np
+from matplotlib.path import Path
+from matplotlib.patches import PathPatch
+from shapely.geometry import box
+
+# Map regions, extent as [lon_min, lon_max, lat_min, lat_max]. Products
+# compute on the default region and crop for the others (which must lie
+# inside it); other regions get their name in output filenames.
+REGIONS = {
+    'wpac': {'title': "Western Pacific", 'extent': [105, 155, 0, 40]},
+    'par': {'title': "Philippine Area of Responsibility", 'extent': [112, 138, 3, 27]},
+    'luzon': {'title': "Luzon", 'extent': [115, 127, 11, 22]},
+    'visayas': {'title': "Visayas", 'extent': [118, 128, 7.5, 14.5]},
+    'mindanao': {'title': "Mindanao", 'extent': [118, 130, 3, 11]},
+}
+DEFAULT_REGION = 'wpac'
+
+# Western Pacific domain used by every product by default
+MAP_EXTENT = REGIONS[DEFAULT_REGION]['extent']
+
+# Gridline spacings (degrees) tried from finest; the first giving at most
+# MAX_GRIDLINES lines across the wider side of the extent is used
+GRIDLINE_STEPS = [1, 2, 5, 10]
+MAX_GRIDLINES = 10
+
+# Satellite tile zoom: ZOOMED_TILE_ZOOM for extents no wider than
+# ZOOMED_SPAN_DEG, else DEFAULT_TILE_ZOOM
+DEFAULT_TILE_ZOOM = 6
+ZOOMED_TILE_ZOOM = 7
+ZOOMED_SPAN_DEG = 15
+
+# Natural Earth geometries are clipped to the extent plus this margin (degrees)
+CLIP_MARGIN_DEG = 1.0
+
+# Stitched satellite images kept per tile source (one per extent and zoom)
+BASEMAP_CACHE_ENTRIES = 8
+
+# Philippine Area of Responsibility (PAR) boundary
+PAR_VERTICES = [
+    (115.0, 5.0), (115.0, 15.0), (120.0, 21.0), (120.0, 25.0),
+    (135.0, 25.0), (135.0, 5.0), (115.0, 5.0)
+]
+
+
+def in_extent(lons, lats, extent=MAP_EXTENT):
+    """Boolean mask of points inside extent (edges inclusive)."""
+    lon_min, lon_max, lat_min, lat_max = extent
+    return (lons >= lon_min) & (lons <= lon_max) & (lats >= lat_min) & (lats <= lat_max)
+
+
+def region_suffix(region):
+    """Filename/product-key suffix of a region ('' for the default region)."""
+    return "" if region == DEFAULT_REGION else f"_{region}"
+
+
+def crop_grid(values, lons, lats, extent):
+    """The part of values[..., lat, lon] (and its axes) inside extent, edges inclusive."""
+    lon_min, lon_max, lat_min, lat_max = extent
+    tol = 1e-6
+    cols = (lons >= lon_min - tol) & (lons <= lon_max + tol)
+    rows = (lats >= lat_min - tol) & (lats <= lat_max + tol)
+    return values[..., rows, :][..., cols], lons[cols], lats[rows]
+
+
+def grid_axes(extent=MAP_EXTENT, resolution=0.25):
+    """Cell-centre longitudes and latitudes covering extent (edges inclusive)."""
+    lon_min, lon_max, lat_min, lat_max = extent
+    lons = np.arange(lon_min, lon_max + resolution / 2, resolution)
+    lats = np.arange(lat_min, lat_max + resolution / 2, resolution)
+    return lons, lats
+
+
+def gridline_step(extent):
+    """Gridline spacing (degrees) suited to the size of extent."""
+    span = max(extent[1] - extent[0], extent[3] - extent[2])
+    for step in GRIDLINE_STEPS:
+        if span / step <= MAX_GRIDLINES:
+            return step
+    return GRIDLINE_STEPS[-1]
+
+
+def satellite_zoom(extent):
+    """Tile zoom level suited to the size of extent."""
+    span = max(extent[1] - extent[0], extent[3] - extent[2])
+    return ZOOMED_TILE_ZOOM if span <= ZOOMED_SPAN_DEG else DEFAULT_TILE_ZOOM
+
+
+def add_gridlines(ax, extent=MAP_EXTENT, step=None):
+    """Add gridlines with emphasized labels every `step` degrees (default: gridline_step())."""
+    lon_min, lon_max, lat_min, lat_max = extent
+    step = step or gridline_step(extent)
+    gl = ax.gridlines(draw_labels=True, linewidth=0.5, color='gray', alpha=0.5, linestyle='--')
+    gl.xlocator = plt.FixedLocator(np.arange(np.ceil(lon_min / step) * step, lon_max + 1e-6, step))
+    gl.ylocator = plt.FixedLocator(np.arange(np.ceil(lat_min / step) * step, lat_max + 1e-6, step))
+    gl.xlabel_style = {'size': 12, 'weight': 'bold'}
+    gl.ylabel_style = {'size': 12, 'weight': 'bold'}
+    gl.top_labels = False
+    gl.right_labels = False
+    return gl
+
+
+def add_par_boundary(ax):
+    """Draw the dashed blue PAR outline."""
+    par_patch = PathPatch(
+        Path(PAR_VERTICES), edgecolor='blue', linestyle='--', linewidth=2,
+        facecolor='none', transform=ccrs.PlateCarree()
+    )
+    ax.add_patch(par_patch)
+    return par_patch
+
+
+@lru_cache(maxsize=64)
+def _clipped_geometries(category, name, scale, extent):
+    feature = cfeature.NaturalEarthFeature(category, name, scale)
+    lon_min, lon_max, lat_min, lat_max = extent
+    clip = box(lon_min - CLIP_MARGIN_DEG, lat_min - CLIP_MARGIN_DEG,
+               lon_max + CLIP_MARGIN_DEG, lat_max + CLIP_MARGIN_DEG)
+    clipped = (geom.intersection(clip) for geom in feature.intersecting_geometries(
+        [clip.bounds[0], clip.bounds[2], clip.bounds[1], clip.bounds[3]]))
+    return tuple(geom for geom in clipped if not geom.is_empty)
+
+
+def clipped_feature(feature, extent=MAP_EXTENT, **kwargs):
+    """
+    A Natural Earth feature reduced to its geometries near extent.
+
+    Geometries are read, filtered and clipped once per (feature, scale,
+    extent) and kept for the life of the process, so every later figure of
+    that extent draws only the clipped shapes. The auto scale of the
+    cartopy feature is resolved for extent first.
+    """
+    scaler = getattr(feature, 'scaler', None)
+    scale = scaler.scale_from_extent(list(extent)) if scaler is not None else feature.scale
+    geoms = _clipped_geometries(feature.category, feature.name, scale, tuple(float(v) for v in extent))
+    return cfeature.ShapelyFeature(geoms, ccrs.PlateCarree(), **{**feature.kwargs, **kwargs})
+
+
+class CachedTiles:
+    """
+    Tile source wrapper keeping the stitched image of each map extent.
+
+    cartopy asks an image factory for the whole map domain on every draw;
+    this keeps the last BASEMAP_CACHE_ENTRIES results keyed by domain bounds
+    and zoom, so figures of the same extent reuse one composited basemap.
+    """
+
+    def __init__(self, tiles, max_entries=BASEMAP_CACHE_ENTRIES):
+        self.tiles = tiles
+        self.crs = tiles.crs
+        self.max_entries = max_entries
+        self._images = OrderedDict()
+
+    def image_for_domain(self, target_domain, target_z):
+        key = (tuple(round(v, 3) for v in target_domain.bounds), target_z)
+        if key in self._images:
+            self._images.move_to_end(key)
+            return self._images[key]
+        image = self._images[key] = self.tiles.image_for_domain(target_domain, target_z)
+        while len(self._images) > self.max_entries:
+            self._images.popitem(last=False)
+        return image
+
+
+def setup_satellite_map(tiles, extent=MAP_EXTENT, figsize=(14, 11), zoom=None):
+    """
+    Create the satellite-background map used by the outlook products.
+
+    `tiles` is a cartopy tile source shared by the caller so that several
+    figures rendered in one process reuse the same downloaded tiles (wrap it
+    in CachedTiles to also reuse the stitched image of each extent).
+    """
+    fig = plt.figure(figsize=figsize)
+    ax = plt.axes(projection=ccrs.PlateCarree())
+    ax.set_extent(extent, crs=ccrs.PlateCarree())
+
+    ax.add_image(tiles, zoom or satellite_zoom(extent))
+
+    ax.add_feature(clipped_feature(cfeature.COASTLINE, extent, linewidth=1.5))
+    ax.add_feature(clipped_feature(cfeature.BORDERS, extent, linestyle=':', linewidth=1))
+
+    add_gridlines(ax, extent)
+    add_par_boundary(ax)
+    return fig, ax
+
+
+def setup_plain_map(extent=MAP_EXTENT, figsize=(12, 12)):
+    """Create the light land/ocean map used by the track products."""
+    fig = plt.figure(figsize=figsize)
+    ax = plt.axes(projection=ccrs.PlateCarree())
+    decorate_plain_map(ax, extent)
+    return fig, ax
+
+
+def decorate_plain_map(ax, extent=MAP_EXTENT):
+    """Land/ocean, coastlines, gridlines and PAR on an existing PlateCarree axes."""
+    ax.set_extent(extent, crs=ccrs.PlateCarree())
+
+    ax.add_feature(clipped_feature(cfeature.LAND, extent, facecolor='lightgray'))
+    ax.add_feature(clipped_feature(cfeature.COASTLINE, extent, linewidth=1.5))
+    ax.add_feature(clipped_feature(cfeature.BORDERS, extent, linestyle=':', linewidth=1))
+    ax.add_feature(clipped_feature(cfeature.OCEAN, extent, facecolor='aliceblue'))
+
+    add_gridlines(ax, extent)
+    add_par_boundary(ax)
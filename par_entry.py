@@ -0,0 +1,158 @@
+"""
+PAR entry probability and timing.
+
+One vectorized Path.contains_points over every ensemble track point gives an
+inside/outside mask shaped like the track arrays. From it each member gets
+its first PAR entry lead, the exit lead after that and the intensity at
+entry; members are then summarised per system (track_id) and for the whole
+ensemble:
+
+  - probability of entering PAR by the end of each forecast day
+  - entry-time distribution (10/50/90th percentiles, count per day)
+  - median wind and pressure at entry
+
+Members whose first position is already inside PAR formed there; they count
+as entering at that lead.
+
+    python par_entry.py --max-lead-hours 240
+"""
+import argparse
+import json
+
+import numpy as np
+from matplotlib.path import Path
+
+from ensemble_tracks import build_track_arrays
+from fnv3_ingest import load_latest_run_or_exit
+from map_common import PAR_VERTICES
+from publish import write_if_changed
+
+DEFAULT_MAX_LEAD_HOURS = 240
+
+JSON_PATH = "public/data/par_entry.json"
+
+
+def inside_par(tracks):
+    """Boolean (n_members, n_leads) mask of track points inside PAR (NaN -> False)."""
+    lon, lat = tracks['lon'], tracks['lat']
+    valid = ~np.isnan(lon) & ~np.isnan(lat)
+    inside = np.zeros(lon.shape, dtype=bool)
+    inside[valid] = Path(PAR_VERTICES).contains_points(np.column_stack([lon[valid], lat[valid]]))
+    return inside
+
+
+def member_entries(tracks):
+    """
+    First PAR entry per member.
+
+    Returns a dict of (n_members,) arrays: entered, entry_lead, exit_lead
+    (NaN while still inside at the last lead), formed_inside, entry_wind and
+    entry_pressure (NaN where not entered).
+    """
+    inside = inside_par(tracks)
+    valid = ~np.isnan(tracks['lon'])
+    lead_hours = tracks['lead_hours'].astype(np.float64)
+    rows = np.arange(inside.shape[0])
+
+    entered = inside.any(axis=1)
+    entry = np.argmax(inside, axis=1)
+    # First outside point after entry, among the member's valid leads
+    after = valid & ~inside & (np.arange(inside.shape[1]) > entry[:, None])
+    exited = entered & after.any(axis=1)
+    exit_index = np.argmax(after, axis=1)
+    first_valid = np.argmax(valid, axis=1)
+
+    return {
+        'entered': entered,
+        'entry_lead': np.where(entered, lead_hours[entry], np.nan),
+        'exit_lead': np.where(exited, lead_hours[exit_index], np.nan),
+        'formed_inside': entered & (entry == first_valid),
+        'entry_wind': np.where(entered, tracks['wind'][rows, entry], np.nan),
+        'entry_pressure': np.where(entered, tracks['pressure'][rows, entry], np.nan),
+    }
+
+
+def _rounded(value, digits):
+    return None if np.isnan(value) else round(float(value), digits)
+
+
+def _median(values, digits):
+    values = values[~np.isnan(values)]
+    return round(float(np.median(values)), digits) if len(values) else None
+
+
+def summarize_entries(entries, sample_index, num_samples, days):
+    """Entry probability by day and timing/intensity summary for a set of members."""
+    num_samples = max(num_samples, 1)
+    entered = entries['entered']
+    lead = entries['entry_lead'][entered]
+    sample = sample_index[entered]
+
+    # Earliest entry per sample, so a sample with two entering storms counts once
+    earliest = np.full(num_samples, np.inf)
+    np.minimum.at(earliest, sample, lead)
+    by_day = [round(float(np.sum(earliest <= 24 * d) / num_samples), 3) for d in days]
+
+    day_of_entry = np.ceil(np.maximum(lead, 1) / 24).astype(np.int64)
+    if len(lead):
+        p10, p50, p90 = np.percentile(lead, [10, 50, 90])
+    else:
+        p10 = p50 = p90 = np.nan
+    return {
+        'members_entering': int(entered.sum()),
+        'formed_inside': int(entries['formed_inside'].sum()),
+        'probability_by_day': by_day,
+        'entry_count_by_day': [int(np.sum(day_of_entry == d)) for d in days],
+        'entry_lead_hours': {'p10': _rounded(p10, 0), 'p50': _rounded(p50, 0), 'p90': _rounded(p90, 0)},
+        'median_exit_lead_hours': _median(entries['exit_lead'][entered], 0),
+        'median_entry_wind_kt': _median(entries['entry_wind'][entered], 1),
+        'median_entry_pressure_hpa': _median(entries['entry_pressure'][entered], 1),
+    }
+
+
+def par_entry_summary(tracks, max_lead_hours=DEFAULT_MAX_LEAD_HOURS):
+    """Ensemble-wide and per-track_id PAR entry summaries (JSON-able)."""
+    entries = member_entries(tracks)
+    days = list(range(1, max_lead_hours // 24 + 1))
+    num_samples = len(tracks['samples'])
+
+    systems = []
+    for g, track_id in enumerate(tracks['track_ids']):
+        sel = tracks['track_index'] == g
+        if not entries['entered'][sel].any():
+            continue
+        summary = summarize_entries({k: v[sel] for k, v in entries.items()},
+                                    tracks['sample_index'][sel], num_samples, days)
+        systems.append(dict({'track_id': str(track_id), 'members': int(sel.sum())}, **summary))
+    systems.sort(key=lambda s: -s['members_entering'])
+
+    return {
+        'days': days,
+        'num_samples': int(num_samples),
+        'any_system': summarize_entries(entries, tracks['sample_index'], num_samples, days),
+        'systems': systems,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PAR entry probability and timing from the latest FNV3 run.")
+    parser.add_argument('--max-lead-hours', type=int, default=DEFAULT_MAX_LEAD_HOURS)
+    args = parser.parse_args(argv)
+
+    data, run = load_latest_run_or_exit()
+    tracks = build_track_arrays(data, args.max_lead_hours)
+    summary = par_entry_summary(tracks, args.max_lead_hours)
+
+    payload = dict({
+        'run_id': run['run_id'],
+        'init_utc': run['init_utc'].strftime("%Y-%m-%dT%H:%M:%SZ"),
+        'max_lead_hours': args.max_lead_hours,
+    }, **summary)
+    write_if_changed(JSON_PATH, (json.dumps(payload, separators=(',', ':')) + "\n").encode("utf-8"))
+    by_day = summary['any_system']['probability_by_day']
+    print(f"PAR entry probability within {args.max_lead_hours} h: "
+          f"{by_day[-1] * 100 if by_day else 0:.0f}% ({len(summary['systems'])} systems); written to {JSON_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""
+Byte-stable figure output.
+
+Figures are rendered to memory with fixed PNG metadata, hashed, and only
+written when the bytes differ from what is already on disk, so re-rendering
+an unchanged run leaves the file (and git) untouched.
+
+The same rendered PNG is decoded once and re-encoded into smaller responsive
+variants (WebP/AVIF, plus reduced PNG fallbacks) in parallel, so no figure
+is drawn more than once:
+
+    foo.png           full-size PNG (unchanged)
+    foo.webp          full-size WebP / AVIF
+    foo.w1280.webp    1280 px wide WebP / AVIF / PNG, and so on
+
+Every published product is also listed in public/data/products.json (run,
+URL, dimensions, size, hash and variants, newest runs first), so the site
+fetches one small manifest instead of probing for image filenames.
+"""
+import hashlib
+import io
+import json
+import os
+import tempfile
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, features
+
+# Matplotlib stamps its version into "Software"; drop it so bytes only depend on content
+PNG_METADATA = {'Software': None}
+
+# Responsive variants: pixel widths (None = full width) and formats
+VARIANT_WIDTHS = [640, 1280, None]
+VARIANT_FORMATS = ['webp', 'avif', 'png']
+
+ENCODE_OPTIONS = {
+    'webp': {'quality': 80, 'method': 4},
+    'avif': {'quality': 55, 'speed': 8},
+    'png': {'optimize': True},
+}
+
+PUBLIC_DIR = "public"
+MANIFEST_PATH = "public/data/products.json"
+# Runs listed per product (entries whose file was overwritten are dropped)
+MANIFEST_HISTORY = 4
+
+
+def run_seed(*parts):
+    """Stable 32-bit seed derived from a run id and any extra qualifiers."""
+    key = ":".join(str(p) for p in parts)
+    return zlib.crc32(key.encode("utf-8"))
+
+
+def sha256_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_sha256(path):
+    """SHA-256 of a file on disk, or None if it does not exist."""
+    try:
+        with open(path, 'rb') as f:
+            return sha256_bytes(f.read())
+    except FileNotFoundError:
+        return None
+
+
+def write_bytes_atomic(path, data):
+    """
+    Write via a temporary file and rename so readers never see a partial file.
+
+    The temporary name is unique per writer, so concurrent writers of the same
+    path cannot interleave; the last rename wins.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def write_if_changed(path, data):
+    """Write data unless the file already holds identical bytes. Returns (sha256, written)."""
+    digest = sha256_bytes(data)
+    if file_sha256(path) == digest:
+        print(f"Unchanged, skipping write: {path}")
+        return digest, False
+    write_bytes_atomic(path, data)
+    return digest, True
+
+
+def render_png(fig, dpi=300, bbox_inches='tight'):
+    """Render a figure to PNG bytes with deterministic metadata."""
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', dpi=dpi, bbox_inches=bbox_inches, metadata=PNG_METADATA)
+    return buf.getvalue()
+
+
+def variant_path(path, fmt, width=None):
+    """Path of one responsive variant of path (see the module docstring)."""
+    base = os.path.splitext(path)[0]
+    return f"{base}.w{width}.{fmt}" if width else f"{base}.{fmt}"
+
+
+def available_formats(formats=VARIANT_FORMATS):
+    """The formats this Pillow build can encode (AVIF needs libavif support)."""
+    return [fmt for fmt in formats if fmt == 'png' or features.check(fmt)]
+
+
+def _encode(image, fmt):
+    start = time.perf_counter()
+    buf = io.BytesIO()
+    image.save(buf, format=fmt.upper(), **ENCODE_OPTIONS.get(fmt, {}))
+    return buf.getvalue(), time.perf_counter() - start
+
+
+def _existing_variant(path, fmt):
+    with Image.open(path) as image:
+        width, height = image.size
+    return {'path': path, 'format': fmt, 'width': width, 'height': height,
+            'bytes': os.path.getsize(path), 'seconds': 0.0, 'written': False}
+
+
+def save_variants(png_bytes, path, widths=VARIANT_WIDTHS, formats=VARIANT_FORMATS, workers=None,
+                  only_missing=False):
+    """
+    Encode responsive variants of an already rendered PNG next to path.
+
+    The PNG is decoded once; each width is resized once and the formats are
+    encoded in parallel threads (Pillow releases the GIL while encoding).
+    Widths at or above the image width collapse to the full-size variant,
+    and the full-size PNG itself is skipped since it is the original.
+    With only_missing (the PNG itself was unchanged), nothing is encoded when
+    every variant already exists (the existing files are described). Returns a list of dicts (path, format,
+    width, height, bytes, seconds, written) and prints a size/time report.
+    """
+    image = Image.open(io.BytesIO(png_bytes))
+    formats = available_formats(formats)
+    targets = sorted({w if w and w < image.width else None for w in widths}, key=lambda w: w or image.width)
+    jobs = [(width, fmt) for width in targets for fmt in formats if not (width is None and fmt == 'png')]
+    if only_missing and all(os.path.exists(variant_path(path, fmt, width)) for width, fmt in jobs):
+        return [_existing_variant(variant_path(path, fmt, width), fmt) for width, fmt in jobs]
+
+    image.load()
+    sized = {}
+    for width in targets:
+        if width is None:
+            sized[None] = image
+        else:
+            sized[width] = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+
+    with ThreadPoolExecutor(max_workers=workers or min(len(jobs), os.cpu_count() or 1) or 1) as pool:
+        encoded = list(pool.map(lambda job: _encode(sized[job[0]], job[1]), jobs))
+
+    variants = []
+    for (width, fmt), (data, seconds) in zip(jobs, encoded):
+        target = variant_path(path, fmt, width)
+        _, written = write_if_changed(target, data)
+        variants.append({
+            'path': target,
+            'format': fmt,
+            'width': sized[width].width,
+            'height': sized[width].height,
+            'bytes': len(data),
+            'seconds': seconds,
+            'written': written,
+        })
+
+    print(f"Variants of {path} ({len(png_bytes) / 1024:.0f} KB PNG):")
+    for v in variants:
+        print(f"  {v['format']:<5}{v['width']:>6} px {v['bytes'] / 1024:>9.1f} KB {v['seconds']:>7.2f} s")
+    return variants
+
+
+def public_url(path, public_dir=PUBLIC_DIR):
+    """Site URL of a file under public/, e.g. /assets/foo.png."""
+    return "/" + os.path.relpath(path, public_dir).replace(os.sep, "/")
+
+
+def load_manifest(manifest_path=MANIFEST_PATH):
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {'products': {}}
+
+
+def record_product(product, path, run, data=None, width=None, height=None, variants=(),
+                   manifest_path=MANIFEST_PATH, history=MANIFEST_HISTORY):
+    """
+    Add one published file to the products manifest; returns its entry.
+
+    data defaults to the file's bytes on disk. The entry replaces any older
+    entry of the same product for the same run or the same URL (a fixed
+    "latest" filename only ever holds the newest run), and the newest
+    history runs are kept. The manifest is rewritten atomically and only when
+    it changes.
+    """
+    if data is None:
+        with open(path, 'rb') as f:
+            data = f.read()
+    url = public_url(path)
+    entry = {
+        'run_id': run['run_id'],
+        'init_utc': run['init_utc'].strftime("%Y-%m-%dT%H:%M:%SZ"),
+        'url': url,
+        'width': width,
+        'height': height,
+        'bytes': len(data),
+        'sha256': sha256_bytes(data),
+        'variants': [
+            dict({key: v[key] for key in ('format', 'width', 'height', 'bytes')}, url=public_url(v['path']))
+            for v in variants
+        ],
+    }
+    manifest = load_manifest(manifest_path)
+    entries = [e for e in manifest['products'].get(product, []) if e['run_id'] != entry['run_id'] and e['url'] != url]
+    entries = sorted(entries + [entry], key=lambda e: e['init_utc'], reverse=True)[:history]
+    manifest['products'][product] = entries
+    manifest['products'] = dict(sorted(manifest['products'].items()))
+    write_if_changed(manifest_path, (json.dumps(manifest, indent=2) + "\n").encode("utf-8"))
+    return entry
+
+
+def save_figure(fig, path, dpi=300, bbox_inches='tight', variants=True, product=None, run=None):
+    """
+    Render fig to path byte-stably; returns (sha256, written).
+
+    With variants, the same render also produces the responsive
+    WebP/AVIF/PNG variants (save_variants()). With product and run, the
+    PNG and its variants are recorded in the products manifest.
+    """
+    png_bytes = render_png(fig, dpi=dpi, bbox_inches=bbox_inches)
+    digest, written = write_if_changed(path, png_bytes)
+    saved = save_variants(png_bytes, path, only_missing=not written) if variants else []
+    if product is not None:
+        width, height = Image.open(io.BytesIO(png_bytes)).size
+        record_product(product, path, run, png_bytes, width, height, saved)
+    return digest, written
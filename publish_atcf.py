@@ -0,0 +1,145 @@
+"""
+Compact snapshot of the current ATCF systems for the frontend.
+
+Instead of every visitor's browser fetching the ATCF API and filtering it,
+this job fetches it once per interval (through atcf_client, so it shares
+the cache and timeout of the forecast scripts) and publishes
+public/data/atcf_wpac.json:
+
+    {"updated_utc": <newest last_updated>,
+     "systems": [WPAC systems inside the extent, newest first],
+     "other": [every other system, newest first]}
+
+WPAC systems pass the same filter as the maps (WPAC sector file, position
+inside the extent); INVESTs are labelled "LPA <id>". Each system is one
+flat record of the fields parsed from interp_sector_file. With --history
+each WPAC system also carries its track, [time, lat, lon, wind kt,
+pressure] fixes: the previous snapshot's track plus the current fix when it
+is newer, so the history grows one fix per advisory without keeping any
+other state. The file is only rewritten when its content changes.
+
+    python publish_atcf.py                 # snapshot of the current systems
+    python publish_atcf.py --history       # with tracks of the WPAC systems
+"""
+import argparse
+import json
+import sys
+
+from atcf_client import TTL_SECONDS, fetch_systems, parse_sector_line
+from publish import write_if_changed
+
+OUTPUT_PATH = "public/data/atcf_wpac.json"
+
+# Box of the cyclone page (wider than MAP_EXTENT, out to 170E)
+WPAC_EXTENT = [105.0, 170.0, 0.0, 40.0]
+
+# Fixes kept per track (30 days of 6-hourly advisories)
+MAX_TRACK_POINTS = 120
+
+COORD_DECIMALS = 2
+
+
+def system_record(system):
+    """Flat record of one ATCF system; position from the API fields, else the sector line."""
+    fields = parse_sector_line(system)
+    lat = system.get('latitude') if system.get('latitude') is not None else fields['lat']
+    lon = system.get('longitude') if system.get('longitude') is not None else fields['lon']
+    atcf_id = str(system.get('atcf_id') or '')
+    name = str(system.get('storm_name') or fields['name'] or '').upper()
+    return {
+        'atcf_id': atcf_id,
+        'name': name,
+        'label': f"LPA {atcf_id}".rstrip() if name == 'INVEST' else (name or atcf_id),
+        'lat': round(lat, COORD_DECIMALS) if lat is not None else None,
+        'lon': round(lon, COORD_DECIMALS) if lon is not None else None,
+        'wind_kt': fields['wind_kt'],
+        'pressure_hpa': system.get('pressure') if system.get('pressure') is not None else fields['pressure_hpa'],
+        'speed_kt': fields['speed_kt'],
+        'heading_deg': fields['heading_deg'],
+        'time': fields['time'],
+        'last_updated': system.get('last_updated'),
+    }
+
+
+def is_wpac(system, record, extent=WPAC_EXTENT):
+    """The maps' filter: WPAC sector file and a position inside extent."""
+    lon_min, lon_max, lat_min, lat_max = extent
+    lat, lon = record['lat'], record['lon']
+    if lat is None or lon is None or lon < 0:
+        return False
+    if 'WPAC' not in str(system.get('atcf_sector_file', '')).upper():
+        return False
+    return lon_min <= lon <= lon_max and lat_min <= lat <= lat_max
+
+
+def load_tracks(path=OUTPUT_PATH):
+    """{atcf_id: track} from the previously published snapshot."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    return {s['atcf_id']: s['track'] for s in previous.get('systems', []) if s.get('track')}
+
+
+def extend_track(track, record, max_points=MAX_TRACK_POINTS):
+    """track with the record's fix appended if it is newer than the last fix."""
+    track = list(track or [])
+    fix_time = record['time'] or record['last_updated']
+    if fix_time is None or record['lat'] is None:
+        return track
+    # ISO 8601 UTC strings compare in time order
+    if not track or fix_time > track[-1][0]:
+        track.append([fix_time, record['lat'], record['lon'], record['wind_kt'], record['pressure_hpa']])
+    return track[-max_points:]
+
+
+def build_snapshot(atcf_systems, extent=WPAC_EXTENT, previous_tracks=None):
+    """The published snapshot; WPAC systems get tracks when previous_tracks is given."""
+    systems, other = [], []
+    for system in atcf_systems:
+        record = system_record(system)
+        if is_wpac(system, record, extent):
+            if previous_tracks is not None:
+                record['track'] = extend_track(previous_tracks.get(record['atcf_id']), record)
+            systems.append(record)
+        else:
+            other.append(record)
+
+    def newest_first(records):
+        return sorted(records, key=lambda r: (r['last_updated'] or '', r['atcf_id']), reverse=True)
+
+    updated = [r['last_updated'] for r in systems + other if r['last_updated']]
+    return {
+        'updated_utc': max(updated) if updated else None,
+        'extent': extent,
+        'systems': newest_first(systems),
+        'other': newest_first(other),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Publish a compact snapshot of the current ATCF systems.")
+    parser.add_argument('--output', default=OUTPUT_PATH)
+    parser.add_argument('--extent', nargs=4, type=float, default=WPAC_EXTENT,
+                        metavar=('LON_MIN', 'LON_MAX', 'LAT_MIN', 'LAT_MAX'))
+    parser.add_argument('--history', action='store_true', help="Keep the track of each WPAC system")
+    parser.add_argument('--ttl', type=float, default=TTL_SECONDS,
+                        help="Seconds a cached API response is used without fetching")
+    args = parser.parse_args(argv)
+
+    atcf_systems = fetch_systems(ttl=args.ttl, default=None)
+    if atcf_systems is None:
+        # Keep the last snapshot rather than publishing an empty basin
+        print(f"Error: no ATCF data available; {args.output} left unchanged.")
+        sys.exit(1)
+
+    previous_tracks = load_tracks(args.output) if args.history else None
+    snapshot = build_snapshot(atcf_systems, args.extent, previous_tracks)
+    _, changed = write_if_changed(args.output, (json.dumps(snapshot, separators=(',', ':')) + "\n").encode("utf-8"))
+    print(f"{len(snapshot['systems'])} WPAC and {len(snapshot['other'])} other systems "
+          f"{'written to' if changed else 'unchanged in'} {args.output}")
+
+
+if __name__ == "__main__":
+    main()
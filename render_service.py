@@ -0,0 +1,516 @@
+"""
+Local HTTP service rendering forecast products on demand.
+
+The latest FNV3 run is parsed once and kept in memory; a background thread
+checks for a newer run every few minutes and swaps it in. Products are
+rendered for the query parameters of each request:
+
+    GET /strike.png?radius_km=120&max_lead_hours=120&extent=115,135,5,25&width=1024
+    GET /wind.webp?thresholds=34,64&window=72&region=luzon&width=800
+    GET /outlook.png?start=0&end=168&min_wind=25&eps=4&region=visayas&width=1280
+    GET /health                                      run id and cache statistics
+
+Parameters are validated and normalised (defaults filled in, floats rounded)
+into a key that includes the run id. Rendered images are kept in a bounded
+LRU cache of bytes; the probability grids and track arrays behind them are
+kept in a second, smaller one, so e.g. another width of the same map only
+re-renders; every region preset (map_common.REGIONS) is a crop of the same
+Western Pacific grid. Concurrent identical requests are coalesced: the first renders
+and the others wait for its result. Figures are drawn one at a time
+(pyplot is not thread-safe); grid computations run concurrently.
+
+    python render_service.py --port 8765 --cache-mb 256
+"""
+import argparse
+import io
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import cartopy.io.img_tiles as cimgt
+import numpy as np
+from PIL import Image
+
+from atcf_client import fetch_systems, fetch_systems_async
+from ensemble_tracks import build_track_arrays
+from fnv3_ingest import get_latest_run_url, load_latest_run_or_exit, load_run
+from genesis_outlook import (
+    CLUSTER_EPS_DEG, CLUSTER_MIN_SAMPLES, MIN_GENESIS_WIND_KT, compute_outlook, count_members, custom_window,
+    extract_genesis_points, outlook_figure,
+)
+from map_common import DEFAULT_REGION, MAP_EXTENT, REGIONS, CachedTiles, crop_grid
+from publish import ENCODE_OPTIONS, render_png
+from strike_probability import DEFAULT_MAX_LEAD_HOURS, DEFAULT_RADIUS_KM, strike_probability, strike_probability_figure
+from wind_probability import DEFAULT_WINDOWS_HOURS, WIND_THRESHOLDS_KT, wind_probabilities, wind_probability_figure
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+DEFAULT_CACHE_MB = 256
+DEFAULT_CACHE_ENTRIES = 512
+# Grids and track arrays behind the rendered images
+DEFAULT_DATA_CACHE_MB = 512
+DEFAULT_DATA_CACHE_ENTRIES = 64
+
+DEFAULT_REFRESH_MINUTES = 15
+
+DEFAULT_WIDTH = 1280
+MIN_WIDTH = 256
+MAX_WIDTH = 4096
+
+IMAGE_FORMATS = {'png': 'image/png', 'webp': 'image/webp'}
+
+# Extents are rounded to this many degrees (and must lie in this box)
+EXTENT_STEP_DEG = 0.25
+EXTENT_LIMITS = [90.0, 180.0, -10.0, 50.0]
+MIN_EXTENT_SPAN_DEG = 2.0
+
+MAX_LEAD_HOURS = 360
+LEAD_STEP_HOURS = 6
+
+
+def sizeof(value):
+    """Approximate memory footprint (bytes) of a cached value."""
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(sizeof(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(sizeof(v) for v in value)
+    return 64
+
+
+class CoalescingLRU:
+    """
+    Thread-safe LRU cache bounded by entry count and total size, with
+    request coalescing.
+
+    get_or_compute(key, compute) returns the cached value, or calls compute()
+    once for any number of concurrent callers with the same key; the others
+    block on the first caller's result (exceptions are re-raised to every
+    waiter and nothing is cached).
+    """
+
+    def __init__(self, max_entries, max_bytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._bytes = 0
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.coalesced = 0
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                owner = False
+            else:
+                future = self._inflight[key] = Future()
+                self.misses += 1
+                owner = True
+
+        if not owner:
+            return future.result()
+
+        try:
+            value = compute()
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            del self._inflight[key]
+            self._put(key, value)
+        future.set_result(value)
+        return value
+
+    def _put(self, key, value):
+        size = sizeof(value)
+        if size > self.max_bytes:
+            return
+        self._entries[key] = value
+        self._sizes[key] = size
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            old, _ = self._entries.popitem(last=False)
+            self._bytes -= self._sizes.pop(old)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._bytes, 'hits': self.hits,
+                    'misses': self.misses, 'coalesced': self.coalesced}
+
+
+# ---------------------------------------------------------------------------
+# Query parameters
+# ---------------------------------------------------------------------------
+
+def _one(query, name, default):
+    values = query.get(name)
+    return values[-1] if values else default
+
+
+def parse_number(query, name, default, low, high, cast=float):
+    raw = _one(query, name, None)
+    if raw is None:
+        return default
+    try:
+        value = cast(raw)
+    except ValueError:
+        raise ValueError(f"{name} must be a number, got {raw!r}")
+    if not (low <= value <= high):
+        raise ValueError(f"{name} must be between {low} and {high}")
+    return value
+
+
+def parse_lead(query, name, default):
+    hours = parse_number(query, name, default, 0, MAX_LEAD_HOURS, int)
+    if hours % LEAD_STEP_HOURS:
+        raise ValueError(f"{name} must be a multiple of {LEAD_STEP_HOURS} hours")
+    return hours
+
+
+def extent_within(inner, outer):
+    return outer[0] <= inner[0] and inner[1] <= outer[1] and outer[2] <= inner[2] and inner[3] <= outer[3]
+
+
+def extent_title(extent):
+    """Region title of a preset extent, else the extent spelled out."""
+    for region in REGIONS.values():
+        if tuple(float(v) for v in region['extent']) == tuple(extent):
+            return region['title']
+    lon_min, lon_max, lat_min, lat_max = extent
+    return f"{lon_min:g}-{lon_max:g}E, {lat_min:g}-{lat_max:g}N"
+
+
+def parse_extent(query):
+    """
+    [lon_min, lon_max, lat_min, lat_max] as a tuple, from region=<preset> or
+    extent=<four values> (rounded to EXTENT_STEP_DEG); default region otherwise.
+    """
+    raw = _one(query, 'extent', None)
+    region = _one(query, 'region', None)
+    if raw is not None and region is not None:
+        raise ValueError("give either region or extent, not both")
+    if raw is None:
+        region = (region or DEFAULT_REGION).lower()
+        if region not in REGIONS:
+            raise ValueError(f"region must be one of {sorted(REGIONS)}")
+        return tuple(float(v) for v in REGIONS[region]['extent'])
+    try:
+        values = [float(v) for v in raw.split(",")]
+    except ValueError:
+        raise ValueError(f"extent must be lon_min,lon_max,lat_min,lat_max, got {raw!r}")
+    if len(values) != 4:
+        raise ValueError("extent must have four values: lon_min,lon_max,lat_min,lat_max")
+    lon_min, lon_max, lat_min, lat_max = (round(v / EXTENT_STEP_DEG) * EXTENT_STEP_DEG for v in values)
+    if not (EXTENT_LIMITS[0] <= lon_min and lon_max <= EXTENT_LIMITS[1]
+            and EXTENT_LIMITS[2] <= lat_min and lat_max <= EXTENT_LIMITS[3]):
+        raise ValueError(f"extent must lie within {EXTENT_LIMITS}")
+    if lon_max - lon_min < MIN_EXTENT_SPAN_DEG or lat_max - lat_min < MIN_EXTENT_SPAN_DEG:
+        raise ValueError(f"extent must span at least {MIN_EXTENT_SPAN_DEG} degrees each way")
+    return lon_min, lon_max, lat_min, lat_max
+
+
+def parse_thresholds(query):
+    raw = _one(query, 'thresholds', None)
+    if raw is None:
+        return tuple(WIND_THRESHOLDS_KT)
+    try:
+        thresholds = sorted({int(v) for v in raw.split(",")})
+    except ValueError:
+        raise ValueError(f"thresholds must be comma-separated knots, got {raw!r}")
+    if not thresholds or thresholds[0] < 20 or thresholds[-1] > 150 or len(thresholds) > 4:
+        raise ValueError("thresholds must be 1-4 values between 20 and 150 kt")
+    return tuple(thresholds)
+
+
+def product_params(product, query):
+    """Normalised parameters of one request (a tuple of sorted (name, value) pairs)."""
+    if product == 'strike':
+        params = {
+            'radius_km': round(parse_number(query, 'radius_km', DEFAULT_RADIUS_KM, 10, 500), 1),
+            'max_lead_hours': parse_lead(query, 'max_lead_hours', DEFAULT_MAX_LEAD_HOURS),
+            'extent': parse_extent(query),
+        }
+    elif product == 'wind':
+        params = {
+            'thresholds': parse_thresholds(query),
+            'window': parse_lead(query, 'window', DEFAULT_WINDOWS_HOURS[-1]),
+            'extent': parse_extent(query),
+        }
+    elif product == 'outlook':
+        start = parse_lead(query, 'start', 0)
+        end = parse_lead(query, 'end', 168)
+        if end <= start:
+            raise ValueError("end must be after start")
+        early = parse_lead(query, 'early', min(start + 48, end))
+        if not start <= early <= end:
+            raise ValueError("early must lie between start and end")
+        params = {
+            'start': start, 'end': end, 'early': early,
+            'min_wind': round(parse_number(query, 'min_wind', MIN_GENESIS_WIND_KT, 15, 64), 1),
+            'eps': round(parse_number(query, 'eps', CLUSTER_EPS_DEG, 0.5, 10), 2),
+            'min_samples': parse_number(query, 'min_samples', CLUSTER_MIN_SAMPLES, 1, 50, int),
+            'extent': parse_extent(query),
+        }
+    else:
+        raise KeyError(product)
+    return tuple(sorted(params.items()))
+
+
+# ---------------------------------------------------------------------------
+# Rendering
+# ---------------------------------------------------------------------------
+
+def encode_image(fig, width, fmt):
+    """Render fig at (exactly) width pixels and encode it as fmt."""
+    # Render slightly larger than needed (tight bbox trims the margins), then downscale
+    dpi = max(math.ceil(width / fig.get_figwidth() * 1.15), 20)
+    image = Image.open(io.BytesIO(render_png(fig, dpi=dpi)))
+    if image.width != width:
+        height = max(round(image.height * width / image.width), 1)
+        image = image.resize((width, height), Image.LANCZOS)
+    buf = io.BytesIO()
+    image.save(buf, format=fmt.upper(), **ENCODE_OPTIONS.get(fmt, {}))
+    return buf.getvalue()
+
+
+class RenderService:
+    """
+    The in-memory run, the two caches and the product renderers.
+
+    Each product method computes (or fetches from the data cache) what its
+    map needs and returns a function drawing the figure, which render()
+    calls under the render lock.
+    """
+
+    def __init__(self, cache_entries=DEFAULT_CACHE_ENTRIES, cache_mb=DEFAULT_CACHE_MB,
+                 data_cache_entries=DEFAULT_DATA_CACHE_ENTRIES, data_cache_mb=DEFAULT_DATA_CACHE_MB):
+        self.images = CoalescingLRU(cache_entries, cache_mb * 1024 * 1024)
+        self.grids = CoalescingLRU(data_cache_entries, data_cache_mb * 1024 * 1024)
+        self.render_lock = threading.Lock()
+        # Shared so the satellite tiles of the outlook are only downloaded, and
+        # the basemap of each extent only stitched, once
+        self.tiles = CachedTiles(cimgt.GoogleTiles(style='satellite', cache=True))
+        self.state = None
+        self.loaded_at = None
+
+    def set_run(self, data, run, atcf_systems=None):
+        """Swap in a newly parsed run; cached results of the old run are dropped."""
+        if atcf_systems is None:
+            atcf_systems = fetch_systems()
+        self.state = {'data': data, 'run': run, 'atcf_systems': atcf_systems}
+        self.loaded_at = time.time()
+        self.images.clear()
+        self.grids.clear()
+        print(f"Serving run {run['run_id']} ({len(data)} rows)")
+
+    def refresh(self):
+        """Load the newest run if it differs from the one in memory."""
+        date_str, hour_str, _ = get_latest_run_url()
+        if self.state and self.state['run']['run_id'] == f"{date_str}T{hour_str}":
+            return False
+        atcf_future = fetch_systems_async()
+        data, run = load_run(date_str, hour_str)
+        self.set_run(data, run, atcf_future.result())
+        return True
+
+    def tracks(self, state, max_lead_hours):
+        key = (state['run']['run_id'], 'tracks', max_lead_hours)
+        return self.grids.get_or_compute(key, lambda: build_track_arrays(state['data'], max_lead_hours))
+
+    def data_key(self, state, product, p):
+        """
+        Data-cache key and compute extent of a request.
+
+        Extents inside MAP_EXTENT (every region preset) share one grid or
+        outlook computed on MAP_EXTENT and cropped at drawing time; other
+        extents are computed on their own.
+        """
+        extent = p['extent']
+        compute_extent = tuple(float(v) for v in MAP_EXTENT) if extent_within(extent, MAP_EXTENT) else extent
+        params = tuple(item for item in p['key'] if item[0] != 'extent')
+        return (state['run']['run_id'], product, params, compute_extent), list(compute_extent)
+
+    def strike(self, state, p):
+        key, compute_extent = self.data_key(state, 'strike', p)
+
+        def compute():
+            tracks = self.tracks(state, p['max_lead_hours'])
+            return strike_probability(tracks, p['radius_km'], p['max_lead_hours'], extent=compute_extent)
+
+        probability, lons, lats = crop_grid(*self.grids.get_or_compute(key, compute), p['extent'])
+        return lambda: strike_probability_figure(probability, lons, lats, state['run'], p['radius_km'],
+                                                 p['max_lead_hours'], extent=list(p['extent']),
+                                                 region_title=extent_title(p['extent']))
+
+    def wind(self, state, p):
+        key, compute_extent = self.data_key(state, 'wind', p)
+
+        def compute():
+            tracks = self.tracks(state, p['window'])
+            return wind_probabilities(tracks, list(p['thresholds']), [p['window']], extent=compute_extent)
+
+        probability, lons, lats = crop_grid(*self.grids.get_or_compute(key, compute), p['extent'])
+        return lambda: wind_probability_figure(probability, lons, lats, state['run'], list(p['thresholds']),
+                                               [p['window']], extent=list(p['extent']),
+                                               region_title=extent_title(p['extent']))
+
+    def outlook(self, state, p):
+        key, compute_extent = self.data_key(state, 'outlook', p)
+        window = custom_window(p['start'], p['end'], p['early'])
+
+        def compute():
+            genesis = extract_genesis_points(state['data'], p['end'], min_wind_kt=p['min_wind'], extent=compute_extent)
+            return compute_outlook(genesis, window, count_members(state['data'], p['end']),
+                                   run_id=state['run']['run_id'], eps=p['eps'], min_samples=p['min_samples'],
+                                   extent=compute_extent)
+
+        outlook = self.grids.get_or_compute(key, compute)
+        return lambda: outlook_figure(outlook, state['run'], self.tiles, state['atcf_systems'],
+                                      extent=list(p['extent']), region_title=extent_title(p['extent']))
+
+    def render(self, product, query, fmt):
+        """(image bytes, run id) of one request; raises ValueError for bad parameters."""
+        state = self.state
+        if state is None:
+            raise RuntimeError("no run loaded")
+        key = product_params(product, query)
+        width = parse_number(query, 'width', DEFAULT_WIDTH, MIN_WIDTH, MAX_WIDTH, int)
+        params = dict(key, key=key)
+        builder = getattr(self, product)
+
+        def compute():
+            # Data first (concurrently), then the figure under the render lock
+            draw = builder(state, params)
+            with self.render_lock:
+                fig = draw()
+                try:
+                    return encode_image(fig, width, fmt)
+                finally:
+                    plt.close(fig)
+
+        image_key = (state['run']['run_id'], product, key, width, fmt)
+        return self.images.get_or_compute(image_key, compute), state['run']['run_id']
+
+    def health(self):
+        run = self.state['run'] if self.state else None
+        return {
+            'run_id': run['run_id'] if run else None,
+            'init_text': run['init_text'] if run else None,
+            'loaded_at': self.loaded_at,
+            'image_cache': self.images.stats(),
+            'data_cache': self.grids.stats(),
+        }
+
+
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        server_version = "PHWeatherRender/1.0"
+
+        def _send(self, status, body, content_type, headers=()):
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in headers:
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _send_json(self, status, payload):
+            self._send(status, (json.dumps(payload) + "\n").encode("utf-8"), 'application/json')
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            if url.path == '/health':
+                self._send_json(200, service.health())
+                return
+            product, _, fmt = url.path.lstrip('/').partition('.')
+            if product not in ('strike', 'wind', 'outlook') or fmt not in IMAGE_FORMATS:
+                self._send_json(404, {'error': f"unknown product {url.path}"})
+                return
+            try:
+                body, run_id = service.render(product, parse_qs(url.query), fmt)
+            except ValueError as e:
+                self._send_json(400, {'error': str(e)})
+                return
+            except RuntimeError as e:
+                self._send_json(503, {'error': str(e)})
+                return
+            except Exception as e:
+                print(f"Error rendering {self.path}: {str(e)}")
+                self._send_json(500, {'error': "render failed"})
+                return
+            self._send(200, body, IMAGE_FORMATS[fmt],
+                       [('Cache-Control', 'public, max-age=300'), ('X-Run-Id', run_id)])
+
+    return Handler
+
+
+def refresh_loop(service, interval_seconds, stop):
+    while not stop.wait(interval_seconds):
+        try:
+            service.refresh()
+        except Exception as e:
+            print(f"Warning: run refresh failed, still serving the previous run: {str(e)}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local HTTP service rendering products on demand.")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--cache-mb', type=int, default=DEFAULT_CACHE_MB, help="Rendered image cache size")
+    parser.add_argument('--cache-entries', type=int, default=DEFAULT_CACHE_ENTRIES)
+    parser.add_argument('--data-cache-mb', type=int, default=DEFAULT_DATA_CACHE_MB,
+                        help="Grid and track array cache size")
+    parser.add_argument('--refresh-minutes', type=float, default=DEFAULT_REFRESH_MINUTES,
+                        help="How often to check for a newer run (0 disables)")
+    args = parser.parse_args(argv)
+
+    service = RenderService(args.cache_entries, args.cache_mb, data_cache_mb=args.data_cache_mb)
+    atcf_future = fetch_systems_async()
+    data, run = load_latest_run_or_exit()
+    service.set_run(data, run, atcf_future.result())
+
+    stop = threading.Event()
+    if args.refresh_minutes > 0:
+        threading.Thread(target=refresh_loop, args=(service, args.refresh_minutes * 60, stop), daemon=True).start()
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(service))
+    print(f"Render service listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Local store of recent FNV3 runs as typed arrays, for the lagged ensemble.
+
+Every run is parsed from CSV once (fnv3_ingest.load_latest_run) and saved as
+temp_data/run_store/<run_id>.npz holding the required columns as compact
+typed arrays (float32 positions/intensities, int16 lead times, coded track
+ids). Older runs are read back from these files only, never re-downloaded
+or re-parsed, and one run at a time so memory stays bounded by the largest
+run rather than the whole lagged ensemble.
+
+Lagged members are aligned on valid time: an older run's lead times are
+shifted by its age so lead 0 is the current run's initialization, and each
+member carries an age weight 0.5 ** (age / half-life).
+"""
+import io
+import os
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from publish import write_bytes_atomic
+
+STORE_DIR = "temp_data/run_store"
+
+# Runs kept in the store (newest first); older files are deleted
+MAX_STORED_RUNS = 8
+
+# Runs older than this are never lagged in
+MAX_LAG_HOURS = 48
+
+DEFAULT_HALF_LIFE_HOURS = 12.0
+
+# Offset added to the sample ids of the k-th lagged run so members stay distinct
+SAMPLE_STRIDE = 100000
+
+FLOAT_COLUMNS = ['lat', 'lon', 'minimum_sea_level_pressure_hpa', 'maximum_sustained_wind_speed_knots']
+
+
+def store_path(run_id, store_dir=STORE_DIR):
+    return os.path.join(store_dir, f"{run_id}.npz")
+
+
+def stored_run_ids(store_dir=STORE_DIR):
+    """Run ids in the store, newest first."""
+    if not os.path.isdir(store_dir):
+        return []
+    names = [name[:-4] for name in os.listdir(store_dir) if name.endswith(".npz")]
+    return sorted(names, reverse=True)
+
+
+def store_run(data, run, store_dir=STORE_DIR, max_runs=MAX_STORED_RUNS):
+    """Save one parsed run as typed arrays (no-op if already stored) and prune old runs."""
+    path = store_path(run['run_id'], store_dir)
+    if not os.path.exists(path):
+        init_values, init_codes = np.unique(data['init_time'].to_numpy(dtype=str), return_inverse=True)
+        track_values, track_codes = np.unique(data['track_id'].to_numpy(dtype=str), return_inverse=True)
+        arrays = {
+            'init_time_values': init_values,
+            'init_time_codes': init_codes.astype(np.int16),
+            'track_id_values': track_values,
+            'track_id_codes': track_codes.astype(np.int32),
+            'sample': data['sample'].to_numpy(dtype=np.int32),
+            'lead_time_hours': data['lead_time_hours'].to_numpy(dtype=np.int16),
+        }
+        for column in FLOAT_COLUMNS:
+            arrays[column] = data[column].to_numpy(dtype=np.float32)
+        buf = io.BytesIO()
+        np.savez_compressed(buf, **arrays)
+        write_bytes_atomic(path, buf.getvalue())
+        print(f"Stored run {run['run_id']} in {store_dir}")
+
+    for run_id in stored_run_ids(store_dir)[max_runs:]:
+        os.remove(store_path(run_id, store_dir))
+
+
+def load_stored_run(run_id, store_dir=STORE_DIR):
+    """Rebuild the run's DataFrame (required columns only) from its stored arrays."""
+    with np.load(store_path(run_id, store_dir), allow_pickle=False) as npz:
+        frame = {
+            'init_time': npz['init_time_values'][npz['init_time_codes']],
+            'track_id': npz['track_id_values'][npz['track_id_codes']],
+            'sample': npz['sample'],
+            'lead_time_hours': npz['lead_time_hours'].astype(np.int64),
+        }
+        for column in FLOAT_COLUMNS:
+            frame[column] = npz[column]
+    return pd.DataFrame(frame)
+
+
+def run_age_hours(run_id, run):
+    """Hours between a stored run's initialization and the current run's."""
+    init = datetime.strptime(run_id, "%Y_%m_%dT%H").replace(tzinfo=timezone.utc)
+    return (run['init_utc'] - init).total_seconds() / 3600.0
+
+
+def age_weight(age_hours, half_life_hours=DEFAULT_HALF_LIFE_HOURS):
+    return 0.5 ** (age_hours / half_life_hours)
+
+
+def lagged_runs(run, n_lagged, store_dir=STORE_DIR, half_life_hours=DEFAULT_HALF_LIFE_HOURS,
+                max_lag_hours=MAX_LAG_HOURS):
+    """
+    Up to n_lagged stored runs older than run, newest first, without loading them.
+
+    Returns [{'run_id', 'store_dir', 'age_hours', 'weight', 'sample_offset'}, ...].
+    """
+    selected = []
+    for run_id in stored_run_ids(store_dir):
+        if len(selected) >= n_lagged:
+            break
+        age = run_age_hours(run_id, run)
+        if 0 < age <= max_lag_hours:
+            selected.append({
+                'run_id': run_id,
+                'store_dir': store_dir,
+                'age_hours': age,
+                'weight': age_weight(age, half_life_hours),
+                'sample_offset': SAMPLE_STRIDE * (len(selected) + 1),
+            })
+    return selected
+
+
+def iter_lagged_data(lagged):
+    """
+    Yield (info, data) for each lagged run, loading one run at a time.
+
+    data is aligned on the current initialization: lead_time_hours is shifted
+    by the run's age (points before the current initialization are dropped)
+    and sample ids are offset so they never collide with other runs.
+    """
+    for info in lagged:
+        data = load_stored_run(info['run_id'], info['store_dir'])
+        data['lead_time_hours'] -= int(round(info['age_hours']))
+        data = data[data['lead_time_hours'] >= 0].copy()
+        data['sample'] += info['sample_offset']
+        yield info, data
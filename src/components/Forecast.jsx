@@ -1,20 +1,6 @@
 // src/components/Forecast.jsx
 import React, { useEffect, useState } from "react";
 
-// Build dynamic date strings for today and yesterday in YYYY-MM-DD format
-const today = new Date();
-const yyyy = today.getFullYear();
-const mm = String(today.getMonth() + 1).padStart(2, "0");
-const dd = String(today.getDate()).padStart(2, "0");
-const todayDateStr = `${yyyy}-${mm}-${dd}`; // e.g. 2025-11-16
-
-const yesterday = new Date(today);
-yesterday.setDate(today.getDate() - 1);
-const yyyyY = yesterday.getFullYear();
-const mmY = String(yesterday.getMonth() + 1).padStart(2, "0");
-const ddY = String(yesterday.getDate()).padStart(2, "0");
-const yesterdayDateStr = `${yyyyY}-${mmY}-${ddY}`; // e.g. 2025-11-15
-
 // Convert a model time string like "YYYY-MM-DDTHHMMSS" (UTC)
 // to a 12-hour PHST label using custom 6-hour cycle mapping:
 // 00Z -> 4:00 PM, 06Z -> 10:00 PM, 12Z -> 4:00 AM, 18Z -> 10:00 AM
@@ -52,71 +38,121 @@ const toPhstLabel = (modelTime) => {
   return `${hour12}:${minuteStr} ${period}`;
 };
 
-// Forecast products using the user's file naming pattern
-// We define four UTC hours and generate entries for both 5-day and 15-day
-// for today and yesterday, so that if today's images are not ready yet,
-// yesterday's latest run still appears.
-const FORECAST_HOURS = ["000000", "060000", "120000", "180000"]; // 00, 06, 12, 18 UTC
-const FORECAST_DATES = [todayDateStr, yesterdayDateStr];
-
-const FORECAST_OPTIONS = FORECAST_DATES.flatMap((dateStr) =>
-  FORECAST_HOURS.flatMap((hhmmss) => {
-    const modelTime = `${dateStr}T${hhmmss}`;
-    const hourUtc = hhmmss.slice(0, 2);
-
-    // For 00:00 UTC, your filenames omit the time part and use just the date,
-    // e.g. tropical_cyclone_15day_forecast_2025-11-16.png
-    const isMidnight = hhmmss === "000000";
-    const fiveDayImageSrc = isMidnight
-      ? `/assets/tropical_cyclone_5day_forecast_${dateStr}.png`
-      : `/assets/tropical_cyclone_5day_forecast_${modelTime}.png`;
-    const fifteenDayImageSrc = isMidnight
-      ? `/assets/tropical_cyclone_15day_forecast_${dateStr}.png`
-      : `/assets/tropical_cyclone_15day_forecast_${modelTime}.png`;
-
-    return [
-      {
-        id: `5day-${modelTime}`,
-        label: `5-day forecast (${dateStr} ${hourUtc}:00 UTC)`,
-        modelTime,
-        imageSrc: fiveDayImageSrc,
-      },
-      {
-        id: `15day-${modelTime}`,
-        label: `15-day forecast (${dateStr} ${hourUtc}:00 UTC)`,
+// Track products listed in the manifest written by the Python pipeline
+// (publish.record_product). Each product holds its latest runs, newest first.
+const MANIFEST_URL = "/data/products.json";
+const FORECAST_PRODUCTS = [
+  { key: "tracks_5day", id: "5day", name: "5-day forecast" },
+  { key: "tracks_15day", id: "15day", name: "15-day forecast" },
+];
+
+// "2025-11-16T06:00:00Z" -> model time "2025-11-16T060000"
+const toModelTime = (initUtc) => initUtc.replace(/:/g, "").replace(/Z$/, "");
+
+const buildOptions = (manifest) =>
+  FORECAST_PRODUCTS.flatMap(({ key, id, name }) =>
+    (manifest?.products?.[key] ?? []).map((entry) => {
+      const modelTime = toModelTime(entry.init_utc);
+      const [dateStr, timePart] = modelTime.split("T");
+      return {
+        id: `${id}-${modelTime}`,
+        label: `${name} (${dateStr} ${timePart.slice(0, 2)}:00 UTC)`,
         modelTime,
-        imageSrc: fifteenDayImageSrc,
-      },
-    ];
-  })
-);
+        imageSrc: entry.url,
+        width: entry.width,
+        height: entry.height,
+        variants: entry.variants ?? [],
+      };
+    })
+  );
+
+// Without a manifest (before the pipeline first writes one), fall back to
+// probing the image names of today's and yesterday's four runs, as the page
+// did before the manifest. 00 UTC images used to be named by date only.
+const FORECAST_HOURS = ["000000", "060000", "120000", "180000"]; // 00, 06, 12, 18 UTC
+
+const dateString = (date) =>
+  `${date.getFullYear()}-${String(date.getMonth() + 1).padStart(2, "0")}-${String(date.getDate()).padStart(2, "0")}`;
+
+const probeImage = (src) =>
+  new Promise((resolve) => {
+    const img = new Image();
+    img.onload = () => resolve(true);
+    img.onerror = () => resolve(false);
+    img.src = src;
+  });
+
+const probeOptions = () => {
+  const today = new Date();
+  const yesterday = new Date(today);
+  yesterday.setDate(today.getDate() - 1);
+
+  const candidates = [today, yesterday].map(dateString).flatMap((dateStr) =>
+    FORECAST_HOURS.flatMap((hhmmss) => {
+      const modelTime = `${dateStr}T${hhmmss}`;
+      return FORECAST_PRODUCTS.map(({ id, name }) => {
+        const base = `/assets/tropical_cyclone_${id}_forecast_`;
+        return {
+          id: `${id}-${modelTime}`,
+          label: `${name} (${dateStr} ${hhmmss.slice(0, 2)}:00 UTC)`,
+          modelTime,
+          sources: hhmmss === "000000"
+            ? [`${base}${modelTime}.png`, `${base}${dateStr}.png`]
+            : [`${base}${modelTime}.png`],
+          variants: [],
+        };
+      });
+    })
+  );
+
+  // First existing name of each candidate; candidates with none are dropped
+  return Promise.all(
+    candidates.map(async ({ sources, ...opt }) => {
+      for (const src of sources) {
+        if (await probeImage(src)) return { ...opt, imageSrc: src };
+      }
+      return null;
+    })
+  ).then((options) => options.filter(Boolean));
+};
+
+// <source> srcset per format from the responsive variants (plus the full PNG)
+const variantSources = (opt) => {
+  const byFormat = {};
+  opt.variants.forEach((v) => {
+    (byFormat[v.format] = byFormat[v.format] || []).push(`${v.url} ${v.width}w`);
+  });
+  if (opt.width) {
+    (byFormat.png = byFormat.png || []).push(`${opt.imageSrc} ${opt.width}w`);
+  }
+  return ["avif", "webp", "png"]
+    .filter((format) => byFormat[format])
+    .map((format) => ({ type: `image/${format}`, srcSet: byFormat[format].join(", ") }));
+};
 
 const Forecast = () => {
-  // IDs of options whose images have successfully loaded
-  const [availableIds, setAvailableIds] = useState([]);
+  const [availableOptions, setAvailableOptions] = useState([]);
   const [selectedId, setSelectedId] = useState(null);
 
-  // On mount, probe all forecast images and keep only those that exist
+  // On mount, fetch the small product manifest; only the selected image is downloaded.
+  // A missing manifest (or one without track products) falls back to probing images.
   useEffect(() => {
-    FORECAST_OPTIONS.forEach((opt) => {
-      const img = new Image();
-      img.onload = () => {
-        setAvailableIds((prev) =>
-          prev.includes(opt.id) ? prev : [...prev, opt.id]
-        );
-      };
-      img.onerror = () => {
-        setAvailableIds((prev) => prev.filter((id) => id !== opt.id));
-      };
-      img.src = opt.imageSrc;
-    });
+    let cancelled = false;
+    fetch(MANIFEST_URL, { cache: "no-cache" })
+      .then((resp) => (resp.ok ? resp.json() : null))
+      .catch(() => null)
+      .then((manifest) => {
+        const options = buildOptions(manifest);
+        return options.length ? options : probeOptions();
+      })
+      .then((options) => {
+        if (!cancelled) setAvailableOptions(options);
+      });
+    return () => {
+      cancelled = true;
+    };
   }, []);
 
-  // Start with all options that have a real image
-  const availableOptions = FORECAST_OPTIONS.filter((opt) =>
-    availableIds.includes(opt.id)
-  );
-
   // Collect distinct modelTime cycles, sort newest->oldest, and keep only the
   // latest four cycles (e.g. 00, 06, 12, 18 UTC). Older cycles are dropped.
   const latestModelTimes = Array.from(
@@ -197,11 +233,23 @@ const Forecast = () => {
             </div>
             <div className="h-80 md:h-[26rem] flex items-center justify-center bg-slate-900">
               {current ? (
-                <img
-                  src={imageSrc}
-                  alt={`Forecast track for ${current.label}`}
-                  className="h-full w-full object-contain"
-                />
+                <picture className="h-full w-full">
+                  {variantSources(current).map((source) => (
+                    <source
+                      key={source.type}
+                      type={source.type}
+                      srcSet={source.srcSet}
+                      sizes="(min-width: 1024px) 768px, 100vw"
+                    />
+                  ))}
+                  <img
+                    src={imageSrc}
+                    width={current.width ?? undefined}
+                    height={current.height ?? undefined}
+                    alt={`Forecast track for ${current.label}`}
+                    className="h-full w-full object-contain"
+                  />
+                </picture>
               ) : (
                 <span className="text-xs md:text-sm text-slate-500">
                   No forecast image available.
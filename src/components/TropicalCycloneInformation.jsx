@@ -52,6 +52,12 @@ const describeWindIntensity = (wind) => {
 
 const windIntensityPercent = (wind) => Math.min(100, Math.round((wind / 220) * 100));
 
+// Snapshot published by publish_atcf.py (WPAC filter and LPA labels applied server-side)
+const ATCF_SNAPSHOT_URL = "/data/atcf_wpac.json";
+
+// Missing snapshot fields are null; treat them as NaN like unparsable values
+const toNumber = (v) => (v === null || v === undefined ? NaN : Number(v));
+
 
 function isInsidePar(lat, lon) {
   let inside = false;
@@ -177,62 +183,22 @@ const TropicalCycloneInformation = () => {
     try {
       setLoading(true);
       setError(null);
-      const resp = await fetch("https://api.knackwx.com/atcf/v2");
+      const resp = await fetch(ATCF_SNAPSHOT_URL, { cache: "no-cache" });
       if (!resp.ok) {
         throw new Error(`HTTP ${resp.status}`);
       }
       const data = await resp.json();
-      if (!Array.isArray(data) || data.length === 0) {
-        setStorm(null);
-        setOtherStorms([]);
-        setWesternPacificStorms([]);
-        setSelectedWpIndex(0);
-        return;
-      }
-
-      const westernPacific = [];
-      const otherBasins = [];
-
-      data.forEach((item) => {
-        const parts = item.interp_sector_file?.split(/\s+/) || [];
-        if (parts.length < 6) {
-          otherBasins.push(item);
-          return;
-        }
-        const lat = parseFloat(parts[4]);
-        const lon = parseFloat(parts[5]);
-        if (
-          !isNaN(lat) &&
-          !isNaN(lon) &&
-          lat >= 0 &&
-          lat <= 40 &&
-          lon >= 105 &&
-          lon <= 170
-        ) {
-          westernPacific.push(item);
-        } else {
-          otherBasins.push(item);
-        }
-      });
-
-      const sortByUpdatedDesc = (arr) =>
-        arr.sort((a, b) => {
-          const ta = new Date(a.last_updated).getTime();
-          const tb = new Date(b.last_updated).getTime();
-          return tb - ta;
-        });
-
-      if (westernPacific.length) {
-        const sortedWp = sortByUpdatedDesc(westernPacific);
+      // Both lists are already sorted newest first
+      const sortedWp = Array.isArray(data?.systems) ? data.systems : [];
+      const otherBasins = Array.isArray(data?.other) ? data.other : [];
 
+      if (sortedWp.length) {
         let primaryStorm = null;
         let primaryIndex = 0;
         for (let i = 0; i < sortedWp.length; i++) {
           const item = sortedWp[i];
-          const parts = item.interp_sector_file?.split(/\s+/) || [];
-          if (parts.length < 6) continue;
-          const lat = parseFloat(parts[4]);
-          const lon = parseFloat(parts[5]);
+          const lat = toNumber(item.lat);
+          const lon = toNumber(item.lon);
           if (isNaN(lat) || isNaN(lon)) continue;
           if (isInsidePar(lat, lon)) {
             primaryStorm = item;
@@ -255,7 +221,7 @@ const TropicalCycloneInformation = () => {
         setSelectedWpIndex(0);
       }
 
-      setOtherStorms(sortByUpdatedDesc(otherBasins));
+      setOtherStorms(otherBasins);
     } catch (err) {
       console.error("Error loading tropical disturbance information:", err);
       setError("Unable to load tropical disturbance information at the moment.");
@@ -281,18 +247,15 @@ const TropicalCycloneInformation = () => {
   // Pre-compute detailed fields for the primary Western Pacific storm, if present
   let mainStorm = null;
   if (hasWesternPacificStorm && storm) {
-    const parts = storm.interp_sector_file?.split(/\s+/) || [];
-    const rawName = parts[1] || storm.atcf_id || "Tropical Disturbance";
+    const rawName = storm.name || storm.atcf_id || "Tropical Disturbance";
 
-    const dateStr = parts[2] || "";
-    const timeStr = parts[3] || "";
-    const lat = parseFloat(parts[4]);
-    const lon = parseFloat(parts[5]);
-    const winds1MinKnots = parseFloat(parts[8]);
+    const lat = toNumber(storm.lat);
+    const lon = toNumber(storm.lon);
+    const winds1MinKnots = toNumber(storm.wind_kt);
 
-    const pressure = parseFloat(parts[9]);
-    const speedKnots = parseFloat(parts[10]);
-    const directionDeg = parseFloat(parts[11]);
+    const pressure = toNumber(storm.pressure_hpa);
+    const speedKnots = toNumber(storm.speed_kt);
+    const directionDeg = toNumber(storm.heading_deg);
 
     const wind10MinKmh = to10MinWindKmH(winds1MinKnots || 0);
     const gustKmh = toGustKmH(wind10MinKmh);
@@ -320,18 +283,7 @@ const TropicalCycloneInformation = () => {
 
     const { distance, direction } = distanceAndBearingKmFromManila(lat, lon);
 
-    const dataTimeStr = (() => {
-      if (!dateStr || !timeStr || dateStr.length < 8 || timeStr.length < 4) {
-        return formatDataTime(storm.last_updated);
-      }
-      const yyyy = dateStr.substring(0, 4);
-      const mm = dateStr.substring(4, 6);
-      const dd = dateStr.substring(6, 8);
-      const hh = timeStr.substring(0, 2);
-      const min = timeStr.substring(2, 4);
-      const iso = `${yyyy}-${mm}-${dd}T${hh}:${min}:00Z`;
-      return formatDataTime(iso);
-    })();
+    const dataTimeStr = formatDataTime(storm.time || storm.last_updated);
 
     const { displayName, intlName, pagasaName } = getStormDisplayName(
       rawName,
@@ -450,14 +402,9 @@ const TropicalCycloneInformation = () => {
                           className="rounded-full border border-slate-700 bg-slate-900/80 px-3 py-1 text-xs text-slate-200"
                         >
                           {westernPacificStorms.map((s, index) => {
-                            const parts = s.interp_sector_file?.split(/\s+/) || [];
-                            const rawName = parts[1] || s.atcf_id || "Tropical Disturbance";
-                            let optionLabel = rawName;
-                            if (optionLabel.toUpperCase().includes("INVEST")) {
-                              optionLabel = "Low Pressure Area";
-                            }
-                            const lat = parseFloat(parts[4]);
-                            const lon = parseFloat(parts[5]);
+                            const optionLabel = s.label || s.atcf_id || "Tropical Disturbance";
+                            const lat = toNumber(s.lat);
+                            const lon = toNumber(s.lon);
                             const inPar = !isNaN(lat) && !isNaN(lon) && isInsidePar(lat, lon);
                             const suffix = inPar ? " (inside PAR)" : " (outside PAR)";
                             return (
@@ -640,24 +587,23 @@ const TropicalCycloneInformation = () => {
                 </p>
                 <div className="grid grid-cols-1 gap-5 md:grid-cols-2">
                   {otherStorms.map((s) => {
-                    const parts = s.interp_sector_file?.split(/\s+/) || [];
-                    const lat = parseFloat(parts[4]);
-                    const lon = parseFloat(parts[5]);
-                    const winds1MinKnots = parseFloat(parts[8]);
-                    const pressure = parseFloat(parts[9]);
-                    const speedKnots = parseFloat(parts[10]);
+                    const lat = toNumber(s.lat);
+                    const lon = toNumber(s.lon);
+                    const winds1MinKnots = toNumber(s.wind_kt);
+                    const pressure = toNumber(s.pressure_hpa);
+                    const speedKnots = toNumber(s.speed_kt);
 
                     const wind10 = to10MinWindKmH(winds1MinKnots || 0);
                     const gust10 = toGustKmH(wind10);
                     const cls = classifyTropicalCyclone(wind10);
                     const insidePar = isInsidePar(lat, lon);
-                    const rawName = parts[1] || s.atcf_id || "Tropical Disturbance";
+                    const rawName = s.name || s.atcf_id || "Tropical Disturbance";
                     const refinedName = getStormDisplayName(rawName, cls.code, insidePar, s.atcf_id);
                     const displayName = refinedName.displayName;
                     const validSpeed = speedKnots !== null && !isNaN(speedKnots) && speedKnots >= 0;
                     const movementSpeedKmh = validSpeed ? Math.round(speedKnots * 1.852) : null;
 
-                    const directionValue = parseFloat(parts[11]);
+                    const directionValue = toNumber(s.heading_deg);
                     const movementLabel = (!isNaN(directionValue) && directionValue >= 0) ? getDirectionLabel(directionValue) : null;
                     const movementWord = getDirectionWord(movementLabel);
                     const movementText = (movementSpeedKmh !== null)
@@ -0,0 +1,201 @@
+"""
+Track strike probability: the share of ensemble members whose track passes
+within a given radius of each grid cell.
+
+Member track segments are densified along the great circle in vectorized
+batches, and the densified points are matched to the grid cells within the
+radius with KD-tree range queries on unit vectors (chord distance is
+monotonic in great-circle distance). Each query takes as many points as keep
+the estimated (point, cell) pairs under MAX_QUERY_PAIRS, so a large radius
+means more, smaller queries rather than more memory. Hits are marked in a
+dense (sample, cell) array, so a member with several storms near a cell still
+counts once.
+
+    python strike_probability.py --radius-km 120 --max-lead-hours 120
+    python strike_probability.py --regions wpac luzon visayas mindanao
+"""
+import argparse
+import io
+import json
+import os
+import sys
+
+import matplotlib.pyplot as plt
+import matplotlib.colors as mcolors
+import cartopy.crs as ccrs
+import numpy as np
+from scipy.spatial import cKDTree
+
+from ensemble_tracks import (
+    EARTH_RADIUS_KM, MAX_QUERY_PAIRS, build_track_arrays, chord_for_km, densify_segments, to_unit_vectors,
+    valid_segments,
+)
+from fnv3_ingest import load_latest_run_or_exit
+from map_common import (
+    DEFAULT_REGION, MAP_EXTENT, REGIONS, crop_grid, grid_axes, region_suffix, setup_plain_map,
+)
+from publish import save_figure, write_if_changed
+
+DEFAULT_RADIUS_KM = 120.0
+DEFAULT_MAX_LEAD_HOURS = 120
+DEFAULT_RESOLUTION_DEG = 0.25
+
+OUTPUT_DIR = "public/assets"
+GRID_DIR = "public/data"
+
+PROBABILITY_LEVELS = [5, 10, 20, 30, 40, 50, 60, 70, 80, 90, 100]
+
+
+def strike_probability(tracks, radius_km=DEFAULT_RADIUS_KM, max_lead_hours=DEFAULT_MAX_LEAD_HOURS,
+                       extent=MAP_EXTENT, resolution=DEFAULT_RESOLUTION_DEG, member_chunk=2000,
+                       max_pairs=MAX_QUERY_PAIRS):
+    """
+    Fraction (0-1) of ensemble samples passing within radius_km of each cell.
+
+    tracks is the dict from ensemble_tracks.build_track_arrays(). Returns
+    (probability, lons, lats) with probability shaped (len(lats), len(lons))
+    as float32. member_chunk is how many member tracks are densified at once;
+    each range query takes as many of their points as keep the estimated
+    pairs (pi radius^2 / cell area per point) under max_pairs.
+    """
+    lons, lats = grid_axes(extent, resolution)
+    # Smallest cell (highest latitude), so pair estimates err on the high side
+    cell_area_km2 = (resolution * np.pi / 180.0 * EARTH_RADIUS_KM) ** 2 * np.cos(np.radians(np.abs(lats).max()))
+    grid_lon, grid_lat = np.meshgrid(lons, lats)
+    cell_tree = cKDTree(to_unit_vectors(grid_lon.ravel(), grid_lat.ravel()))
+    n_cells = grid_lon.size
+    num_samples = len(tracks['samples'])
+    # One flag per (sample, cell) so each sample counts once per cell
+    hit = np.zeros(max(num_samples, 1) * n_cells, dtype=bool)
+
+    keep_leads = tracks['lead_hours'] <= max_lead_hours
+    lon = tracks['lon'][:, keep_leads]
+    lat = tracks['lat'][:, keep_leads]
+    ok = valid_segments({'lon': lon, 'lat': lat})
+
+    # Densify finely enough that point distance is within ~1% of segment distance
+    spacing_km = radius_km / 4.0
+    chord = chord_for_km(radius_km)
+    points_per_query = max(1, int(max_pairs // max(1.0, np.pi * radius_km ** 2 / cell_area_km2)))
+    for start in range(0, lon.shape[0], member_chunk):
+        rows, cols = np.nonzero(ok[start:start + member_chunk])
+        if len(rows) == 0:
+            continue
+        rows += start
+        xyz, seg, _ = densify_segments(lon[rows, cols], lat[rows, cols],
+                                       lon[rows, cols + 1], lat[rows, cols + 1], spacing_km)
+        point_sample = tracks['sample_index'][rows[seg]].astype(np.int64)
+        for first in range(0, len(xyz), points_per_query):
+            sl = slice(first, first + points_per_query)
+            pairs = cKDTree(xyz[sl]).sparse_distance_matrix(cell_tree, chord, output_type='ndarray')
+            hit[point_sample[sl][pairs['i']] * n_cells + pairs['j']] = True
+
+    counts = np.count_nonzero(hit.reshape(-1, n_cells), axis=0)
+    probability = (counts / max(num_samples, 1)).astype(np.float32).reshape(grid_lon.shape)
+    return probability, lons, lats
+
+
+def save_grid(probability, lons, lats, run, radius_km, max_lead_hours, grid_dir=GRID_DIR):
+    """Write the float32 grid (.npy) and a JSON sidecar describing it."""
+    base = os.path.join(grid_dir, "strike_probability_latest")
+    buf = io.BytesIO()
+    np.save(buf, probability.astype(np.float32), allow_pickle=False)
+    write_if_changed(f"{base}.npy", buf.getvalue())
+
+    meta = {
+        'run_id': run['run_id'],
+        'init_utc': run['init_utc'].strftime("%Y-%m-%dT%H:%M:%SZ"),
+        'radius_km': radius_km,
+        'max_lead_hours': max_lead_hours,
+        'dtype': 'float32',
+        'shape': list(probability.shape),
+        'lon_min': float(lons[0]),
+        'lat_min': float(lats[0]),
+        'resolution_deg': float(lons[1] - lons[0]),
+        'row_order': 'south_to_north',
+    }
+    write_if_changed(f"{base}.json", (json.dumps(meta, indent=2) + "\n").encode("utf-8"))
+    print(f"Grid saved to {base}.npy")
+
+
+def strike_probability_figure(probability, lons, lats, run, radius_km, max_lead_hours, extent=MAP_EXTENT,
+                              region_title=REGIONS[DEFAULT_REGION]['title']):
+    """Build the strike probability map figure (not saved)."""
+    fig, ax = setup_plain_map(extent)
+
+    percent = np.ma.masked_less(probability * 100, PROBABILITY_LEVELS[0])
+    cmap = plt.get_cmap('YlOrRd', len(PROBABILITY_LEVELS) - 1)
+    norm = mcolors.BoundaryNorm(PROBABILITY_LEVELS, cmap.N)
+    mesh = ax.pcolormesh(lons, lats, percent, cmap=cmap, norm=norm, alpha=0.85,
+                         shading='nearest', transform=ccrs.PlateCarree())
+    cbar = fig.colorbar(mesh, ax=ax, orientation='horizontal', pad=0.05, fraction=0.04, aspect=40)
+    cbar.set_label(f"Probability of a tropical cyclone passing within {radius_km:.0f} km (%)",
+                   fontsize=11, weight='bold')
+
+    legend_text = (
+        f"Forecast: Strike Probability ({max_lead_hours // 24}-Day)\n"
+        f"Runtime: {run.get('init_text') or 'Runtime unavailable'}\n"
+        "Processed By: Philippine Typhoon/Weather"
+    )
+    ax.text(
+        0.98, 0.02, legend_text,
+        transform=ax.transAxes, fontsize=10, verticalalignment='bottom', horizontalalignment='right',
+        bbox=dict(facecolor='white', alpha=0.8, edgecolor='black', boxstyle='round,pad=0.3')
+    )
+    ax.set_title(
+        f"{max_lead_hours // 24}-Day Tropical Cyclone Strike Probability ({radius_km:.0f} km) - {region_title}",
+        fontsize=16, weight='bold'
+    )
+    return fig
+
+
+def render_strike_probability(probability, lons, lats, run, radius_km, max_lead_hours, region=DEFAULT_REGION,
+                              output_dir=OUTPUT_DIR):
+    """Render the strike probability map of one region; returns the output path or None."""
+    extent = REGIONS[region]['extent']
+    probability, lons, lats = crop_grid(probability, lons, lats, extent)
+    fig = strike_probability_figure(probability, lons, lats, run, radius_km, max_lead_hours,
+                                    extent=extent, region_title=REGIONS[region]['title'])
+    suffix = region_suffix(region)
+    output_file = os.path.join(output_dir, f"tropical_cyclone_strike_probability{suffix}_{run['file_stamp']}.png")
+    try:
+        digest, written = save_figure(fig, output_file, product=f"strike_probability{suffix}", run=run)
+        if written:
+            print(f"Plot saved to {output_file} (sha256 {digest[:12]})")
+    except Exception as e:
+        print(f"Error saving plot: {str(e)}")
+        output_file = None
+    plt.close(fig)
+    return output_file
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ensemble track strike probability from the latest FNV3 run.")
+    parser.add_argument('--radius-km', type=float, default=DEFAULT_RADIUS_KM)
+    parser.add_argument('--max-lead-hours', type=int, default=DEFAULT_MAX_LEAD_HOURS)
+    parser.add_argument('--resolution', type=float, default=DEFAULT_RESOLUTION_DEG,
+                        help="Grid spacing in degrees")
+    parser.add_argument('--regions', nargs='+', choices=list(REGIONS), default=[DEFAULT_REGION],
+                        help="Map regions to render from the same grid")
+    args = parser.parse_args(argv)
+    regions = list(dict.fromkeys(args.regions))
+
+    data, run = load_latest_run_or_exit()
+
+    tracks = build_track_arrays(data, args.max_lead_hours)
+    probability, lons, lats = strike_probability(tracks, args.radius_km, args.max_lead_hours,
+                                                 resolution=args.resolution)
+    print(f"Strike probability from {len(tracks['members'])} member tracks, "
+          f"{len(tracks['samples'])} samples; max {probability.max() * 100:.0f}%")
+
+    save_grid(probability, lons, lats, run, args.radius_km, args.max_lead_hours)
+    # Every region is a crop of the one Western Pacific grid
+    failed = [region for region in regions
+              if render_strike_probability(probability, lons, lats, run, args.radius_km, args.max_lead_hours,
+                                           region=region) is None]
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""
+Ensemble mean track and spread per track_id.
+
+Members are aligned on lead time and stacked per track_id (see
+ensemble_tracks.group_members), so every statistic is a single
+nan-reduction over the member axis:
+
+  - spherical mean position (normalized mean of unit vectors)
+  - along-/cross-track spread (RMS member displacement from the mean,
+    projected on the mean track heading)
+  - median minimum pressure and maximum wind
+
+    python track_statistics.py            # JSON only
+    python track_statistics.py --plot     # JSON + mean-track map
+"""
+import argparse
+import json
+import os
+import sys
+import warnings
+
+import matplotlib.pyplot as plt
+import cartopy.crs as ccrs
+import numpy as np
+
+from ensemble_tracks import EARTH_RADIUS_KM, build_track_arrays, group_members, to_unit_vectors
+from fnv3_ingest import load_latest_run_or_exit
+from map_common import setup_plain_map
+from publish import save_figure, write_if_changed
+
+DEFAULT_MAX_LEAD_HOURS = 360
+
+# Lead times with fewer members than this are left out of the statistics
+MIN_MEMBERS = 3
+
+OUTPUT_DIR = "public/assets"
+JSON_PATH = "public/data/track_statistics.json"
+
+
+def _nan_reduce(func, values, axis=1):
+    # All-NaN slices are expected (missing leads); silence their warnings
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        return func(values, axis=axis)
+
+
+def _track_step(values):
+    """Per-lead step along axis 1: mean of forward and backward differences."""
+    diff = np.diff(values, axis=1)
+    pad = np.full(values.shape[:1] + (1,), np.nan)
+    forward = np.concatenate([diff, pad], axis=1)
+    backward = np.concatenate([pad, diff], axis=1)
+    return _nan_reduce(np.nanmean, np.stack([forward, backward]), axis=0)
+
+
+def track_statistics(tracks, min_members=MIN_MEMBERS):
+    """
+    Per-track_id, per-lead ensemble statistics as (n_tracks, n_leads) arrays.
+
+    Returns a dict with track_ids, lead_hours, count, mean_lon, mean_lat,
+    heading_deg (direction of motion, clockwise from north), along_km,
+    cross_km, pressure_median and wind_median. Entries with fewer than
+    min_members members are NaN.
+    """
+    grouped, sizes = group_members(tracks)
+    lon = grouped['lon'].astype(np.float64)
+    lat = grouped['lat'].astype(np.float64)
+    count = np.sum(~np.isnan(lon), axis=1)
+
+    # Spherical mean position
+    mean_vec = _nan_reduce(np.nanmean, to_unit_vectors(lon, lat))
+    mean_vec /= np.linalg.norm(mean_vec, axis=-1, keepdims=True)
+    mean_lat = np.degrees(np.arcsin(np.clip(mean_vec[..., 2], -1.0, 1.0)))
+    mean_lon = np.degrees(np.arctan2(mean_vec[..., 1], mean_vec[..., 0])) % 360.0
+
+    # Member displacements from the mean in a local east/north plane (km)
+    dlon = (lon - mean_lon[:, None, :] + 180.0) % 360.0 - 180.0
+    east = np.radians(dlon) * EARTH_RADIUS_KM * np.cos(np.radians(mean_lat))[:, None, :]
+    north = np.radians(lat - mean_lat[:, None, :]) * EARTH_RADIUS_KM
+
+    # Mean-track heading: average of forward and backward steps, so the first
+    # and last valid leads still get a direction
+    step_east = _track_step(np.radians(mean_lon)) * EARTH_RADIUS_KM * np.cos(np.radians(mean_lat))
+    step_north = _track_step(np.radians(mean_lat)) * EARTH_RADIUS_KM
+    step_norm = np.hypot(step_east, step_north)
+    still = ~(step_norm > 0)
+    along_e = np.where(still, 0.0, step_east / np.where(still, 1.0, step_norm))
+    along_n = np.where(still, 1.0, step_north / np.where(still, 1.0, step_norm))
+
+    along = east * along_e[:, None, :] + north * along_n[:, None, :]
+    cross = -east * along_n[:, None, :] + north * along_e[:, None, :]
+
+    enough = count >= min_members
+    stats = {
+        'track_ids': tracks['track_ids'],
+        'members': sizes,
+        'lead_hours': tracks['lead_hours'],
+        'count': count,
+        'mean_lon': mean_lon,
+        'mean_lat': mean_lat,
+        'heading_deg': np.degrees(np.arctan2(along_e, along_n)) % 360.0,
+        'along_km': np.sqrt(_nan_reduce(np.nanmean, along ** 2)),
+        'cross_km': np.sqrt(_nan_reduce(np.nanmean, cross ** 2)),
+        'pressure_median': _nan_reduce(np.nanmedian, grouped['pressure']),
+        'wind_median': _nan_reduce(np.nanmedian, grouped['wind']),
+    }
+    for name in ['mean_lon', 'mean_lat', 'heading_deg', 'along_km', 'cross_km', 'pressure_median', 'wind_median']:
+        stats[name] = np.where(enough, stats[name], np.nan)
+    return stats
+
+
+def _rounded(values, digits):
+    return [None if np.isnan(v) else round(float(v), digits) for v in values]
+
+
+def statistics_to_json(stats, run):
+    """Compact JSON-able dict of the statistics, one entry per track_id."""
+    tracks = []
+    for g, track_id in enumerate(stats['track_ids']):
+        keep = ~np.isnan(stats['mean_lon'][g])
+        if not keep.any():
+            continue
+        tracks.append({
+            'track_id': str(track_id),
+            'members': int(stats['members'][g]),
+            'lead_hours': [int(h) for h in stats['lead_hours'][keep]],
+            'count': [int(c) for c in stats['count'][g][keep]],
+            'lon': _rounded(stats['mean_lon'][g][keep], 2),
+            'lat': _rounded(stats['mean_lat'][g][keep], 2),
+            'heading_deg': _rounded(stats['heading_deg'][g][keep], 0),
+            'along_km': _rounded(stats['along_km'][g][keep], 0),
+            'cross_km': _rounded(stats['cross_km'][g][keep], 0),
+            'pressure_median_hpa': _rounded(stats['pressure_median'][g][keep], 1),
+            'wind_median_kt': _rounded(stats['wind_median'][g][keep], 1),
+        })
+    return {
+        'run_id': run['run_id'],
+        'init_utc': run['init_utc'].strftime("%Y-%m-%dT%H:%M:%SZ"),
+        'tracks': tracks,
+    }
+
+
+def spread_ellipse(lon, lat, along_km, cross_km, heading_deg, n=48):
+    """Lon/lat outline of an along/cross-track spread ellipse around (lon, lat)."""
+    theta = np.linspace(0.0, 2.0 * np.pi, n)
+    a, c = along_km * np.cos(theta), cross_km * np.sin(theta)
+    h = np.radians(heading_deg)
+    east = a * np.sin(h) + c * np.cos(h)
+    north = a * np.cos(h) - c * np.sin(h)
+    lats = lat + np.degrees(north / EARTH_RADIUS_KM)
+    lons = lon + np.degrees(east / (EARTH_RADIUS_KM * np.cos(np.radians(lat))))
+    return lons, lats
+
+
+def plot_track_statistics(ax, stats, ellipse_every_hours=24):
+    """Overlay mean tracks and spread ellipses on an existing map axes."""
+    for g in range(len(stats['track_ids'])):
+        keep = ~np.isnan(stats['mean_lon'][g])
+        if keep.sum() < 2:
+            continue
+        ax.plot(stats['mean_lon'][g][keep], stats['mean_lat'][g][keep], color='black', linewidth=2.5,
+                transform=ccrs.PlateCarree(), zorder=20)
+        for t in np.flatnonzero(keep):
+            hours = stats['lead_hours'][t]
+            if hours == 0 or hours % ellipse_every_hours:
+                continue
+            lons, lats = spread_ellipse(stats['mean_lon'][g][t], stats['mean_lat'][g][t],
+                                        stats['along_km'][g][t], stats['cross_km'][g][t],
+                                        stats['heading_deg'][g][t])
+            ax.plot(lons, lats, color='black', linewidth=1, linestyle='--', alpha=0.7,
+                    transform=ccrs.PlateCarree(), zorder=19)
+            ax.plot(stats['mean_lon'][g][t], stats['mean_lat'][g][t], marker='o', markersize=5,
+                    color='black', transform=ccrs.PlateCarree(), zorder=21)
+
+
+def render_track_statistics(stats, run, max_lead_hours, output_dir=OUTPUT_DIR):
+    fig, ax = setup_plain_map()
+    plot_track_statistics(ax, stats)
+    ax.text(
+        0.98, 0.02,
+        "Ensemble mean tracks with along/cross-track spread (1 s.d., every 24 h)\n"
+        f"Runtime: {run.get('init_text') or 'Runtime unavailable'}\n"
+        "Processed By: Philippine Typhoon/Weather",
+        transform=ax.transAxes, fontsize=10, verticalalignment='bottom', horizontalalignment='right',
+        bbox=dict(facecolor='white', alpha=0.8, edgecolor='black', boxstyle='round,pad=0.3')
+    )
+    ax.set_title(f"{max_lead_hours // 24}-Day Ensemble Mean Tracks - Western Pacific", fontsize=16, weight='bold')
+
+    output_file = os.path.join(output_dir, f"tropical_cyclone_mean_tracks_{run['file_stamp']}.png")
+    try:
+        digest, written = save_figure(fig, output_file, product='mean_tracks', run=run)
+        if written:
+            print(f"Plot saved to {output_file} (sha256 {digest[:12]})")
+    except Exception as e:
+        print(f"Error saving plot: {str(e)}")
+        output_file = None
+    plt.close(fig)
+    return output_file
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ensemble mean track and spread per track_id.")
+    parser.add_argument('--max-lead-hours', type=int, default=DEFAULT_MAX_LEAD_HOURS)
+    parser.add_argument('--plot', action='store_true', help="Also render the mean-track map")
+    args = parser.parse_args(argv)
+
+    data, run = load_latest_run_or_exit()
+    tracks = build_track_arrays(data, args.max_lead_hours)
+    stats = track_statistics(tracks)
+
+    payload = statistics_to_json(stats, run)
+    write_if_changed(JSON_PATH, (json.dumps(payload, separators=(',', ':')) + "\n").encode("utf-8"))
+    print(f"Track statistics for {len(payload['tracks'])} track_ids written to {JSON_PATH}")
+
+    if args.plot and render_track_statistics(stats, run, args.max_lead_hours) is None:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+"""
+Compact vector export of the forecast products for interactive maps.
+
+Writes coordinate-quantised GeoJSON (coordinates rounded to COORD_PRECISION
+decimal places, about 1 km) under public/data/vector/:
+
+    tracks_latest.geojson   ensemble member tracks, one LineString per
+                            continuous piece, with the pressure class of every
+                            vertex (index into PRESSURE_BANDS)
+    tracks_latest.bin       the same tracks, delta + varint encoded
+    atcf_latest.geojson     current WPAC ATCF positions
+    areas_<window>.geojson  development-area polygons with probabilities
+                            (written by genesis_outlook.py for each window)
+
+Vertex lead times are not repeated per vertex: each track piece stores the
+index of its first lead into the collection's lead_hours array and vertices
+follow consecutive leads.
+
+    python vector_export.py --max-lead-hours 360
+    python vector_export.py --no-atcf
+"""
+import argparse
+import json
+import os
+import struct
+
+import numpy as np
+import shapely
+from shapely.geometry import mapping
+
+from atcf_client import fetch_systems_async
+from ensemble_tracks import build_track_arrays, valid_segments
+from fnv3_ingest import load_latest_run_or_exit
+from intensity_quantiles import PRESSURE_BANDS, pressure_band_index
+from publish import write_if_changed
+
+DEFAULT_MAX_LEAD_HOURS = 360
+
+# Decimal places kept in coordinates (0.01 deg ~ 1.1 km)
+COORD_PRECISION = 2
+# Outline simplification before quantising area polygons (degrees)
+AREA_SIMPLIFY_DEG = 0.05
+
+VECTOR_DIR = "public/data/vector"
+
+BINARY_MAGIC = b"PHVT"
+BINARY_VERSION = 1
+# Pressure class of vertices with no pressure
+MISSING_CLASS = 255
+
+
+def _quantise(values, precision=COORD_PRECISION):
+    return np.round(np.asarray(values, dtype=np.float64), precision)
+
+
+def _feature_collection(features, **members):
+    return dict({'type': 'FeatureCollection'}, **members, features=features)
+
+
+def write_geojson(path, collection):
+    """Compact GeoJSON through write_if_changed; returns the byte size."""
+    data = (json.dumps(collection, separators=(',', ':')) + "\n").encode("utf-8")
+    write_if_changed(path, data)
+    return len(data)
+
+
+def track_pieces(tracks, max_lead_hours=DEFAULT_MAX_LEAD_HOURS):
+    """
+    Split every member into continuous pieces (runs of valid segments).
+
+    Returns (member, start, count): per piece its member row, first lead
+    index and number of vertices (>= 2). Pieces are ordered by member, then
+    lead; isolated points are dropped.
+    """
+    keep = int(np.searchsorted(tracks['lead_hours'], max_lead_hours, side='right'))
+    valid = valid_segments({'lon': tracks['lon'][:, :keep], 'lat': tracks['lat'][:, :keep]})
+    edges = np.diff(np.pad(valid, ((0, 0), (1, 1))).astype(np.int8), axis=1)
+    member, start = np.nonzero(edges == 1)
+    _, end = np.nonzero(edges == -1)
+    return member, start, end - start + 1
+
+
+def _piece_vertices(member, start, count):
+    """Row and lead index of every vertex, pieces concatenated in order."""
+    first = np.repeat(np.cumsum(count) - count, count)
+    step = np.arange(count.sum()) - first
+    return np.repeat(member, count), np.repeat(start, count) + step
+
+
+def tracks_to_geojson(tracks, run, max_lead_hours=DEFAULT_MAX_LEAD_HOURS, precision=COORD_PRECISION):
+    """FeatureCollection of member track pieces with per-vertex pressure class."""
+    member, start, count = track_pieces(tracks, max_lead_hours)
+    rows, cols = _piece_vertices(member, start, count)
+    lon = _quantise(tracks['lon'][rows, cols], precision)
+    lat = _quantise(tracks['lat'][rows, cols], precision)
+    classes = pressure_band_index(tracks['pressure'][rows, cols])
+
+    features = []
+    offsets = np.concatenate([[0], np.cumsum(count)])
+    for k in range(len(member)):
+        s = slice(offsets[k], offsets[k + 1])
+        m = member[k]
+        features.append({
+            'type': 'Feature',
+            'geometry': {'type': 'LineString', 'coordinates': np.column_stack([lon[s], lat[s]]).tolist()},
+            'properties': {
+                'track_id': str(tracks['track_ids'][tracks['track_index'][m]]),
+                'sample': int(tracks['samples'][tracks['sample_index'][m]]),
+                'lead_index': int(start[k]),
+                'pressure_class': [None if c < 0 else int(c) for c in classes[s]],
+            },
+        })
+    keep = tracks['lead_hours'] <= max_lead_hours
+    return _feature_collection(
+        features,
+        run_id=run['run_id'],
+        init_utc=run['init_utc'].strftime("%Y-%m-%dT%H:%M:%SZ"),
+        lead_hours=[int(h) for h in tracks['lead_hours'][keep]],
+        pressure_classes=PRESSURE_BANDS,
+    )
+
+
+def _varints(values):
+    """Zigzag + LEB128 varint encoding of an int64 array (vectorized)."""
+    values = np.asarray(values, dtype=np.int64)
+    zigzag = ((values << 1) ^ (values >> 63)).astype(np.uint64)
+    bits = np.floor(np.log2(np.maximum(zigzag, 1).astype(np.float64))).astype(np.int64) + 1
+    nbytes = (bits + 6) // 7
+    offsets = np.cumsum(nbytes) - nbytes
+    out = np.empty(int(nbytes.sum()), dtype=np.uint8)
+    for j in range(int(nbytes.max()) if len(nbytes) else 0):
+        on = nbytes > j
+        byte = (zigzag[on] >> np.uint64(7 * j)) & np.uint64(0x7F)
+        more = np.where(nbytes[on] - 1 > j, 0x80, 0).astype(np.uint64)
+        out[offsets[on] + j] = byte | more
+    return out.tobytes()
+
+
+def _read_varints(data):
+    """Decode a stream written by _varints()."""
+    raw = np.frombuffer(data, dtype=np.uint8)
+    if not len(raw):
+        return np.empty(0, dtype=np.int64)
+    last = raw < 0x80
+    starts = np.concatenate([[0], np.flatnonzero(last)[:-1] + 1])
+    shift = np.arange(len(raw)) - np.repeat(starts, np.diff(np.concatenate([starts, [len(raw)]])))
+    zigzag = np.add.reduceat((raw & 0x7F).astype(np.uint64) << (7 * shift).astype(np.uint64), starts)
+    return (zigzag >> np.uint64(1)).astype(np.int64) ^ -(zigzag & np.uint64(1)).astype(np.int64)
+
+
+def tracks_to_binary(tracks, run, max_lead_hours=DEFAULT_MAX_LEAD_HOURS, precision=COORD_PRECISION):
+    """
+    Delta-encoded binary form of tracks_to_geojson() (little-endian):
+
+        magic "PHVT", uint8 version, uint8 precision, uint16 n_leads,
+        uint16 n_track_ids, uint32 n_pieces, uint32 n_vertices
+        int16  lead_hours[n_leads]
+        track ids: uint8 length + UTF-8 bytes each
+        uint16 track[n_pieces], int32 sample[n_pieces],
+        uint16 lead_index[n_pieces], uint16 count[n_pieces]
+        uint8  pressure_class[n_vertices]  (255 = missing)
+        varints: lon, lat of every vertex in units of 10^-precision degrees,
+                 zigzag-encoded, absolute for a piece's first vertex and
+                 deltas from the previous vertex otherwise
+    """
+    member, start, count = track_pieces(tracks, max_lead_hours)
+    rows, cols = _piece_vertices(member, start, count)
+    scale = 10 ** precision
+    xy = np.column_stack([
+        np.round(tracks['lon'][rows, cols].astype(np.float64) * scale),
+        np.round(tracks['lat'][rows, cols].astype(np.float64) * scale),
+    ]).astype(np.int64)
+    delta = np.diff(xy, axis=0, prepend=np.zeros((1, 2), dtype=np.int64))
+    first = np.cumsum(count) - count
+    delta[first] = xy[first]
+    classes = pressure_band_index(tracks['pressure'][rows, cols])
+
+    lead_hours = tracks['lead_hours'][tracks['lead_hours'] <= max_lead_hours]
+    track_ids = [str(t).encode("utf-8") for t in tracks['track_ids']]
+    parts = [
+        BINARY_MAGIC,
+        struct.pack("<BBHHII", BINARY_VERSION, precision, len(lead_hours), len(track_ids), len(member), len(rows)),
+        lead_hours.astype("<i2").tobytes(),
+        b"".join(struct.pack("<B", len(t)) + t for t in track_ids),
+        tracks['track_index'][member].astype("<u2").tobytes(),
+        tracks['samples'][tracks['sample_index'][member]].astype("<i4").tobytes(),
+        start.astype("<u2").tobytes(),
+        count.astype("<u2").tobytes(),
+        np.where(classes < 0, MISSING_CLASS, classes).astype(np.uint8).tobytes(),
+        _varints(delta.ravel()),
+    ]
+    return b"".join(parts)
+
+
+def read_tracks_binary(data):
+    """Decode tracks_to_binary() output into a dict of arrays (lon/lat per vertex)."""
+    if data[:4] != BINARY_MAGIC:
+        raise ValueError("Not a vector track file")
+    version, precision, n_leads, n_tracks, n_pieces, n_vertices = struct.unpack_from("<BBHHII", data, 4)
+    if version != BINARY_VERSION:
+        raise ValueError(f"Unsupported vector track version {version}")
+    pos = 4 + struct.calcsize("<BBHHII")
+
+    def take(dtype, n):
+        nonlocal pos
+        values = np.frombuffer(data, dtype=dtype, count=n, offset=pos)
+        pos += values.nbytes
+        return values
+
+    lead_hours = take("<i2", n_leads)
+    track_ids = []
+    for _ in range(n_tracks):
+        length = data[pos]
+        track_ids.append(data[pos + 1:pos + 1 + length].decode("utf-8"))
+        pos += 1 + length
+    track, sample, lead_index, count = take("<u2", n_pieces), take("<i4", n_pieces), take("<u2", n_pieces), \
+        take("<u2", n_pieces)
+    classes = take(np.uint8, n_vertices)
+
+    delta = _read_varints(data[pos:]).reshape(-1, 2)
+    piece = np.repeat(np.arange(n_pieces), count)
+    # Undo the deltas: cumulative sum restarted at each piece's first vertex
+    total = np.cumsum(delta, axis=0)
+    first = np.cumsum(count) - count
+    xy = total - (total[first] - delta[first])[piece]
+    return {
+        'lead_hours': lead_hours,
+        'track_ids': track_ids,
+        'track': track,
+        'sample': sample,
+        'lead_index': lead_index,
+        'count': count,
+        'pressure_class': classes,
+        'lon': xy[:, 0] / 10 ** precision,
+        'lat': xy[:, 1] / 10 ** precision,
+    }
+
+
+def _quantised_geometry(geom, precision=COORD_PRECISION):
+    return mapping(shapely.transform(geom, lambda coords: _quantise(coords, precision)))
+
+
+def areas_to_geojson(outlook, run, precision=COORD_PRECISION):
+    """FeatureCollection of one outlook window's development-area polygons."""
+    features = []
+    for area in outlook['areas']:
+        if area['polygon'] is None or area['polygon'].is_empty:
+            continue
+        properties = {
+            'index': area['index'],
+            'id': area['history_id'],
+            'prob_early': round(float(area['prob_early']), 1),
+            'prob_window': round(float(area['prob_window']), 1),
+            'category': area['cat_window'],
+            'color': area['color'],
+            'members': int(area['member_count']),
+            'stage': area['stage'],
+            'max_wind_kt': round(float(area['max_wind']), 1),
+            'trend': area['trend'],
+        }
+        if area['stability'] is not None:
+            properties['prob_p05'] = round(float(area['stability']['prob_p05']), 1)
+            properties['prob_p95'] = round(float(area['stability']['prob_p95']), 1)
+        features.append({
+            'type': 'Feature',
+            'geometry': _quantised_geometry(area['polygon'].simplify(AREA_SIMPLIFY_DEG), precision),
+            'properties': properties,
+        })
+    window = outlook['window']
+    return _feature_collection(
+        features,
+        run_id=run['run_id'],
+        init_utc=run['init_utc'].strftime("%Y-%m-%dT%H:%M:%SZ"),
+        window={key: window[key] for key in ('name', 'start_hours', 'end_hours', 'early_hours')},
+    )
+
+
+def atcf_to_geojson(atcf_data, precision=COORD_PRECISION):
+    """FeatureCollection of current WPAC positions from the ATCF API response."""
+    features = []
+    for system in sorted(atcf_data, key=lambda s: str(s.get('atcf_id', ''))):
+        lat, lon = system.get('latitude'), system.get('longitude')
+        if lon is None or lat is None or lon < 0:
+            continue
+        if 'WPAC' not in str(system.get('atcf_sector_file', '')).upper():
+            continue
+        storm_name = str(system.get('storm_name', '')).upper()
+        # interp_sector_file: "<id> <name> <date> <time> <lat> <lon> ... <wind kt> <pressure> ..."
+        parts = str(system.get('interp_sector_file', '')).split()
+        wind = float(parts[8]) if len(parts) >= 12 else None
+        features.append({
+            'type': 'Feature',
+            'geometry': {'type': 'Point', 'coordinates': _quantise([lon, lat], precision).tolist()},
+            'properties': {
+                'atcf_id': system.get('atcf_id', ''),
+                'name': f"LPA {system.get('atcf_id', '')}" if storm_name == 'INVEST' else storm_name,
+                'pressure_hpa': system.get('pressure'),
+                'wind_kt': wind,
+                'last_updated': system.get('last_updated'),
+            },
+        })
+    return _feature_collection(features)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Vector (GeoJSON/binary) export of the latest FNV3 tracks.")
+    parser.add_argument('--max-lead-hours', type=int, default=DEFAULT_MAX_LEAD_HOURS)
+    parser.add_argument('--precision', type=int, default=COORD_PRECISION, help="Coordinate decimal places")
+    parser.add_argument('--no-atcf', action='store_true', help="Skip the current ATCF positions")
+    args = parser.parse_args(argv)
+
+    # Current ATCF positions are fetched while the run downloads
+    atcf_future = None if args.no_atcf else fetch_systems_async()
+    data, run = load_latest_run_or_exit()
+    tracks = build_track_arrays(data, args.max_lead_hours)
+
+    geojson_path = os.path.join(VECTOR_DIR, "tracks_latest.geojson")
+    size = write_geojson(geojson_path, tracks_to_geojson(tracks, run, args.max_lead_hours, args.precision))
+    binary = tracks_to_binary(tracks, run, args.max_lead_hours, args.precision)
+    binary_path = os.path.join(VECTOR_DIR, "tracks_latest.bin")
+    write_if_changed(binary_path, binary)
+    print(f"Tracks written to {geojson_path} ({size / 1024:.0f} KB) and {binary_path} ({len(binary) / 1024:.0f} KB)")
+
+    if atcf_future is not None:
+        atcf_path = os.path.join(VECTOR_DIR, "atcf_latest.geojson")
+        collection = atcf_to_geojson(atcf_future.result(), args.precision)
+        write_geojson(atcf_path, collection)
+        print(f"{len(collection['features'])} ATCF positions written to {atcf_path}")
+
+
+if __name__ == "__main__":
+    main()
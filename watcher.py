@@ -0,0 +1,262 @@
+"""
+Watcher daemon: render the products as soon as a new FNV3 run is published.
+
+Instead of fixed cron times, the watcher knows the run it rendered last and
+polls for the next synoptic run (6 hours later), starting EARLIEST_DELAY_HOURS
+after its initialization time. Polls are HEAD requests spaced by exponential
+backoff with jitter (INITIAL_BACKOFF_SECONDS doubling up to
+MAX_BACKOFF_SECONDS). If a later run appears while the expected one is
+still missing, the watcher skips ahead to it.
+
+When a run is found it is downloaded and parsed once, pinned in memory
+(fnv3_ingest.pin_run) and every step of PIPELINE runs in this process, so
+the product modules stay imported and the Natural Earth clips and
+satellite tiles stay cached from one run to the next. A failing step is
+reported and the others still run. The last rendered run is kept in
+STATE_FILE so a restart does not render it again. With --once the exit
+status is 1 when no run could be loaded or any step failed, so a CI job can
+commit what was rendered and still report the failure.
+
+    python watcher.py                                  # run forever
+    python watcher.py --once                           # render the newest run if new, then exit
+    python watcher.py --once --skip genesis_outlook    # the update_forecast workflow
+    python watcher.py --post-command "./publish.sh"    # e.g. commit and push after each run
+"""
+import argparse
+import importlib
+import json
+import random
+import runpy
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+from fnv3_ingest import get_latest_run_url, load_run, pin_run, run_available
+from publish import write_bytes_atomic
+
+STATE_FILE = "temp_data/watcher_state.json"
+
+RUN_INTERVAL_HOURS = 6
+# Runs are never published sooner than this after their initialization time
+EARLIEST_DELAY_HOURS = 2.0
+
+INITIAL_BACKOFF_SECONDS = 60.0
+MAX_BACKOFF_SECONDS = 1800.0
+
+# Steps run for every new run, in order (the update_forecast workflow);
+# 'weekly' steps only for the Monday 00 UTC run (the weekly_forecast workflow).
+# Names ending in .py are top-level scripts, the others modules with main(argv).
+PIPELINE = [
+    ("Forcast.py", [], None),
+    ("Forcast2.py", [], None),
+    ("strike_probability", [], None),
+    ("wind_probability", [], None),
+    ("xyz_tiles", [], None),
+    ("track_statistics", [], None),
+    ("intensity_quantiles", [], None),
+    ("location_threats", [], None),
+    ("landfall", [], None),
+    ("par_entry", [], None),
+    ("ace", [], None),
+    ("vector_export", [], None),
+    ("lead_time_loop", ["--product", "tracks", "--format", "mp4"], None),
+    ("genesis_outlook", ["--stability", "--tiles"], 'weekly'),
+    ("asset_lifecycle", [], None),
+]
+
+
+def run_parts(init_utc):
+    """(date_str, hour_str) of the run initialized at init_utc."""
+    return init_utc.strftime("%Y_%m_%d"), init_utc.strftime("%H")
+
+
+def run_init(run_id):
+    return datetime.strptime(run_id, "%Y_%m_%dT%H").replace(tzinfo=timezone.utc)
+
+
+def backoff_delay(attempt, initial=INITIAL_BACKOFF_SECONDS, maximum=MAX_BACKOFF_SECONDS, rng=random):
+    """Seconds before poll number attempt + 1: exponential, capped, with equal jitter."""
+    delay = min(maximum, initial * 2 ** attempt)
+    return rng.uniform(delay / 2, delay)
+
+
+def load_state(path=STATE_FILE):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_state(state, path=STATE_FILE):
+    write_bytes_atomic(path, (json.dumps(state, indent=2) + "\n").encode("utf-8"))
+
+
+def step_due(when, run):
+    if when == 'weekly':
+        return run['init_utc'].weekday() == 0 and run['hour_str'] == "00"
+    return True
+
+
+def warm_up(pipeline=PIPELINE):
+    """Import every module step once, so later runs pay no import cost."""
+    for name, _, _ in pipeline:
+        if not name.endswith(".py"):
+            importlib.import_module(name)
+
+
+def run_step(name, argv):
+    """Run one pipeline step in this process; returns True on success."""
+    try:
+        if name.endswith(".py"):
+            saved_argv = sys.argv
+            sys.argv = [name] + list(argv)
+            try:
+                runpy.run_path(name, run_name="__main__")
+            finally:
+                sys.argv = saved_argv
+        else:
+            importlib.import_module(name).main(list(argv))
+        return True
+    except SystemExit as e:
+        return e.code in (None, 0)
+    except Exception as e:
+        print(f"Error in step {name}: {str(e)}")
+        return False
+    finally:
+        plt.close('all')
+
+
+def run_pipeline(run, pipeline=PIPELINE, skip=()):
+    """Run the due steps for the pinned run; returns the names of failed steps."""
+    failed = []
+    for name, argv, when in pipeline:
+        if name in skip or not step_due(when, run):
+            continue
+        start = time.perf_counter()
+        print(f"=== {name} {' '.join(argv)}".rstrip())
+        if not run_step(name, argv):
+            failed.append(name)
+        print(f"=== {name} finished in {time.perf_counter() - start:.1f} s")
+    return failed
+
+
+def process_run(init_utc, args):
+    """Download, pin and render one run; returns the failed steps, or None if it could not be loaded."""
+    date_str, hour_str = run_parts(init_utc)
+    try:
+        data, run = load_run(date_str, hour_str)
+    except Exception as e:
+        print(f"Error loading run {date_str}T{hour_str}: {str(e)}")
+        return None
+    pin_run(data, run)
+
+    start = time.perf_counter()
+    failed = run_pipeline(run, skip=args.skip)
+    latency = datetime.now(timezone.utc) - run['init_utc']
+    print(f"Run {run['run_id']}: pipeline took {time.perf_counter() - start:.0f} s, "
+          f"{latency.total_seconds() / 3600:.1f} h after initialization"
+          + (f"; failed steps: {', '.join(failed)}" if failed else ""))
+
+    if args.post_command:
+        result = subprocess.run(args.post_command, shell=True)
+        if result.returncode != 0:
+            print(f"Warning: post command exited with status {result.returncode}")
+    save_state({'run_id': run['run_id'], 'rendered_utc': datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                'failed_steps': failed}, args.state_file)
+    return failed
+
+
+def sleep_until(moment):
+    seconds = (moment - datetime.now(timezone.utc)).total_seconds()
+    if seconds > 0:
+        time.sleep(seconds)
+
+
+def wait_for_run(expected, args, rng):
+    """
+    Poll until the run initialized at expected (or a later one) is published.
+
+    Returns the init time of the run found.
+    """
+    interval = timedelta(hours=RUN_INTERVAL_HOURS)
+    delay = timedelta(hours=args.earliest_delay_hours)
+    sleep_until(expected + delay)
+    attempt = 0
+    while True:
+        if run_available(*run_parts(expected)):
+            return expected
+        # The expected run may never appear: take a later one once it exists
+        later = expected + interval
+        if datetime.now(timezone.utc) >= later + delay and run_available(*run_parts(later)):
+            print(f"Run {'T'.join(run_parts(expected))} missing, skipping ahead to {'T'.join(run_parts(later))}")
+            expected, attempt = later, 0
+            continue
+        wait = backoff_delay(attempt, args.initial_backoff, args.max_backoff, rng)
+        print(f"Run {'T'.join(run_parts(expected))} not yet available; next poll in {wait:.0f} s")
+        time.sleep(wait)
+        attempt += 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render the products as soon as each FNV3 run is published.")
+    parser.add_argument('--once', action='store_true', help="Render the newest run if not yet rendered, then exit")
+    parser.add_argument('--state-file', default=STATE_FILE)
+    parser.add_argument('--earliest-delay-hours', type=float, default=EARLIEST_DELAY_HOURS,
+                        help="Hours after a run's initialization before polling for it")
+    parser.add_argument('--initial-backoff', type=float, default=INITIAL_BACKOFF_SECONDS,
+                        help="Seconds before the second poll (doubles per poll)")
+    parser.add_argument('--max-backoff', type=float, default=MAX_BACKOFF_SECONDS)
+    parser.add_argument('--skip', nargs='+', default=[], help="Pipeline steps not to run")
+    parser.add_argument('--post-command', default=None,
+                        help="Shell command run after each rendered run (e.g. commit and push)")
+    args = parser.parse_args(argv)
+
+    warm_up()
+    rng = random.Random()
+    state = load_state(args.state_file)
+
+    try:
+        date_str, hour_str, _ = get_latest_run_url()
+        latest = run_init(f"{date_str}T{hour_str}")
+    except RuntimeError as e:
+        print(f"Warning: {str(e)}")
+        latest = None
+    if latest is not None and state.get('run_id') != f"{date_str}T{hour_str}":
+        failed = process_run(latest, args)
+    elif latest is not None:
+        print(f"Run {state['run_id']} already rendered")
+        failed = []
+    else:
+        failed = None
+    if args.once:
+        if failed is None or failed:
+            sys.exit(1)
+        return
+
+    if latest is None:
+        # Nothing published recently: wait for the current cycle's run
+        now = datetime.now(timezone.utc)
+        expected = now.replace(hour=now.hour - now.hour % RUN_INTERVAL_HOURS, minute=0, second=0, microsecond=0)
+    else:
+        expected = latest + timedelta(hours=RUN_INTERVAL_HOURS)
+    try:
+        while True:
+            found = wait_for_run(expected, args, rng)
+            if process_run(found, args) is not None:
+                expected = found + timedelta(hours=RUN_INTERVAL_HOURS)
+            else:
+                # Published but not loadable yet (e.g. partial upload): poll it again
+                time.sleep(backoff_delay(0, args.initial_backoff, args.max_backoff, rng))
+                expected = found
+    except KeyboardInterrupt:
+        print("Watcher stopped")
+
+
+if __name__ == "__main__":
+    main()
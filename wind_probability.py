@@ -0,0 +1,259 @@
+"""
+Ensemble wind-speed probabilities at 34/50/64 kt.
+
+Each member point gets a swath radius for every wind threshold from a simple
+intensity-dependent vortex profile (modified Rankine: V(r) = Vmax (Rmax/r)^x
+outside the radius of maximum wind). Tracks are densified with wind
+interpolated along each segment, and every densified point is matched to the
+grid cells inside its own radius in KD-tree range queries over chunks of
+points of similar radius, sized so each query stays under MAX_QUERY_PAIRS
+candidate pairs. The earliest lead time each sample reaches a cell is kept
+in a dense (sample, cell) array per threshold, updated after every query,
+which gives every cumulative lead-time window from the same pass. Memory is
+bounded by the grid and sample count, not by the size of the swaths.
+
+    python wind_probability.py --windows 24 48 72 120
+    python wind_probability.py --regions wpac par
+"""
+import argparse
+import io
+import json
+import os
+import sys
+
+import matplotlib.pyplot as plt
+import matplotlib.colors as mcolors
+import cartopy.crs as ccrs
+import numpy as np
+from scipy.spatial import cKDTree
+
+from ensemble_tracks import (
+    EARTH_RADIUS_KM, MAX_QUERY_PAIRS, build_track_arrays, chord_for_km, densify_segments, to_unit_vectors,
+    valid_segments,
+)
+from fnv3_ingest import load_latest_run_or_exit
+from map_common import (
+    DEFAULT_REGION, MAP_EXTENT, REGIONS, crop_grid, decorate_plain_map, grid_axes, region_suffix,
+)
+from publish import save_figure, write_if_changed
+
+WIND_THRESHOLDS_KT = [34, 50, 64]
+DEFAULT_WINDOWS_HOURS = [24, 48, 72, 120]
+DEFAULT_RESOLUTION_DEG = 0.25
+
+# Vortex profile used for the swath radii
+RADIUS_MAX_WIND_KM = 40.0
+PROFILE_DECAY = 0.6
+MAX_SWATH_RADIUS_KM = 500.0
+
+# Densified point spacing along the tracks
+SPACING_KM = 25.0
+
+OUTPUT_DIR = "public/assets"
+GRID_DIR = "public/data"
+
+PROBABILITY_LEVELS = [5, 10, 20, 30, 40, 50, 60, 70, 80, 90, 100]
+
+
+def threshold_radius_km(wind_kt, threshold_kt):
+    """
+    Radius (km) out to which winds reach threshold_kt, for maximum wind wind_kt.
+
+    Zero where the system is weaker than the threshold; NaN winds give zero.
+    """
+    wind = np.nan_to_num(np.asarray(wind_kt, dtype=np.float64), nan=0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        radius = RADIUS_MAX_WIND_KM * (wind / threshold_kt) ** (1.0 / PROFILE_DECAY)
+    radius = np.minimum(radius, MAX_SWATH_RADIUS_KM)
+    return np.where(wind >= threshold_kt, radius, 0.0)
+
+
+def _record_first_hits(first_lead, point_xyz, point_lead, point_sample, point_radius, cell_tree, n_cells,
+                       cell_area_km2, max_pairs=MAX_QUERY_PAIRS):
+    """
+    Lower first_lead[sample * n_cells + cell] to the lead of every point whose radius covers the cell.
+
+    A chunk is queried at its largest radius, so points are taken in order
+    of decreasing radius and each chunk holds as many as keep the estimated
+    pairs (pi r^2 / cell_area_km2 cells per point) under max_pairs.
+    """
+    order = np.argsort(-point_radius, kind='stable')
+    point_xyz, point_lead = point_xyz[order], point_lead[order]
+    point_sample, point_radius = point_sample[order], point_radius[order]
+    chords = chord_for_km(point_radius)
+    start = 0
+    while start < len(point_xyz):
+        cells_per_point = max(1.0, np.pi * point_radius[start] ** 2 / cell_area_km2)
+        sl = slice(start, start + max(1, int(max_pairs // cells_per_point)))
+        start = sl.stop
+        pairs = cKDTree(point_xyz[sl]).sparse_distance_matrix(cell_tree, chords[sl][0], output_type='ndarray')
+        inside = pairs['v'] <= chords[sl][pairs['i']]
+        i, j = pairs['i'][inside], pairs['j'][inside]
+        np.minimum.at(first_lead, point_sample[sl][i].astype(np.int64) * n_cells + j, point_lead[sl][i])
+
+
+def wind_probabilities(tracks, thresholds=WIND_THRESHOLDS_KT, windows=DEFAULT_WINDOWS_HOURS,
+                       extent=MAP_EXTENT, resolution=DEFAULT_RESOLUTION_DEG,
+                       member_chunk=2000, max_pairs=MAX_QUERY_PAIRS):
+    """
+    Probability (0-1) of each wind threshold per cell and cumulative window.
+
+    tracks is the dict from ensemble_tracks.build_track_arrays(). Returns
+    (probability, lons, lats) with probability shaped
+    (len(thresholds), len(windows), len(lats), len(lons)) as float32.
+    member_chunk and max_pairs bound the memory of each batched step.
+    """
+    lons, lats = grid_axes(extent, resolution)
+    # Smallest cell (highest latitude), so pair estimates err on the high side
+    cell_area_km2 = (resolution * np.pi / 180.0 * EARTH_RADIUS_KM) ** 2 * np.cos(np.radians(np.abs(lats).max()))
+    grid_lon, grid_lat = np.meshgrid(lons, lats)
+    cell_tree = cKDTree(to_unit_vectors(grid_lon.ravel(), grid_lat.ravel()))
+    n_cells = grid_lon.size
+    num_samples = max(len(tracks['samples']), 1)
+    windows = sorted(windows)
+    # Earliest lead each (sample, cell) is inside the threshold's radius
+    first_lead = {t: np.full(num_samples * n_cells, np.inf, dtype=np.float32) for t in thresholds}
+
+    keep_leads = tracks['lead_hours'] <= windows[-1]
+    lead_hours = tracks['lead_hours'][keep_leads].astype(np.float64)
+    lon = tracks['lon'][:, keep_leads]
+    lat = tracks['lat'][:, keep_leads]
+    wind = tracks['wind'][:, keep_leads]
+    ok = valid_segments({'lon': lon, 'lat': lat})
+
+    for start in range(0, lon.shape[0], member_chunk):
+        rows, cols = np.nonzero(ok[start:start + member_chunk])
+        if len(rows) == 0:
+            continue
+        rows += start
+        xyz, seg, frac = densify_segments(lon[rows, cols], lat[rows, cols],
+                                          lon[rows, cols + 1], lat[rows, cols + 1], SPACING_KM)
+        r, c = rows[seg], cols[seg]
+        point_lead = lead_hours[c] + (lead_hours[c + 1] - lead_hours[c]) * frac
+        point_wind = wind[r, c] + (wind[r, c + 1] - wind[r, c]) * frac
+        point_sample = tracks['sample_index'][r]
+
+        for t in thresholds:
+            radius = threshold_radius_km(point_wind, t)
+            strong = radius > 0
+            if not strong.any():
+                continue
+            _record_first_hits(first_lead[t], xyz[strong], point_lead[strong], point_sample[strong],
+                               radius[strong], cell_tree, n_cells, cell_area_km2, max_pairs)
+
+    probability = np.zeros((len(thresholds), len(windows), n_cells), dtype=np.float32)
+    for ti, t in enumerate(thresholds):
+        lead = first_lead[t].reshape(num_samples, n_cells)
+        for wi, end in enumerate(windows):
+            probability[ti, wi] = np.count_nonzero(lead <= end, axis=0) / num_samples
+
+    return probability.reshape(len(thresholds), len(windows), *grid_lon.shape), lons, lats
+
+
+def save_grids(probability, lons, lats, run, thresholds, windows, grid_dir=GRID_DIR):
+    """Write the float32 probability stack (.npy) and a JSON sidecar."""
+    base = os.path.join(grid_dir, "wind_probability_latest")
+    buf = io.BytesIO()
+    np.save(buf, probability.astype(np.float32), allow_pickle=False)
+    write_if_changed(f"{base}.npy", buf.getvalue())
+
+    meta = {
+        'run_id': run['run_id'],
+        'init_utc': run['init_utc'].strftime("%Y-%m-%dT%H:%M:%SZ"),
+        'thresholds_kt': list(thresholds),
+        'windows_hours': list(windows),
+        'dtype': 'float32',
+        'shape': list(probability.shape),
+        'dims': ['threshold', 'window', 'lat', 'lon'],
+        'lon_min': float(lons[0]),
+        'lat_min': float(lats[0]),
+        'resolution_deg': float(lons[1] - lons[0]),
+        'row_order': 'south_to_north',
+    }
+    write_if_changed(f"{base}.json", (json.dumps(meta, indent=2) + "\n").encode("utf-8"))
+    print(f"Grids saved to {base}.npy")
+
+
+def wind_probability_figure(probability, lons, lats, run, thresholds, windows, extent=MAP_EXTENT,
+                            region_title=REGIONS[DEFAULT_REGION]['title']):
+    """Build the figure with one panel per threshold for the longest window (not saved)."""
+    window_hours = windows[-1]
+    fig, axes = plt.subplots(
+        1, len(thresholds), figsize=(8 * len(thresholds), 8),
+        subplot_kw={'projection': ccrs.PlateCarree()}
+    )
+    axes = np.atleast_1d(axes)
+
+    cmap = plt.get_cmap('YlOrRd', len(PROBABILITY_LEVELS) - 1)
+    norm = mcolors.BoundaryNorm(PROBABILITY_LEVELS, cmap.N)
+    mesh = None
+    for ti, (ax, t) in enumerate(zip(axes, thresholds)):
+        decorate_plain_map(ax, extent)
+        percent = np.ma.masked_less(probability[ti, -1] * 100, PROBABILITY_LEVELS[0])
+        mesh = ax.pcolormesh(lons, lats, percent, cmap=cmap, norm=norm, alpha=0.85,
+                             shading='nearest', transform=ccrs.PlateCarree())
+        ax.set_title(f"{t} kt winds", fontsize=14, weight='bold')
+
+    cbar = fig.colorbar(mesh, ax=list(axes), orientation='horizontal', pad=0.06, fraction=0.04, aspect=60)
+    cbar.set_label(f"Probability of sustained winds at or above threshold within {window_hours} h (%)",
+                   fontsize=11, weight='bold')
+    axes[-1].text(
+        0.98, 0.02,
+        f"Runtime: {run.get('init_text') or 'Runtime unavailable'}\n"
+        "Processed By: Philippine Typhoon/Weather",
+        transform=axes[-1].transAxes, fontsize=10, verticalalignment='bottom', horizontalalignment='right',
+        bbox=dict(facecolor='white', alpha=0.8, edgecolor='black', boxstyle='round,pad=0.3')
+    )
+    fig.suptitle(f"{window_hours // 24}-Day Wind Speed Probabilities - {region_title}", fontsize=18, weight='bold')
+    return fig
+
+
+def render_wind_probability(probability, lons, lats, run, thresholds, windows, region=DEFAULT_REGION,
+                            output_dir=OUTPUT_DIR):
+    """One panel per threshold for the longest window of one region; returns the output path or None."""
+    extent = REGIONS[region]['extent']
+    probability, lons, lats = crop_grid(probability, lons, lats, extent)
+    fig = wind_probability_figure(probability, lons, lats, run, thresholds, windows,
+                                  extent=extent, region_title=REGIONS[region]['title'])
+    suffix = region_suffix(region)
+    output_file = os.path.join(output_dir, f"tropical_cyclone_wind_probability{suffix}_{run['file_stamp']}.png")
+    try:
+        digest, written = save_figure(fig, output_file, product=f"wind_probability{suffix}", run=run)
+        if written:
+            print(f"Plot saved to {output_file} (sha256 {digest[:12]})")
+    except Exception as e:
+        print(f"Error saving plot: {str(e)}")
+        output_file = None
+    plt.close(fig)
+    return output_file
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ensemble 34/50/64 kt wind probabilities from the latest FNV3 run.")
+    parser.add_argument('--windows', type=int, nargs='+', default=DEFAULT_WINDOWS_HOURS,
+                        help="Cumulative lead-time windows (hours)")
+    parser.add_argument('--resolution', type=float, default=DEFAULT_RESOLUTION_DEG,
+                        help="Grid spacing in degrees")
+    parser.add_argument('--regions', nargs='+', choices=list(REGIONS), default=[DEFAULT_REGION],
+                        help="Map regions to render from the same grids")
+    args = parser.parse_args(argv)
+    windows = sorted(args.windows)
+    regions = list(dict.fromkeys(args.regions))
+
+    data, run = load_latest_run_or_exit()
+    tracks = build_track_arrays(data, windows[-1])
+    probability, lons, lats = wind_probabilities(tracks, WIND_THRESHOLDS_KT, windows, resolution=args.resolution)
+    for ti, t in enumerate(WIND_THRESHOLDS_KT):
+        print(f"{t} kt: max probability {probability[ti, -1].max() * 100:.0f}% within {windows[-1]} h")
+
+    save_grids(probability, lons, lats, run, WIND_THRESHOLDS_KT, windows)
+    # Every region is a crop of the one Western Pacific grid stack
+    failed = [region for region in regions
+              if render_wind_probability(probability, lons, lats, run, WIND_THRESHOLDS_KT, windows,
+                                         region=region) is None]
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""
+Web-mercator XYZ tile pyramids of the gridded products, for Leaflet overlays.
+
+A float grid on the regular lat/lon product grid (strike and wind
+probabilities from their published .npy files, or the genesis KDE density of
+genesis_outlook.py) is sampled bilinearly at the centre of every pixel of
+every 256 px tile covering MAP_EXTENT, coloured with the same levels as the
+PNG maps and encoded as an RGBA PNG. Layout:
+
+    public/tiles/<layer>/<z>/<x>/<y>.png
+    public/tiles/<layer>/index.json   bounds, zooms, run and a hash per tile
+
+Tiles are rendered in worker processes. Fully transparent tiles are not
+written (Leaflet simply shows nothing for the missing URL). On a new run a
+tile is only rewritten when its hash differs from the index, and tiles that
+are no longer produced are deleted, so an unchanged area of the map causes
+no file churn.
+
+    python xyz_tiles.py                            # strike + wind layers, zooms 3-7
+    python xyz_tiles.py --layers strike --max-zoom 8
+"""
+import argparse
+import io
+import json
+import os
+import shutil
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib.pyplot as plt
+import matplotlib.colors as mcolors
+import numpy as np
+from PIL import Image
+from scipy.ndimage import map_coordinates
+
+from map_common import MAP_EXTENT
+from publish import sha256_bytes, write_bytes_atomic, write_if_changed
+from strike_probability import PROBABILITY_LEVELS
+
+TILE_SIZE = 256
+DEFAULT_MIN_ZOOM = 3
+DEFAULT_MAX_ZOOM = 7
+
+TILE_DIR = "public/tiles"
+GRID_DIR = "public/data"
+
+# Colouring of grid values (after multiplying by scale); values below the
+# first level, and NaN, are transparent
+LAYER_STYLES = {
+    'probability': {'levels': PROBABILITY_LEVELS, 'cmap': 'YlOrRd', 'alpha': 0.85, 'scale': 100.0},
+    'density': {'levels': PROBABILITY_LEVELS, 'cmap': 'plasma', 'alpha': 0.6, 'scale': 1.0},
+}
+
+# Web-mercator latitude limit
+MAX_MERCATOR_LAT = 85.0511287798
+
+
+def lon_to_x(lon, zoom):
+    return (np.asarray(lon) + 180.0) / 360.0 * 2 ** zoom
+
+
+def lat_to_y(lat, zoom):
+    lat = np.radians(np.clip(lat, -MAX_MERCATOR_LAT, MAX_MERCATOR_LAT))
+    return (1.0 - np.log(np.tan(lat) + 1.0 / np.cos(lat)) / np.pi) / 2.0 * 2 ** zoom
+
+
+def tiles_for_extent(zoom, extent=MAP_EXTENT):
+    """(x, y) of every tile of one zoom level that intersects extent."""
+    lon_min, lon_max, lat_min, lat_max = extent
+    x0, x1 = int(lon_to_x(lon_min, zoom)), int(np.ceil(lon_to_x(lon_max, zoom))) - 1
+    y0, y1 = int(lat_to_y(lat_max, zoom)), int(np.ceil(lat_to_y(lat_min, zoom))) - 1
+    return [(x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
+
+
+def pixel_lonlat(zoom, x, y, size=TILE_SIZE):
+    """Longitudes (size,) and latitudes (size,) of one tile's pixel centres."""
+    offsets = (np.arange(size) + 0.5) / size
+    n = 2 ** zoom
+    lon = (x + offsets) / n * 360.0 - 180.0
+    lat = np.degrees(np.arctan(np.sinh(np.pi * (1.0 - 2.0 * (y + offsets) / n))))
+    return lon, lat
+
+
+def sample_grid(grid, lons, lats, lon, lat):
+    """Bilinear samples (len(lat), len(lon)) of grid[lat, lon]; NaN outside the grid."""
+    col = (lon - lons[0]) / (lons[1] - lons[0])
+    row = (lat - lats[0]) / (lats[1] - lats[0])
+    rows, cols = np.meshgrid(row, col, indexing='ij')
+    return map_coordinates(grid, [rows, cols], order=1, mode='constant', cval=np.nan)
+
+
+def colorize(values, style):
+    """RGBA uint8 image of values using a layer style (transparent below the first level)."""
+    levels = style['levels']
+    cmap = plt.get_cmap(style['cmap'], len(levels) - 1)
+    norm = mcolors.BoundaryNorm(levels, cmap.N)
+    scaled = values * style['scale']
+    rgba = cmap(norm(np.nan_to_num(scaled, nan=levels[0] - 1)), bytes=True)
+    rgba[..., 3] = np.where(np.nan_to_num(scaled, nan=-np.inf) >= levels[0], round(255 * style['alpha']), 0)
+    return rgba
+
+
+def render_tile(grid, lons, lats, style, zoom, x, y):
+    """PNG bytes of one tile, or None when it is fully transparent."""
+    lon, lat = pixel_lonlat(zoom, x, y)
+    rgba = colorize(sample_grid(grid, lons, lats, lon, lat), style)
+    if not rgba[..., 3].any():
+        return None
+    buf = io.BytesIO()
+    Image.fromarray(rgba, 'RGBA').save(buf, format='PNG')
+    return buf.getvalue()
+
+
+def _render_chunk(grid, lons, lats, style, jobs):
+    return [(job, render_tile(grid, lons, lats, style, *job)) for job in jobs]
+
+
+def _load_index(layer_dir):
+    try:
+        with open(os.path.join(layer_dir, "index.json"), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {'tiles': {}}
+
+
+def export_tiles(grid, lons, lats, layer_dir, style, run=None, zooms=range(DEFAULT_MIN_ZOOM, DEFAULT_MAX_ZOOM + 1),
+                 extent=MAP_EXTENT, workers=None):
+    """
+    Render grid[lat, lon] (south-to-north rows on the lons/lats axes) as an
+    XYZ pyramid in layer_dir, rewriting only changed tiles.
+
+    Returns {'written', 'unchanged', 'removed', 'empty'} tile counts.
+    """
+    grid = np.asarray(grid, dtype=np.float32)
+    jobs = [(z, x, y) for z in zooms for x, y in tiles_for_extent(z, extent)]
+    if workers is None:
+        workers = min(os.cpu_count() or 1, 8)
+
+    if workers > 1 and len(jobs) >= 2 * workers:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_render_chunk, grid, lons, lats, style, chunk)
+                       for chunk in (jobs[i::workers] for i in range(workers))]
+            results = [r for f in futures for r in f.result()]
+    else:
+        results = _render_chunk(grid, lons, lats, style, jobs)
+
+    previous = _load_index(layer_dir)['tiles']
+    tiles, counts = {}, {'written': 0, 'unchanged': 0, 'removed': 0, 'empty': 0}
+    for (z, x, y), data in results:
+        if data is None:
+            counts['empty'] += 1
+            continue
+        key = f"{z}/{x}/{y}"
+        tiles[key] = sha256_bytes(data)[:16]
+        path = os.path.join(layer_dir, f"{key}.png")
+        if previous.get(key) == tiles[key] and os.path.exists(path):
+            counts['unchanged'] += 1
+            continue
+        write_bytes_atomic(path, data)
+        counts['written'] += 1
+
+    for key in sorted(set(previous) - set(tiles)):
+        path = os.path.join(layer_dir, f"{key}.png")
+        if os.path.exists(path):
+            os.remove(path)
+        counts['removed'] += 1
+    # Drop directories left empty by removed tiles
+    for z in os.listdir(layer_dir) if os.path.isdir(layer_dir) else []:
+        if not z.isdigit():
+            continue
+        for x in os.listdir(os.path.join(layer_dir, z)):
+            if not os.listdir(os.path.join(layer_dir, z, x)):
+                os.rmdir(os.path.join(layer_dir, z, x))
+        if not os.listdir(os.path.join(layer_dir, z)):
+            os.rmdir(os.path.join(layer_dir, z))
+
+    index = {
+        'run_id': run['run_id'] if run else None,
+        'bounds': [[extent[2], extent[0]], [extent[3], extent[1]]],
+        'min_zoom': min(zooms),
+        'max_zoom': max(zooms),
+        'tile_size': TILE_SIZE,
+        'url': "{z}/{x}/{y}.png",
+        'tiles': dict(sorted(tiles.items())),
+    }
+    write_if_changed(os.path.join(layer_dir, "index.json"),
+                     (json.dumps(index, separators=(',', ':')) + "\n").encode("utf-8"))
+    print(f"Tiles {layer_dir}: {counts['written']} written, {counts['unchanged']} unchanged, "
+          f"{counts['removed']} removed, {counts['empty']} transparent skipped")
+    return counts
+
+
+def remove_layer(layer_dir):
+    """Delete a whole tile layer (e.g. a window with nothing left to draw)."""
+    if os.path.isdir(layer_dir):
+        shutil.rmtree(layer_dir)
+        print(f"Removed tile layer {layer_dir}")
+
+
+def load_grid(name, grid_dir=GRID_DIR):
+    """(values, meta, lons, lats) of a published <name>.npy grid and its JSON sidecar."""
+    base = os.path.join(grid_dir, name)
+    values = np.load(f"{base}.npy", allow_pickle=False)
+    with open(f"{base}.json", 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    res = meta['resolution_deg']
+    lons = meta['lon_min'] + res * np.arange(meta['shape'][-1])
+    lats = meta['lat_min'] + res * np.arange(meta['shape'][-2])
+    return values, meta, lons, lats
+
+
+def grid_layers(names, grid_dir=GRID_DIR):
+    """Yield (layer name, grid, lons, lats, run) for the published probability grids."""
+    if 'strike' in names:
+        values, meta, lons, lats = load_grid("strike_probability_latest", grid_dir)
+        yield "strike_probability", values, lons, lats, meta
+    if 'wind' in names:
+        values, meta, lons, lats = load_grid("wind_probability_latest", grid_dir)
+        for ti, threshold in enumerate(meta['thresholds_kt']):
+            for wi, window in enumerate(meta['windows_hours']):
+                yield f"wind_{threshold}kt_{window}h", values[ti, wi], lons, lats, meta
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="XYZ tiles of the published probability grids.")
+    parser.add_argument('--layers', nargs='+', choices=['strike', 'wind'], default=['strike', 'wind'])
+    parser.add_argument('--min-zoom', type=int, default=DEFAULT_MIN_ZOOM)
+    parser.add_argument('--max-zoom', type=int, default=DEFAULT_MAX_ZOOM)
+    parser.add_argument('--tile-dir', default=TILE_DIR)
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Worker processes (default: CPU count, max 8)")
+    args = parser.parse_args(argv)
+
+    zooms = range(args.min_zoom, args.max_zoom + 1)
+    try:
+        for name, grid, lons, lats, meta in grid_layers(args.layers):
+            export_tiles(grid, lons, lats, os.path.join(args.tile_dir, name), LAYER_STYLES['probability'],
+                         run=meta, zooms=zooms, workers=args.workers)
+    except FileNotFoundError as e:
+        print(f"Error: published grid not found ({str(e)}); run the probability products first.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()